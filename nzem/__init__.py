@@ -10,6 +10,7 @@ import vspd
 
 # Class Imports
 from gnash.gnasher import Gnasher
+from gnash.catalog import SeriesCatalog
 from offers.offer_frames import ILOffer, ReserveOffer, EnergyOffer, PLSROffer
 from wits.wits import WitsScraper
 from offers.offer_io import offer_from_file, reserve_offer_from_file
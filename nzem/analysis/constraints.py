@@ -2,11 +2,20 @@
 Determine whether constraints are active for a particular trading period
 """
 
+# Standard Library
+import os
+import time
+
 # C dependencies
 
 import pandas as pd
 import numpy as np
 
+from nzem.frequent_io.query import select
+
+# Above this many points the constraint plots bin rather than scatter
+DENSITY_THRESHOLD = 50000
+
 try:
     import matplotlib.pyplot as plt
 except:
@@ -47,9 +56,250 @@ def HVDC_Constraint(series, energy_price_send="", energy_price_receive="",
         else:
             raise ValueError("Either abs_tol or rel_tol must be specified")
 
-def constraint_plot(master_set, island="NI", inverse=False, min_split=10):
+def HVDC_Constraint_Frame(df, energy_price_send="", energy_price_receive="",
+                          res_price="", abs_tol=None, rel_tol=None,
+                          min_split=10):
+    """ Determine whether an HVDC constraint is active in every trading
+    period of a DataFrame at once, the array equivalent of HVDC_Constraint.
+    For the other direction of the link swap the send and receive prices
+    (and use the reserve price of the other island).
+
+    Parameters
+    ----------
+    df : The master set (or any frame with the price columns)
+    energy_price_send : The energy price column name of the sending island
+    energy_price_receive : The energy price column name of the receiving
+                           island
+    res_price : The reserve price column name
+    abs_tol : What absolute tolerance should be applied to the dataset
+    rel_tol : What relative tolerance should be applied
+    min_split : The minimum split required to attribute towards reserve
+                binding upon the system.
+
+    Returns
+    -------
+    constraint : A boolean Series, True where the constraint is binding
+    """
+
+    epr_send = df[energy_price_send].values
+    epr_rece = df[energy_price_receive].values
+    rpr = df[res_price].values
+
+    split = epr_rece - epr_send
+    binding = _binding(split, rpr, epr_send, abs_tol, rel_tol, min_split)
+    return pd.Series(binding, index=df.index)
+
+
+def CCGT_Constraint_Frame(df, eprice="", oprice="", rprice="", abs_tol=None,
+                          rel_tol=None, min_split=10):
+    """ Array equivalent of CCGT_Constraint over every row of a DataFrame,
+    the relative tolerance is relative to the offer price.
+
+    Returns
+    -------
+    constraint : A boolean Series, True where the constraint is binding
+    """
+
+    ep = df[eprice].values
+    op = df[oprice].values
+    rp = df[rprice].values
+
+    binding = _binding(ep - op, rp, op, abs_tol, rel_tol, min_split)
+    return pd.Series(binding, index=df.index)
+
+
+def _binding(split, reserve, base, abs_tol, rel_tol, min_split):
+    """ Whether a price split exceeds the minimum and is within tolerance of
+    the reserve price, NaN prices are never binding
+    """
+
+    if abs_tol:
+        tolerance = abs_tol
+    elif rel_tol:
+        tolerance = rel_tol * base
+    else:
+        raise ValueError("Either abs_tol or rel_tol must be specified")
+
+    with np.errstate(invalid='ignore'):
+        return (split > min_split) & (np.abs(split - reserve) <= tolerance)
+
+
+def constraint_sweep(df, energy_price_send="", energy_price_receive="",
+                     res_price="", abs_tols=None, rel_tols=None,
+                     min_splits=(10,), flags=False):
+    """ Evaluate HVDC_Constraint over a grid of tolerances and minimum splits
+    in one broadcast computation, the split and its distance from the
+    reserve price are only computed once.
+
+    Parameters
+    ----------
+    df : The master set
+    energy_price_send, energy_price_receive, res_price : As HVDC_Constraint
+    abs_tols : The absolute tolerances to try
+    rel_tols : The relative tolerances to try
+    min_splits : The minimum splits to try
+    flags : Also return the binding flag of every period for each setting
+
+    Returns
+    -------
+    table : DataFrame with a row per setting ("Tolerance Type", "Tolerance",
+            "Min Split") and the "Binding Periods" and "Binding Fraction"
+    flags : (if flags) DataFrame of booleans indexed like df with a column
+            per setting, in the order of the rows of table
     """
-    Construct a scatter plot constrained vs unconstrained reserves
+
+    epr_send = df[energy_price_send].values
+    split = df[energy_price_receive].values - epr_send
+    distance = np.abs(split - df[res_price].values)
+
+    settings = [("abs", t) for t in (abs_tols or [])] + \
+               [("rel", t) for t in (rel_tols or [])]
+    if not settings:
+        raise ValueError("Either abs_tols or rel_tols must be specified")
+
+    # Tolerances by period, absolute tolerances are constant across periods
+    tolerance = np.array([np.repeat(t, len(df)) if kind == "abs" else
+                          t * epr_send for kind, t in settings])
+    min_splits = np.asarray(min_splits, dtype=np.float64)
+
+    with np.errstate(invalid='ignore'):
+        within = distance[np.newaxis, :] <= tolerance
+        above = split[np.newaxis, :] > min_splits[:, np.newaxis]
+
+    # settings x min splits x periods
+    binding = within[:, np.newaxis, :] & above[np.newaxis, :, :]
+    counts = binding.sum(axis=2)
+
+    rows = [(kind, t, m) for kind, t in settings for m in min_splits]
+    table = pd.DataFrame(rows, columns=["Tolerance Type", "Tolerance",
+                                        "Min Split"])
+    table["Binding Periods"] = counts.ravel()
+    table["Binding Fraction"] = (table["Binding Periods"] /
+                                 float(max(len(df), 1)))
+
+    if flags:
+        flag_frame = pd.DataFrame(binding.reshape(len(rows), len(df)).T,
+                                  index=df.index, columns=rows)
+        return table, flag_frame
+    return table
+
+
+def benchmark_constraints(df, repeat=3, **kargs):
+    """ Time the row wise HVDC_Constraint apply against HVDC_Constraint_Frame
+    over a frame (e.g. a multi year master set) and check they agree.
+
+    Parameters
+    ----------
+    df : The frame to run over
+    repeat : The number of runs of each, the fastest is reported
+    **kargs : The column names and tolerances of HVDC_Constraint
+
+    Returns
+    -------
+    results : dict with the "apply" and "frame" times in seconds, the
+              "speedup" and whether the results "agree"
+    """
+
+    timings = {}
+    results = {}
+    runs = (("apply", lambda: df.apply(HVDC_Constraint, axis=1, **kargs)),
+            ("frame", lambda: HVDC_Constraint_Frame(df, **kargs)))
+    for name, func in runs:
+        best = None
+        for i in range(repeat):
+            start = time.time()
+            results[name] = func()
+            elapsed = time.time() - start
+            best = elapsed if best is None else min(best, elapsed)
+        timings[name] = best
+
+    timings["speedup"] = timings["apply"] / max(timings["frame"], 1e-9)
+    timings["agree"] = bool((results["apply"].astype(bool).values ==
+                             results["frame"].values).all())
+    return timings
+
+
+def branch_binding(branch_results, flow="Flow (MW)",
+                   capacity="Capacity (MW)", abs_tol=1.0, rel_tol=None,
+                   branches=None, run=None):
+    """ Find the branches at or near their limit in every period of a set
+    of vSPD branch results
+
+    Parameters
+    ----------
+    branch_results : vSPUD.branch_results
+    flow : Column name of the branch flow
+    capacity : Column name of the branch capacity
+    abs_tol : A branch binds if its flow is within this many MW of capacity
+    rel_tol : Alternatively within this fraction of capacity
+    branches : Only consider these branches
+    run : Optional name of the run, added as a "Run" column
+
+    Returns
+    -------
+    events : DataFrame with a row per binding branch and period, holding the
+             "DateTime", "Branch", "FromBus", "ToBus" columns present, the
+             flow and capacity, the "Loading" (|flow| / capacity) and the
+             "Direction" (1 from FromBus to ToBus, -1 reversed)
+    """
+
+    df = branch_results
+    flows = df[flow].values.astype(np.float64)
+    limits = df[capacity].values.astype(np.float64)
+
+    if rel_tol:
+        tolerance = rel_tol * limits
+    elif abs_tol is not None:
+        tolerance = abs_tol
+    else:
+        raise ValueError("Either abs_tol or rel_tol must be specified")
+
+    with np.errstate(invalid='ignore'):
+        binding = (limits > 0) & (np.abs(flows) >= limits - tolerance)
+    if branches is not None:
+        binding &= df["Branch"].isin(branches).values
+
+    keys = [x for x in ("DateTime", "Branch", "FromBus", "ToBus")
+            if x in df.columns]
+    events = df[keys + [flow, capacity]][binding].copy()
+
+    events["Loading"] = np.abs(flows[binding]) / limits[binding]
+    events["Direction"] = np.where(flows[binding] < 0, -1, 1)
+    if run is not None:
+        events.insert(0, "Run", run)
+
+    return events.reset_index(drop=True)
+
+
+def branch_binding_runs(factory, **kargs):
+    """ Find binding branches across every folder of a vSPUD_Factory, only
+    one folder of branch results is held in memory at a time.
+
+    Parameters
+    ----------
+    factory : vSPUD_Factory
+    **kargs : Passed to branch_binding
+
+    Returns
+    -------
+    events : The binding events of all runs with a "Run" column of the
+             folder name
+    """
+
+    events = [branch_binding(spud.branch_results,
+                             run=os.path.basename(spud.folder), **kargs)
+              for spud in factory.iter_results(branch=True)]
+    if not events:
+        return pd.DataFrame()
+    return pd.concat(events, ignore_index=True)
+
+
+def constraint_plot(master_set, island="NI", inverse=False, min_split=10,
+                    density=None, max_points=DENSITY_THRESHOLD, bins=200):
+    """
+    Construct a scatter plot constrained vs unconstrained reserves, with
+    more than max_points periods each set is drawn as a density of counts
+    (see plot_points)
     """
 
     cname = "%s Constraint" % island
@@ -57,23 +307,29 @@ def constraint_plot(master_set, island="NI", inverse=False, min_split=10):
     ename = "Price Split"
 
     if inverse:
-        subset = master_set.le_mask(ename, min_split*-1)
+        split = (ename, "<=", min_split * -1)
     else:
-        subset = master_set.ge_mask(ename, min_split)
+        split = (ename, ">=", min_split)
 
-    x1 = subset.eq_mask(cname, True)[ename]
-    y1 = subset.eq_mask(cname, True)[rname]
+    constrained = select(master_set, [split, (cname, "==", True)])
+    unconstrained = select(master_set, [split, (cname, "==", False)])
 
-    x2 = subset.eq_mask(cname, False)[ename]
-    y2 = subset.eq_mask(cname, False)[rname]
+    x1 = constrained[ename]
+    y1 = constrained[rname]
+
+    x2 = unconstrained[ename]
+    y2 = unconstrained[rname]
 
     if inverse:
         x1 = x1 * -1
         x2 = x2 * -1
 
     fig, axes = plt.subplots(1, figsize=(16,9))
-    axes.scatter(x2, y2, marker='x', label="Unconstrained Periods", alpha=0.8, c='grey')
-    axes.scatter(x1, y1, marker='o', label="Constrained Periods", c='k')
+    plot_points(axes, [(x2, y2, dict(marker='x', label="Unconstrained Periods",
+                                     alpha=0.8, c='grey'), 'Greys'),
+                       (x1, y1, dict(marker='o', label="Constrained Periods",
+                                     c='k'), 'Reds')],
+                density=density, max_points=max_points, bins=bins)
 
     axes.set_xlabel("%s Price Split [$/MWh]" % island)
     axes.set_ylabel(rname + ' [$/MWh]')
@@ -97,18 +353,24 @@ def CCGT_Constraint(series, eprice="", oprice="", rprice="", abs_tol=None,
     if sp <= min_split:
         return False
     else:
-        return True if np.abs(sp - rp) <= abs_tol else False
+        if abs_tol:
+            return True if np.abs(sp - rp) <= abs_tol else False
+        elif rel_tol:
+            return True if np.abs(sp - rp) <= rel_tol * op else False
+        else:
+            raise ValueError("Either abs_tol or rel_tol must be specified")
 
-def CCGT_Offer_Plot(df):
+def CCGT_Offer_Plot(df, density=None, max_points=DENSITY_THRESHOLD, bins=200):
 
     fig, axes = plt.subplots(1, figsize=(16,9))
 
-    df = df.eq_mask("CCGT Constraint", True)
+    df = select(df, [("CCGT Constraint", "==", True)])
 
     x = df["Offer Price Split"]
     y = df["NI Reserve Price"]
 
-    axes.scatter(x, y, marker='o', c='k')
+    plot_points(axes, [(x, y, dict(marker='o', c='k'), 'Greys')],
+                density=density, max_points=max_points, bins=bins)
     axes.set_xlim(0, x.max())
     axes.set_ylim(0, y.max())
     axes.set_xlabel("Energy Price - Offer Price [$/MWh]")
@@ -118,6 +380,61 @@ def CCGT_Offer_Plot(df):
     return fig, axes
 
 
+def plot_points(axes, layers, density=None, max_points=DENSITY_THRESHOLD,
+                bins=200):
+    """ Draw layers of points either as scatter plots or, for large numbers
+    of points, as 2D histograms of counts binned with NumPy on a common grid
+    so the layers can still be told apart.
+
+    Parameters
+    ----------
+    axes : The matplotlib axes to draw on
+    layers : A list of (x, y, scatter keyword arguments, colour map name)
+             drawn in order
+    density : True to bin, False to scatter, None to bin only when there
+              are more than max_points points in total
+    max_points : The number of points above which density is used
+    bins : The number of bins along each axis
+
+    Returns
+    -------
+    density : Whether the points were binned
+    """
+
+    if density is None:
+        density = sum(len(x) for x, y, style, cmap in layers) > max_points
+
+    if not density:
+        for x, y, style, cmap in layers:
+            axes.scatter(x, y, **style)
+        return False
+
+    points = []
+    for x, y, style, cmap in layers:
+        x = np.asarray(x, dtype=np.float64)
+        y = np.asarray(y, dtype=np.float64)
+        finite = np.isfinite(x) & np.isfinite(y)
+        points.append((x[finite], y[finite]))
+
+    xs = np.concatenate([p[0] for p in points])
+    ys = np.concatenate([p[1] for p in points])
+    if not len(xs):
+        return True
+
+    xedges = np.linspace(xs.min(), xs.max(), bins + 1)
+    yedges = np.linspace(ys.min(), ys.max(), bins + 1)
+
+    for (x, y), (_, _, style, cmap) in zip(points, layers):
+        counts = np.histogram2d(x, y, bins=[xedges, yedges])[0]
+        axes.pcolormesh(xedges, yedges,
+                        np.ma.masked_equal(np.log10(counts.T + 1), 0),
+                        cmap=cmap, alpha=style.get('alpha', 1.0))
+        # An empty scatter so the layer still has a legend entry
+        axes.scatter([], [], **style)
+
+    return True
+
+
 if __name__ == '__main__':
     pass
 
@@ -0,0 +1,94 @@
+"""
+As-of alignment of lower frequency series onto a higher frequency index.
+
+Rather than upsampling a daily (or quarter hourly) series with a forward
+fill and merging the result, each value of the target index is matched
+with the last source value at or before it by a binary search of the two
+sorted indices. Only the positions are computed, the source values are
+then taken once for the target index.
+
+Usage
+-----
+>>>> hydro = asof_align(lake_data["Daily Stored"], prices.index,
+>>>>                    tolerance=np.timedelta64(1, 'D'))
+"""
+
+# C Dependency
+import pandas as pd
+import numpy as np
+
+
+def asof_indexer(source_index, target_index, tolerance=None):
+    """ The position in source_index of the last value at or before each
+    value of target_index, -1 where there is none.
+
+    Parameters
+    ----------
+    source_index: DatetimeIndex, array
+        The sorted index of the series being aligned
+    target_index: DatetimeIndex, array
+        The index to align on, need not be sorted
+    tolerance: timedelta64, default None
+        The furthest a target may be after its source value, e.g. one day
+        so a daily value only applies to the periods of its day
+
+    Returns
+    -------
+    positions: array
+        Integer positions into source_index
+
+    """
+
+    source = np.asarray(source_index, dtype='datetime64[ns]')
+    target = np.asarray(target_index, dtype='datetime64[ns]')
+
+    positions = np.searchsorted(source, target, side='right') - 1
+
+    if tolerance is not None and len(source):
+        stale = target - source[np.maximum(positions, 0)] >= \
+            np.timedelta64(tolerance).astype('timedelta64[ns]')
+        positions[stale] = -1
+
+    return positions
+
+
+def asof_align(data, target_index, tolerance=None):
+    """ Align a Series or DataFrame onto target_index, taking the last value
+    at or before each target. Targets before the first value (or beyond the
+    tolerance) are NaN, as is every target when data is empty.
+
+    Parameters
+    ----------
+    data: Series, DataFrame
+        Data with a DatetimeIndex
+    target_index: DatetimeIndex
+        The index to align on
+    tolerance: timedelta64, default None
+        See asof_indexer
+
+    Returns
+    -------
+    aligned: Series, DataFrame
+        The data indexed by target_index
+
+    """
+
+    if not data.index.is_monotonic:
+        data = data.sort_index()
+
+    positions = asof_indexer(data.index, target_index, tolerance=tolerance)
+    missing = positions < 0
+
+    if not len(data):
+        values = np.full((len(positions),) + data.shape[1:], np.nan)
+    else:
+        values = data.values.take(np.maximum(positions, 0), axis=0)
+
+    if missing.any():
+        if values.dtype.kind in 'iub':
+            values = values.astype(np.float64)
+        values[missing] = np.nan
+
+    if isinstance(data, pd.Series):
+        return pd.Series(values, index=target_index, name=data.name)
+    return pd.DataFrame(values, index=target_index, columns=data.columns)
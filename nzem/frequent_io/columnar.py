@@ -0,0 +1,273 @@
+"""
+A simple date partitioned columnar store for time indexed DataFrames.
+
+Each partition (a day or a month of data) is a directory holding one
+NumPy array per column plus the datetime index, the dtypes of the columns
+are kept in a schema file at the root of the store. Reading a date range
+only touches the partitions and columns which are asked for, and arrays
+can be memory mapped rather than read into memory.
+
+Layout
+------
+store/
+    _schema.json
+    201307/
+        _index.npy
+        c0.npy
+        c1.npy
+
+Column arrays are named by the position of the column in the schema, so
+any column name (e.g. "Price ($/MWh)") can be stored.
+"""
+
+# Standard Library
+import os
+import shutil
+
+# Non C Dependency
+import simplejson as json
+
+# C Dependency
+import pandas as pd
+import numpy as np
+
+
+PARTITION_FORMATS = {'D': '%Y%m%d', 'M': '%Y%m', 'Y': '%Y'}
+
+
+class ColumnarStore(object):
+    """ A directory of date partitioned column arrays
+
+    Usage
+    -----
+    >>>> store = ColumnarStore('/home/nigel/data/demand_store', partition='M')
+    >>>> store.write(df, keys=["Island Name"])
+    >>>> store.read(begin_date="2013-07-01", end_date="2013-07-31")
+    """
+
+    def __init__(self, path, partition='M'):
+        """ Open (or create) a store
+
+        Parameters
+        ----------
+        path: string
+            The root directory of the store
+        partition: string, default 'M'
+            Partition by day ('D'), month ('M') or year ('Y'), the
+            partitioning of an existing store is read from its schema
+
+        """
+
+        super(ColumnarStore, self).__init__()
+
+        self.path = path
+        self.schema_name = os.path.join(path, '_schema.json')
+
+        if os.path.exists(self.schema_name):
+            with open(self.schema_name) as f:
+                self.schema = json.load(f)
+        else:
+            self.schema = {'partition': partition, 'columns': [],
+                           'dtypes': {}, 'index': None}
+
+    @property
+    def columns(self):
+        return list(self.schema['columns'])
+
+    def partitions(self):
+        """ The sorted names of the partitions in the store """
+
+        if not os.path.exists(self.path):
+            return []
+        return sorted(x for x in os.listdir(self.path) if not
+                      x.startswith('_') and
+                      os.path.isdir(os.path.join(self.path, x)))
+
+    def last_index(self):
+        """ The largest index value in the store, None if it is empty """
+
+        partitions = self.partitions()
+        if not partitions:
+            return None
+        index = self._load_index(partitions[-1], mmap=True)
+        return pd.Timestamp(index.max()) if len(index) else None
+
+    def write(self, df, keys=None):
+        """ Write a DataFrame with a DatetimeIndex to the store, replacing
+        existing rows. Rows are matched on the index and the key columns,
+        without keys every existing row in the partitions written to which
+        shares an index value with the new data is replaced.
+        """
+
+        self._update_schema(df)
+
+        for name, part in self._split(df):
+            existing = self._read_partition(name)
+            if existing is not None:
+                if keys:
+                    combined = pd.concat([part, existing])
+                    marker = combined.reset_index()
+                    marker = marker.duplicated([marker.columns[0]] +
+                                               list(keys))
+                    part = combined[~marker.values]
+                else:
+                    existing = existing[~existing.index.isin(part.index)]
+                    part = pd.concat([existing, part])
+            self._write_partition(name, part)
+
+    def append(self, df):
+        """ Append a DataFrame to the store without checking for existing
+        rows, new rows are added to the end of each partition.
+        """
+
+        self._update_schema(df)
+
+        for name, part in self._split(df):
+            existing = self._read_partition(name)
+            if existing is not None:
+                part = pd.concat([existing, part])
+            self._write_partition(name, part)
+
+    def read(self, begin_date=None, end_date=None, columns=None, mmap=False):
+        """ Read a date range from the store
+
+        Parameters
+        ----------
+        begin_date: string, datetime, default None
+            The first index value, inclusive
+        end_date: string, datetime, default None
+            The last index value, inclusive
+        columns: list, default None
+            The columns to read, defaults to all of them
+        mmap: bool, default False
+            Memory map the numeric arrays rather than reading them
+
+        Returns
+        -------
+        df: DataFrame
+            The data sorted by its index
+
+        """
+
+        columns = columns or self.columns
+        begin = pd.Timestamp(begin_date) if begin_date is not None else None
+        end = pd.Timestamp(end_date) if end_date is not None else None
+
+        fmt = PARTITION_FORMATS[self.schema['partition']]
+        first = begin.strftime(fmt) if begin is not None else None
+        last = end.strftime(fmt) if end is not None else None
+
+        frames = []
+        for name in self.partitions():
+            if (first and name < first) or (last and name > last):
+                continue
+            frames.append(self._read_partition(name, columns=columns,
+                                               mmap=mmap))
+
+        if not frames:
+            return pd.DataFrame(columns=columns)
+
+        df = pd.concat(frames) if len(frames) > 1 else frames[0]
+        if begin is not None or end is not None:
+            mask = np.ones(len(df), dtype=bool)
+            if begin is not None:
+                mask &= np.asarray(df.index >= begin)
+            if end is not None:
+                mask &= np.asarray(df.index <= end)
+            df = df[mask]
+
+        return df.sort_index()
+
+    def drop(self, partition=None):
+        """ Remove a partition, or the whole store if None """
+
+        if partition is None:
+            if os.path.exists(self.path):
+                shutil.rmtree(self.path)
+            self.schema = {'partition': self.schema['partition'],
+                           'columns': [], 'dtypes': {}, 'index': None}
+        else:
+            shutil.rmtree(os.path.join(self.path, partition))
+
+    def _split(self, df):
+        """ Yield (partition name, frame) pairs of a DataFrame """
+
+        if not isinstance(df.index, pd.DatetimeIndex):
+            raise ValueError("DataFrames written to a ColumnarStore must \
+                              have a DatetimeIndex")
+
+        names = self._partition_names(df.index)
+        for name in np.unique(names):
+            yield name, df[names == name]
+
+    def _partition_names(self, index):
+        """ The partition name of every value of a DatetimeIndex """
+
+        partition = self.schema['partition']
+        year = np.asarray(index.year, dtype=np.int64)
+        if partition == 'Y':
+            return np.char.mod('%04d', year)
+
+        month = np.asarray(index.month, dtype=np.int64)
+        if partition == 'M':
+            return np.char.mod('%06d', year * 100 + month)
+
+        day = np.asarray(index.day, dtype=np.int64)
+        return np.char.mod('%08d', year * 10000 + month * 100 + day)
+
+    def _update_schema(self, df):
+        for col in df.columns:
+            if col not in self.schema['columns']:
+                self.schema['columns'].append(col)
+                self.schema['dtypes'][col] = str(df[col].dtype)
+        self.schema['index'] = df.index.name
+
+        if not os.path.exists(self.path):
+            os.makedirs(self.path)
+        with open(self.schema_name, 'w') as f:
+            json.dump(self.schema, f)
+
+    def _write_partition(self, name, df):
+        folder = os.path.join(self.path, name)
+        if not os.path.exists(folder):
+            os.makedirs(folder)
+
+        np.save(os.path.join(folder, '_index.npy'),
+                df.index.values.astype('datetime64[ns]').view('i8'))
+
+        for col in df.columns:
+            values = df[col].values
+            if values.dtype == object:
+                values = values.astype(unicode)
+            np.save(self._column_name(folder, col), values)
+
+    def _column_name(self, folder, col):
+        position = self.schema['columns'].index(col)
+        return os.path.join(folder, 'c%d.npy' % position)
+
+    def _load_index(self, name, mmap=False):
+        index = np.load(os.path.join(self.path, name, '_index.npy'),
+                        mmap_mode='r' if mmap else None)
+        return np.asarray(index).view('datetime64[ns]')
+
+    def _read_partition(self, name, columns=None, mmap=False):
+        folder = os.path.join(self.path, name)
+        if not os.path.exists(folder):
+            return None
+
+        index = pd.DatetimeIndex(self._load_index(name),
+                                 name=self.schema['index'])
+
+        data = {}
+        for col in columns or self.columns:
+            fname = self._column_name(folder, col)
+            if not os.path.exists(fname):
+                data[col] = np.nan
+                continue
+            values = np.load(fname, mmap_mode='r' if mmap else None)
+            if self.schema['dtypes'].get(col) == 'object':
+                values = values.astype(object)
+            data[col] = values
+
+        return pd.DataFrame(data, index=index,
+                            columns=columns or self.columns)
@@ -12,13 +12,21 @@ e) Create a database from scratch
 
 # Standard Library
 import os
+import re
 from datetime import datetime, timedelta
+from cStringIO import StringIO
 import glob
 import nzem
 from dateutil.parser import parse
 
 # C Dependency
 import pandas as pd
+import numpy as np
+
+from nzem.frequent_io.database import (get_pool, query_chunks, query_frame,
+                                       PLACEHOLDERS)
+from nzem.frequent_io.query_cache import QueryCache
+from nzem.frequent_io.query import select
 
 try:
     from pandas.tseries.offsets import Minute
@@ -28,35 +36,74 @@ except:
 
 NZEM_DATA_FOLDER = os.path.join(os.path.expanduser('~'), "data")
 
+# Table name: file pattern relative to the data folder
+DATABASE_SOURCES = {"nodal_prices": "Nodal_Pricing*.csv",
+                    "reserve_prices": "reserve_prices*.csv",
+                    "il_offers": "il_data/*.csv",
+                    "energy_offers": "Energy_Offers/*.csv",
+                    "demand": "island_demand_data*.csv"}
+
+# Columns identifying the location or participant, the first present in a
+# table is indexed along with the trading date and period
+LOCATION_COLUMNS = ("NODE", "BUS_ID", "GRID_EXIT_POINT", "POC", "ISLAND_ID",
+                    "ISLAND")
+
 
 def execute_query(SQL, dbname="Electricity_Database", password="Hammertime",
-    user="local_host", something=None):
+    user="local_host", something=None, params=None, backend="postgres",
+    chunksize=None, cache=None):
     """
     Will connect to a database, execute a query and return a DataFrame
-    containing the queried information
+    containing the queried information. Connections are pooled so repeated
+    queries against the same database reuse an open connection, see
+    nzem.frequent_io.database
 
     Parameters
     ----------
     SQL : The SQL query to be executed
+    dbname : The database name, or the file name for the sqlite backend
+    params : Optional query parameters, the placeholder is %s for postgres
+             and ? for sqlite
+    backend : Either "postgres" or "sqlite"
+    chunksize : If given return a generator of DataFrames of this many rows
+                streamed from the database rather than a single DataFrame
+    cache : A QueryCache to read through, or True for the default cache.
+            Not used when streaming with a chunksize
 
     Returns
     -------
     df : A Pandas DataFrame containing the queried data
     """
 
-    connect_string = "dbname='%(db)s' password='%(pw)s' user='%(ur)s' " % {
-        'db': dbname, 'pw': password, 'ur': user}
+    pool = database_pool(dbname=dbname, password=password, user=user,
+                         backend=backend)
 
-    try:
-        conn = psy.connect(connect_string)
-        curs = conn.cursor()
-    except:
-        print "Unable to raise connection"
+    if chunksize:
+        return query_chunks(SQL, params=params, chunksize=chunksize,
+                            pool=pool)
+
+    cache = _query_cache(cache)
+    key = (SQL, (backend, dbname, params))
+    if cache:
+        df = cache.get(*key)
+        if df is not None:
+            return df
+
+    df = query_frame(SQL, params=params, pool=pool)
+
+    if cache:
+        cache.put(key[0], key[1], df)
 
-    curs.execute(SQL)
-    headers = [desc[0] for desc in curs.description]
-    data = curs.fetchall()
-    return pd.DataFrame(data, columns=headers)
+    return df
+
+def database_pool(dbname="Electricity_Database", password="Hammertime",
+    user="local_host", backend="postgres"):
+    """ Return the shared connection pool for a database """
+
+    if backend == "sqlite":
+        return get_pool(backend, database=dbname)
+
+    return get_pool(backend, dbname=dbname, password=password, user=user)
 
 def load_map(map_fname=None):
     """
@@ -76,30 +123,306 @@ def load_map(map_fname=None):
 
     return pd.read_csv(map_fname)
 
-def query_database(table, start_date=None, end_date=None, companies=None):
-    """ Constructs an SQL query to query a particular table within the Database
-        If no dates are specified will default to the current day
+def query_database(table, start_date=None, end_date=None, companies=None,
+                   columns=None, dbname="Electricity_Database",
+                   password="Hammertime", user="local_host",
+                   backend="postgres", cache=None):
+    """ Query a table of a database created by create_database for a range
+    of trading dates, and optionally a number of companies. The query is
+    parameterised and answered from the (trading date, period, location)
+    index. If no dates are specified will default to the current day.
+
+    Parameters
+    ----------
+    table : The table name, e.g. "nodal_prices"
+    start_date : The first trading date, inclusive
+    end_date : The last trading date, inclusive
+    companies : Optional iterable of company codes to filter by
+    columns : Optional iterable of columns to return, default all
+    backend : Either "postgres" or "sqlite", see execute_query
+    cache : A QueryCache to read through, or True for the default cache.
+            A cached pull of a wider date range from the same table is
+            filtered down rather than querying the database again.
+
+    Returns
+    -------
+    df : A DataFrame of the queried rows
     """
 
     if start_date == None and end_date == None:
-        date_format = "%d/%m/%Y"
-        start_date = (datetime.now() - timedelta(days=1)).strftime(date_format)
-        end_date = datetime.now().strftime(date_format)
+        start_date = datetime.now() - timedelta(days=1)
+        end_date = datetime.now()
+
+    start_date = _iso_date(start_date)
+    end_date = _iso_date(end_date)
+
+    cache = _query_cache(cache)
+
+    # The cache filters cached rows on the trading date so it is queried
+    # along with the requested columns, but not returned
+    added = bool(cache and columns and "TRADING_DATE" not in columns)
+    if added:
+        columns = ["TRADING_DATE"] + list(columns)
+
+    cache_keys = dict(companies=companies, columns=columns,
+                      source=(backend, dbname))
+    df = None
+    if cache:
+        df = cache.get_range(table, start_date, end_date, **cache_keys)
+
+    if df is None:
+        SQL, params = _range_query(table, start_date, end_date,
+                                   companies=companies, columns=columns,
+                                   backend=backend)
+
+        df = execute_query(SQL, dbname=dbname, password=password, user=user,
+                           params=params, backend=backend)
+
+        if cache:
+            cache.put_range(table, start_date, end_date, df, **cache_keys)
+
+    if added:
+        df = df.drop("TRADING_DATE", axis=1)
+
+    return df
+
 
-    SQL = """
-    SELECT *
-    FROM public.%(tab)s
-    WHERE %(tab)s."TRADING_DATE" BETWEEN "%(sd)s" AND "%(ed)s
+def _query_cache(cache):
+    """ Resolve the cache argument of the query functions """
+
+    if cache is True:
+        return QueryCache()
+    return cache or None
+
+
+def create_database(sources=None, folder=None, dbname="Electricity_Database",
+                    password="Hammertime", user="local_host",
+                    backend="postgres", batch_size=50000, replace=False):
+    """ Create a database from scratch by bulk loading the csv data,
+    the nodal price, reserve price, IL offer, energy offer and demand files
+    by default. Each file is read and inserted in batches, with postgres the
+    batches are sent with COPY, and the tables are indexed on trading date,
+    trading period and location once loaded.
+
+    Column names are stored in the WITS format (e.g. TRADING_DATE) and
+    trading dates as ISO dates so date ranges can use the index.
+
+    Parameters
+    ----------
+    sources : dict, default DATABASE_SOURCES
+        Table name to a glob pattern of the files to load
+    folder : string, default NZEM_DATA_FOLDER
+        The folder the patterns are relative to
+    backend : Either "postgres" or "sqlite", see execute_query
+    batch_size : The number of rows read and inserted at once
+    replace : Drop any existing tables first, otherwise tables which
+              already exist are left as they are and not loaded again
+
+    Returns
+    -------
+    rows : dict of the number of rows loaded into each table
     """
 
+    sources = sources or DATABASE_SOURCES
+    folder = folder or NZEM_DATA_FOLDER
+    pool = database_pool(dbname=dbname, password=password, user=user,
+                         backend=backend)
+
+    rows = {}
+    for table, pattern in sorted(sources.items()):
+        files = sorted(glob.glob(os.path.join(folder, pattern)))
+        if not files:
+            print "No files found for %s, skipping" % table
+            continue
+
+        if replace:
+            with pool.connection() as conn:
+                conn.cursor().execute('DROP TABLE IF EXISTS %s' %
+                                      _identifier(table))
+        elif table_exists(table, pool=pool):
+            print "%s already exists, pass replace=True to reload it" % table
+            continue
+
+        # The column types are taken from the first batch of every file
+        samples = (_normalise_frame(pd.read_csv(f, nrows=batch_size))
+                   for f in files)
+        with pool.connection() as conn:
+            conn.cursor().execute(_create_table_sql(table, samples,
+                                                    pool.backend))
+
+        rows[table] = sum(load_table(table, f, pool=pool, create=False,
+                                     batch_size=batch_size) for f in files)
+        create_indexes(table, pool=pool)
+        print "Loaded %d rows into %s" % (rows[table], table)
+
+    return rows
+
+
+def load_table(table, csv_name, pool=None, batch_size=50000, create=True):
+    """ Bulk load a single csv file into a table, with create set the table
+    is created from the columns of the first batch if it does not exist.
+
+    Returns
+    -------
+    rows : The number of rows loaded
+    """
+
+    rows = 0
+    for chunk in pd.read_csv(csv_name, chunksize=batch_size):
+        chunk = _normalise_frame(chunk)
+        with pool.connection() as conn:
+            curs = conn.cursor()
+            if create:
+                curs.execute(_create_table_sql(table, [chunk], pool.backend))
+                create = False
+            _insert_frame(curs, table, chunk, pool)
+        rows += len(chunk)
+    return rows
+
+
+def table_exists(table, pool=None):
+    """ Whether a table exists in the database """
+
+    if pool.backend == "sqlite":
+        SQL = "SELECT name FROM sqlite_master WHERE type = 'table' AND " \
+              "name = ?"
+    else:
+        SQL = "SELECT table_name FROM information_schema.tables WHERE " \
+              "table_name = %s"
+    return len(query_frame(SQL, params=(table,), pool=pool)) > 0
+
+
+def create_indexes(table, pool=None):
+    """ Index a table on trading date, trading period and the location
+    (or company) columns it contains.
+    """
+
+    with pool.connection() as conn:
+        curs = conn.cursor()
+        curs.execute('SELECT * FROM %s WHERE 1 = 0' % _identifier(table))
+        if pool.backend == "postgres":
+            curs.fetchall()
+        columns = [desc[0] for desc in curs.description]
+
+        keys = [x for x in ("TRADING_DATE", "TRADING_PERIOD") if x in columns]
+        location = [x for x in LOCATION_COLUMNS if x in columns][:1]
+
+        indexes = [keys + location]
+        if "COMPANY" in columns:
+            indexes.append(keys + ["COMPANY"])
+
+        for i, index in enumerate(indexes):
+            if not index:
+                continue
+            curs.execute('CREATE INDEX IF NOT EXISTS %s ON %s (%s)' % (
+                         _identifier("%s_idx_%d" % (table, i)),
+                         _identifier(table),
+                         ', '.join(_identifier(x) for x in index)))
+
+
+def _range_query(table, start_date, end_date, companies=None, columns=None,
+                 backend="postgres"):
+    """ Construct a parameterised trading date range query """
+
+    placeholder = PLACEHOLDERS[backend]
+
+    if columns:
+        select = ', '.join(_identifier(x) for x in columns)
+    else:
+        select = '*'
+
+    SQL = 'SELECT %s FROM %s WHERE "TRADING_DATE" BETWEEN %s AND %s' % (
+            select, _identifier(table), placeholder, placeholder)
+    params = [_iso_date(start_date), _iso_date(end_date)]
+
     if companies is not None:
-        company_sql = """AND %(tab)s."COMPANY" in %(comp)s"""
-        SQL = ''.join([SQL, company_sql])
+        companies = list(companies)
+        SQL += ' AND "COMPANY" IN (%s)' % ', '.join([placeholder] *
+                                                     len(companies))
+        params.extend(companies)
+
+    return SQL, tuple(params)
+
+
+def _iso_date(x):
+    if not isinstance(x, datetime):
+        x = parse(x)
+    return x.strftime('%Y-%m-%d')
+
+
+def _identifier(name):
+    """ Quote a table or column name, rejecting anything unexpected """
+
+    if not re.match(r'^[A-Za-z0-9_ ]+$', name):
+        raise ValueError("%s is not a valid identifier" % name)
+    return '"%s"' % name
+
+
+def _normalise_frame(df):
+    """ Rename the columns to the WITS format, split trading period ids
+    into dates and periods and convert trading dates to ISO dates.
+    """
+
+    df = df.rename(columns={x: x.strip().replace(' ', '_').upper()
+                            for x in df.columns})
+
+    if "TRADING_PERIOD_ID" in df.columns and "TRADING_DATE" not in df.columns:
+        tpid = df["TRADING_PERIOD_ID"].astype(str)
+        df["TRADING_DATE"] = tpid.str.slice(0, -2)
+        df["TRADING_PERIOD"] = tpid.str.slice(-2).astype(int)
+
+    if "TRADING_DATE" in df.columns:
+        date_map = {x: parse(str(x)).strftime('%Y-%m-%d') for x in
+                    df["TRADING_DATE"].unique()}
+        df["TRADING_DATE"] = df["TRADING_DATE"].map(date_map)
+
+    return df
+
+
+def _create_table_sql(table, frames, backend):
+    """ The CREATE TABLE statement for the columns of a number of frames,
+    a column is a float if it is a float in any frame (and an integer in the
+    rest) and text if its kinds otherwise differ.
+    """
+
+    types = {'postgres': {'f': 'DOUBLE PRECISION', 'i': 'BIGINT',
+                          'b': 'BOOLEAN', 'O': 'TEXT'},
+             'sqlite': {'f': 'REAL', 'i': 'INTEGER', 'b': 'INTEGER',
+                        'O': 'TEXT'}}[backend]
+
+    order, kinds = [], {}
+    for df in frames:
+        for col in df.columns:
+            kind = df[col].dtype.kind
+            if col not in kinds:
+                order.append(col)
+                kinds[col] = kind
+            elif kinds[col] != kind:
+                numeric = set([kinds[col], kind]) == set(['i', 'f'])
+                kinds[col] = 'f' if numeric else 'O'
+
+    columns = ', '.join('%s %s' % (_identifier(col),
+                        types.get(kinds[col], 'TEXT')) for col in order)
+    return 'CREATE TABLE IF NOT EXISTS %s (%s)' % (_identifier(table), columns)
+
+
+def _insert_frame(curs, table, df, pool):
+    """ Insert a DataFrame with COPY for postgres, else executemany """
+
+    columns = ', '.join(_identifier(x) for x in df.columns)
 
-    query_SQL = SQL % {'tab': table, 'sd': start_date, 'ed': end_date,
-                       'comp': companies}
+    if pool.backend == "postgres":
+        buf = StringIO()
+        df.to_csv(buf, index=False, header=False)
+        buf.seek(0)
+        curs.copy_expert('COPY %s (%s) FROM STDIN WITH CSV' % (
+                         _identifier(table), columns), buf)
+        return None
 
-    print query_SQL
+    values = ', '.join([pool.placeholder] * len(df.columns))
+    records = df.astype(object).where(pd.notnull(df), None).values.tolist()
+    curs.executemany('INSERT INTO %s (%s) VALUES (%s)' % (
+                     _identifier(table), columns, values), records)
 
 
 def map_data(df, node_map=None, left_on="Grid Exit Point", right_on="Node",
@@ -155,12 +478,76 @@ def map_date_period(series, date_map=None, date="Trading Date",
 
 
 
+def niwa_parse(x):
+    """
+    Parse a single NIWA hydrology date, these are day first with any
+    separator and a two or four digit year, e.g. "1/07/13", "01-07-2013",
+    or the compact "20130701". Year first ISO dates, "2013-07-01", are
+    also accepted.
+
+    Parameters
+    ----------
+    x : The date string
+
+    Returns
+    -------
+    date : A datetime
+    """
+
+    return pd.Timestamp(parse_niwa_dates(np.array([x]))[0]).to_pydatetime()
+
+
+def parse_niwa_dates(values):
+    """
+    Vectorized parse of an array of NIWA hydrology dates (see niwa_parse),
+    each distinct date string is split once and the datetimes are built
+    from the integer day, month and year arrays.
+
+    Parameters
+    ----------
+    values : An array of date strings
+
+    Returns
+    -------
+    dates : An array of datetime64[ns], NaT where a date could not be parsed
+    """
+
+    unique, inverse = np.unique(np.asarray(values).astype(str),
+                                return_inverse=True)
+
+    parts = np.zeros((len(unique), 3), dtype=np.int64)
+    valid = np.zeros(len(unique), dtype=bool)
+    for i, x in enumerate(unique):
+        fields = re.findall(r'\d+', x)
+        if len(fields) == 1 and len(fields[0]) == 8:
+            fields = [fields[0][6:], fields[0][4:6], fields[0][:4]]
+        elif len(fields) >= 3 and len(fields[0]) == 4:
+            # Year first, e.g. ISO dates
+            fields = fields[2::-1]
+        if len(fields) >= 3:
+            parts[i] = [int(f) for f in fields[:3]]
+            valid[i] = True
+
+    day, month, year = parts.T
+    year = np.where(year < 100, np.where(year > 50, 1900, 2000) + year, year)
+    valid &= (month >= 1) & (month <= 12) & (day >= 1) & (day <= 31)
+
+    months = ((year - 1970) * 12 + month - 1).astype('datetime64[M]')
+    dates = months.astype('datetime64[D]') + (day - 1).astype('timedelta64[D]')
+
+    # Days past the end of the month roll into the next one
+    valid &= dates.astype('datetime64[M]') == months
+
+    dates = dates.astype('datetime64[ns]')
+    dates[~valid] = np.datetime64('NaT')
+    return dates[inverse]
+
 
 def load_csvfile(csv_name, quick_parse=True, date_time_index=True,
               title_columns=True, date_period=False, trading_period_id=False,
               date="Trading Date", period="Trading Period",
               tpid="Trading Period Id", date_time="Date Time",
-              niwa_date=False):
+              niwa_date=False, begin_date=None):
     """
     Master function to handle the importation of data files for analysis.
     Has capabilities of handling a broadish range of dates which is pretty sweet.
@@ -180,6 +567,8 @@ def load_csvfile(csv_name, quick_parse=True, date_time_index=True,
     tpid : Column name of the Trading Period ID
     date_time : Column name of the datetime index
     niwa_date : Whether the horrible NIWA date format is used (hydrology data..)
+    begin_date : Only keep rows from this date time onwards, whole days
+                 before it are dropped before the periods are parsed
 
     Returns
     -------
@@ -195,27 +584,42 @@ def load_csvfile(csv_name, quick_parse=True, date_time_index=True,
 
     if quick_parse:
         if niwa_date:
-            date_map = {x: niwa_parse(x) for x in df[date].unique()}
-            df[date_time] = df[date].map(date_map)
+            df[date_time] = parse_niwa_dates(df[date].values)
 
         else:
             if trading_period_id:
-                fdate = lambda x: str(x)[:-2]
-                fperiod = lambda x: int(str(x)[-2:])
-                df[date] = df[tpid].apply(fdate)
-                df[period] = df[tpid].apply(fperiod)
+                ids = df[tpid].values
+                if ids.dtype.kind in 'iu':
+                    df[date] = (ids // 100).astype(str)
+                    df[period] = ids % 100
+                else:
+                    ids = df[tpid].astype(str)
+                    df[date] = ids.str[:-2]
+                    df[period] = ids.str[-2:].astype(np.int64)
                 date_period = True
 
             if date_period:
-                df = df.le_mask(period, 48)
+                # Each distinct date is parsed once, the periods are added
+                # as an array of minutes rather than row by row
+                df = select(df, [(period, "<=", 48)])
                 date_map = {x: parse(x) for x in df[date].unique()}
-                df[date_time] = df.apply(map_date_period, date_map=date_map,
-                    date=date, period=period, axis=1)
+                dates = df[date].map(date_map).values.astype('datetime64[ns]')
+                if begin_date is not None:
+                    keep = dates >= pd.Timestamp(begin_date).normalize().asm8
+                    df, dates = df[keep], dates[keep]
+                # Copy, as the filters above give a slice of the file
+                df = df.copy()
+                minutes = (df[period].values.astype(np.int64) *
+                           30).astype('timedelta64[m]')
+                df[date_time] = dates + minutes
 
             else:
                 raise Exception("Either date_period or trading_period_id must be \
                 set to True")
 
+    if begin_date is not None and date_time in df.columns:
+        df = df[(df[date_time] >= pd.Timestamp(begin_date)).values]
+
     if date_time_index:
         df.index = df[date_time]
 
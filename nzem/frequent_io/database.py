@@ -0,0 +1,245 @@
+"""
+Pooled database access returning DataFrames
+
+Connections are kept in a pool per database so repeated queries don't pay
+the cost of connecting each time. Results are streamed from the database
+in chunks, with Postgres a named (server side) cursor is used so the rows
+stay on the server until they are fetched, and either yielded as
+DataFrames or written directly into typed NumPy arrays.
+
+Two backends are supported:
+postgres: via psycopg2, parameters use the %s placeholder
+sqlite: via the standard library, parameters use the ? placeholder.
+        Allows everything to be run locally against a file database.
+"""
+
+# Standard Library
+import sqlite3
+import itertools
+import threading
+import Queue
+from contextlib import contextmanager
+
+# C Dependency
+import pandas as pd
+import numpy as np
+
+try:
+    import psycopg2 as psy
+except ImportError:
+    psy = None
+
+
+PLACEHOLDERS = {'postgres': '%s', 'sqlite': '?'}
+
+_POOLS = {}
+_POOLS_LOCK = threading.Lock()
+_CURSOR_IDS = itertools.count()
+
+
+class ConnectionPool(object):
+    """ A pool of connections to a single database
+
+    Usage
+    -----
+    >>>> pool = ConnectionPool("sqlite", database="/home/nigel/data/nzem.db")
+    >>>> with pool.connection() as conn:
+    >>>>     conn.execute("SELECT 1")
+    """
+
+    def __init__(self, backend="postgres", maxsize=4, **kargs):
+        """ Create a pool, connections are opened as they are needed
+
+        Parameters
+        ----------
+        backend: string, default "postgres"
+            Either "postgres" or "sqlite"
+        maxsize: int, default 4
+            The maximum number of idle connections kept open
+        **kargs:
+            Passed to the connect function of the backend, e.g.
+            dbname, user, password for postgres or database for sqlite
+
+        """
+
+        super(ConnectionPool, self).__init__()
+
+        if backend not in PLACEHOLDERS:
+            raise ValueError("backend must be one of %s" % PLACEHOLDERS.keys())
+        if backend == "postgres" and psy is None:
+            raise ImportError("psycopg2 is required for the postgres backend")
+
+        self.backend = backend
+        self.kargs = kargs
+        self.idle = Queue.Queue(maxsize)
+
+    @property
+    def placeholder(self):
+        return PLACEHOLDERS[self.backend]
+
+    def connect(self):
+        """ Open a new connection to the database """
+
+        if self.backend == "sqlite":
+            return sqlite3.connect(check_same_thread=False, **self.kargs)
+        return psy.connect(**self.kargs)
+
+    @contextmanager
+    def connection(self):
+        """ Borrow a connection, it is returned to the pool afterwards.
+        Any transaction left open is committed, or rolled back on error.
+        """
+
+        try:
+            conn = self.idle.get_nowait()
+        except Queue.Empty:
+            conn = self.connect()
+
+        try:
+            yield conn
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            conn.close()
+            raise
+
+        try:
+            self.idle.put_nowait(conn)
+        except Queue.Full:
+            conn.close()
+
+    def close(self):
+        """ Close all of the idle connections """
+
+        while True:
+            try:
+                self.idle.get_nowait().close()
+            except Queue.Empty:
+                break
+
+
+def get_pool(backend="postgres", **kargs):
+    """ Return the shared pool for a database, creating it on first use """
+
+    key = (backend, tuple(sorted(kargs.items())))
+    with _POOLS_LOCK:
+        if key not in _POOLS:
+            _POOLS[key] = ConnectionPool(backend, **kargs)
+        return _POOLS[key]
+
+
+def query_chunks(SQL, params=None, chunksize=50000, pool=None):
+    """ Execute a query and yield the result as DataFrames of at most
+    chunksize rows. At least one (possibly empty) DataFrame is yielded.
+
+    Parameters
+    ----------
+    SQL: string
+        The query, use the placeholder of the backend for parameters
+    params: tuple, default None
+        The query parameters
+    chunksize: int, default 50000
+        The number of rows in each DataFrame
+    pool: ConnectionPool
+        The pool to borrow a connection from
+
+    Returns
+    -------
+    chunks: generator
+        A generator of DataFrames
+
+    """
+
+    with _cursor(pool, chunksize) as curs:
+        _execute(curs, SQL, params)
+
+        # Server side cursors only describe the result after a fetch
+        rows = curs.fetchmany(chunksize)
+        headers = [desc[0] for desc in curs.description]
+
+        if not rows:
+            yield pd.DataFrame(columns=headers)
+
+        while rows:
+            yield pd.DataFrame.from_records(rows, columns=headers)
+            rows = curs.fetchmany(chunksize)
+
+
+def query_frame(SQL, params=None, chunksize=50000, pool=None):
+    """ Execute a query and return the whole result as a single DataFrame """
+
+    chunks = list(query_chunks(SQL, params=params, chunksize=chunksize,
+                               pool=pool))
+    if len(chunks) == 1:
+        return chunks[0]
+    return pd.concat(chunks, ignore_index=True)
+
+
+def query_arrays(SQL, dtypes, params=None, chunksize=50000, pool=None):
+    """ Execute a query filling typed NumPy arrays directly from the rows,
+    without building intermediate DataFrames.
+
+    Parameters
+    ----------
+    SQL: string
+        The query
+    dtypes: dict
+        The NumPy dtype of each column returned, e.g. {"PRICE": "f8"}.
+        Columns not given are returned as object arrays
+    params: tuple, default None
+        The query parameters
+    chunksize: int, default 50000
+        The number of rows fetched at once, the arrays grow by this amount
+
+    Returns
+    -------
+    arrays: dict
+        A NumPy array for each column
+
+    """
+
+    with _cursor(pool, chunksize) as curs:
+        _execute(curs, SQL, params)
+
+        rows = curs.fetchmany(chunksize)
+        headers = [desc[0] for desc in curs.description]
+        record = np.dtype([(str(h), dtypes.get(h, object)) for h in headers])
+
+        filled = 0
+        data = np.empty(chunksize, dtype=record)
+        while rows:
+            if filled + len(rows) > len(data):
+                data = np.resize(data, max(2 * len(data), filled + len(rows)))
+            data[filled:filled + len(rows)] = rows
+            filled += len(rows)
+            rows = curs.fetchmany(chunksize)
+
+    data = data[:filled]
+    return dict((h, data[str(h)].copy()) for h in headers)
+
+
+def _execute(curs, SQL, params):
+    """ Execute without a parameter sequence when there are no parameters,
+    psycopg2 would otherwise treat a literal % in the SQL as a placeholder
+    """
+
+    if params is None:
+        curs.execute(SQL)
+    else:
+        curs.execute(SQL, params)
+
+
+@contextmanager
+def _cursor(pool, chunksize):
+    """ A cursor on a pooled connection, server side for postgres """
+
+    with pool.connection() as conn:
+        if pool.backend == "postgres":
+            curs = conn.cursor(name="nzem_%d" % next(_CURSOR_IDS))
+            curs.itersize = chunksize
+        else:
+            curs = conn.cursor()
+        try:
+            yield curs
+        finally:
+            curs.close()
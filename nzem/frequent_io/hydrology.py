@@ -0,0 +1,127 @@
+"""
+Loading of the NIWA hydrology files (lake storage and inflows)
+
+The NIWA dates are parsed with the vectorized parse_niwa_dates, the value
+columns are converted to floats and the parsed file is kept in a
+ColumnarStore so it is only parsed again when the file changes. Several
+files (e.g. one per lake, or storage and inflows) can be loaded at once.
+"""
+
+# Standard Library
+import os
+
+# Non C Dependency
+import simplejson as json
+
+# C Dependency
+import pandas as pd
+import numpy as np
+
+from nzem.frequent_io.data_import import NZEM_DATA_FOLDER, parse_niwa_dates
+from nzem.frequent_io.columnar import ColumnarStore
+
+HYDRO_STORE = os.path.join(NZEM_DATA_FOLDER, "hydro_store")
+
+HYDRO_FILES = {"storage": 'hydro_data/Hydro_Lake_Data.csv',
+               "inflow": 'hydro_data/Hydro_Inflow_Data.csv'}
+
+
+def load_hydrology(csv_names="storage", lakes=None, lake="Lake",
+                   date="Trading Date", date_time="Date Time",
+                   begin_date=None, end_date=None, cache=True, store=None):
+    """
+    Load one or more NIWA hydrology files
+
+    Parameters
+    ----------
+    csv_names : A kind in HYDRO_FILES ("storage" or "inflow"), a file name
+                (absolute or relative to the data folder) or a list of these
+    lakes : Only keep the rows of these lakes
+    lake : Column name of the lake, files without it are kept whole
+    date : Column name of the NIWA date
+    date_time : The name of the datetime index
+    begin_date : The first date to keep
+    end_date : The last date to keep
+    cache : Whether to read and write the parsed files from the store
+    store : The root folder of the parsed files, defaults to HYDRO_STORE
+
+    Returns
+    -------
+    df : The data with title cased float columns and a datetime index,
+         files are concatenated in the order given
+    """
+
+    if isinstance(csv_names, basestring):
+        csv_names = [csv_names]
+
+    frames = []
+    for csv_name in csv_names:
+        fname = _hydro_path(HYDRO_FILES.get(csv_name, csv_name))
+        df = _load_hydro_file(fname, date=date, date_time=date_time,
+                              cache=cache, store=store or HYDRO_STORE)
+
+        mask = np.ones(len(df), dtype=bool)
+        if lakes is not None and lake in df.columns:
+            mask &= df[lake].isin(lakes).values
+        if begin_date is not None:
+            mask &= np.asarray(df.index >= pd.Timestamp(begin_date))
+        if end_date is not None:
+            mask &= np.asarray(df.index <= pd.Timestamp(end_date))
+        frames.append(df[mask])
+
+    if len(frames) == 1:
+        return frames[0]
+    return pd.concat(frames)
+
+
+def _hydro_path(csv_name):
+    if os.path.exists(csv_name):
+        return os.path.abspath(csv_name)
+    if os.path.exists(os.path.join(NZEM_DATA_FOLDER, csv_name)):
+        return os.path.abspath(os.path.join(NZEM_DATA_FOLDER, csv_name))
+    raise Exception("%s is not a valid file name" % csv_name)
+
+
+def _load_hydro_file(fname, date="Trading Date", date_time="Date Time",
+                     cache=True, store=HYDRO_STORE):
+    """ Parse a NIWA file, or read it from the store if it is unchanged """
+
+    name = os.path.splitext(os.path.basename(fname))[0]
+    store = ColumnarStore(os.path.join(store, name), partition='Y')
+    version = [fname, os.path.getsize(fname), os.path.getmtime(fname)]
+
+    version_name = os.path.join(store.path, '_source.json')
+    if cache and os.path.exists(version_name):
+        with open(version_name) as f:
+            if json.load(f) == version:
+                return store.read()
+
+    df = pd.read_csv(fname, thousands=',')
+    dates = parse_niwa_dates(df[date].values)
+    df = df.drop(date, axis=1)
+
+    for col in df.columns:
+        if df[col].dtype == object:
+            try:
+                df[col] = df[col].astype(np.float64)
+            except ValueError:
+                pass
+        elif df[col].dtype != np.float64:
+            df[col] = df[col].astype(np.float64)
+
+    df.index = pd.DatetimeIndex(dates, name=date_time)
+    parsed = np.asarray(pd.notnull(df.index))
+    if not parsed.all():
+        print "Dropped %d rows of %s with unparseable dates" % (
+            (~parsed).sum(), fname)
+    df = df[parsed]
+    df = df.rename(columns={x: x.replace('_', ' ').title() for x in
+                            df.columns}).sort_index()
+
+    if cache:
+        store.drop()
+        store.write(df)
+        with open(version_name, 'w') as f:
+            json.dump(version, f)
+
+    return df
@@ -3,11 +3,39 @@ when beginning a new analysis
 
 """
 
+# Standard Library
+import os
+from multiprocessing.pool import ThreadPool
+
+# Non C Dependency
+import simplejson as json
+
+# C Dependency
 import pandas as pd
 import numpy as np
-import nzem
 
-def load_masterset():
+from nzem.wits.demand import load_demand, demand_store
+from nzem.frequent_io.data_import import load_csvfile, NZEM_DATA_FOLDER
+from nzem.frequent_io.columnar import ColumnarStore
+from nzem.frequent_io.alignment import asof_align
+from nzem.frequent_io.hydrology import load_hydrology
+
+MASTERSET_STORE = os.path.join(NZEM_DATA_FOLDER, "master_set")
+
+# Name: (file relative to the data folder, load_csvfile keyword arguments)
+MASTERSET_SOURCES = {
+    "energy_prices": ("Nodal_Pricing_Five_Node.csv", {"date_period": True}),
+    "reserve_prices": ("reserve_prices.csv", {"trading_period_id": True}),
+    "hydro_data": ('hydro_data/Hydro_Lake_Data.csv', {"niwa_date": True}),
+    "inflow_data": ('hydro_data/Hydro_Inflow_Data.csv', {"niwa_date": True})}
+
+# Used for the demand when the demand store holds nothing for the range
+DEMAND_FALLBACK = ("island_demand_data.csv", {"date_period": True})
+
+FIVE_NODES = ("HAY2201", "BEN2201", "SFD2201", "HLY2201", "OTA2201")
+
+
+def load_masterset(cache=True, store=None, threads=5):
     """ Load a master dataset will return a merged DataFrame containing the
     following information time alligned:
     
@@ -16,107 +44,338 @@ def load_masterset():
     3. Hydro Lake Storage
     4. Hydro Inflow Levels
     5. National Demand
+
+    The five sources are loaded concurrently, the half hourly sources are
+    joined on their index in a single outer join and the daily hydro data is
+    aligned onto that index as of each trading period. The result is cached
+    on disk and reused until one of the source files (or the demand store)
+    changes.
+
+    Parameters
+    ----------
+    cache : Whether to read and write the cached master set
+    store : The path of the cache, defaults to MASTERSET_STORE
+    threads : The number of sources loaded at once
+
+    Returns
+    -------
+    md : The master set indexed by "Date Time"
     """
+
+    store = ColumnarStore(store or MASTERSET_STORE, partition='M')
+    versions = masterset_versions() if cache else None
+
+    if cache and _cached_versions(store) == versions:
+        return store.read()
+
+    frames = _load_sources(threads=threads)
+    md = _build_masterset(frames)
+
+    if cache:
+        store.drop()
+        store.write(md)
+        _save_versions(store, versions)
+        _save_marks(store, _source_marks(frames))
     
-    # Apply the masks to the dataframes and series
-    pd.DataFrame = nzem.apply_masks()
-    pd.Series = nzem.apply_series_masks()
-    
-    # Load the five current datasets
-    energy_prices = nzem.load_csvfile("Nodal_Pricing_Five_Node.csv", 
-                                  date_period=True)
-    reserve_prices = nzem.load_csvfile("reserve_prices.csv",
-                                  trading_period_id=True)
-    hydro_data = nzem.load_csvfile('hydro_data/Hydro_Lake_Data.csv',
-                                   niwa_date=True)
-    inflow_data = nzem.load_csvfile('hydro_data/Hydro_Inflow_Data.csv',
-                                    niwa_date=True)
-    demand_data = nzem.load_csvfile('island_demand_data.csv', date_period=True)
-    
+    return md
+
+
+def append_masterset(store=None, threads=5):
+    """ Extend the cached master set with the trading periods added to the
+    sources since it was last built or appended to.
+
+    The last period loaded from each source is kept as its high-water mark.
+    The sources are loaded from the earliest mark on, so periods a lagging
+    source had not yet published when the set was last extended are filled
+    in, and the derived columns (e.g. "Island Price Split") are computed for
+    those rows only. The rows after the earliest mark are upserted into the
+    monthly partitions of the cache. If there is no cached master set it is
+    built in full.
+
+    Parameters
+    ----------
+    store : The path of the cache, defaults to MASTERSET_STORE
+    threads : The number of sources loaded at once
+
+    Returns
+    -------
+    new_rows : The rows added to or updated in the master set
+    """
+
+    store = ColumnarStore(store or MASTERSET_STORE, partition='M')
+    versions = masterset_versions()
+
+    last = store.last_index()
+    if last is None:
+        return load_masterset(cache=True, store=store.path, threads=threads)
+
+    # Sets cached without marks are extended from their last period
+    marks = _cached_marks(store) or {}
+    begin = min(marks.values()) if marks else last
+
+    frames = _load_sources(threads=threads, begin_date=begin)
+    md = _build_masterset(frames)
+    md = md[md.index > begin]
+
+    if len(md):
+        store.write(md)
+    _save_versions(store, versions)
+    _save_marks(store, _source_marks(frames, marks))
+
+    return md
+
+
+def _load_sources(threads=5, begin_date=None):
+    """ Load the five master set sources concurrently, from begin_date on """
+
+    # Daily hydro values apply to every period of their day
+    day = pd.Timestamp(begin_date).normalize() if begin_date else None
+    begins = {"hydro_data": day, "inflow_data": day}
+
+    names = sorted(MASTERSET_SOURCES) + ["demand_data"]
+
+    def load(name):
+        return _load_source(name, begins.get(name, begin_date))
+
+    pool = ThreadPool(threads)
+    try:
+        return dict(zip(names, pool.map(load, names)))
+    finally:
+        pool.close()
+        pool.join()
+
+
+def _build_masterset(frames):
+    """ Columnise, resample and join the loaded sources """
+
     # Columnise the price data
-    all_res_prices = columnise_res_prices(reserve_prices)
-    all_en_prices = columnise_energy_prices(energy_prices)
-    
-    # Resample the hydro data
-    hd = hydro_data["Daily Stored"].resample('30Min', fill_method='ffill')
-    ind = inflow_data["Daily Inflow"].resample('30Min', fill_method='ffill')
+    all_res_prices = columnise_res_prices(frames["reserve_prices"])
+    all_en_prices = columnise_energy_prices(frames["energy_prices"])
     
     # Nationalise the demand data
-    nat_demand = demand_data.groupby(lambda x:x)["Demand Sum"].sum()
+    nat_demand = frames["demand_data"].groupby(level=0)["Demand Sum"].sum()
     nat_demand.name = "National Demand"
     
-    # Merge all of the datasets
-    
-    md = all_en_prices.merge(all_res_prices, left_index=True, right_index=True)
-    md = nzem.merge_dfseries(md, hd, left_index=True)
-    md = nzem.merge_dfseries(md, ind, left_index=True)
-    md = nzem.merge_dfseries(md, nat_demand, left_index=True)
-    
+    # Merge all of the half hourly datasets
+    md = pd.concat([all_en_prices, all_res_prices, nat_demand], axis=1)
+
+    # Align the daily hydro data, each day applies to the periods of that day
+    # and days which are not yet published (or not loaded at all) are NaN
+    for name, column in (("hydro_data", "Daily Stored"),
+                         ("inflow_data", "Daily Inflow")):
+        md[column] = asof_align(frames[name][column], md.index,
+                                tolerance=np.timedelta64(1, 'D'))
+
+    md.index.name = "Date Time"
+
     return md
 
+
+def masterset_versions():
+    """ The path, size and modification time of each master set source, the
+    cached master set is valid while these are unchanged.
+    """
+
+    versions = {}
+    for name, (fname, kargs) in MASTERSET_SOURCES.items():
+        path = _source_path(fname)
+        versions[name] = [path, os.path.getsize(path), os.path.getmtime(path)]
+
+    # The demand store schema is rewritten by every write to the store
+    schema = demand_store().schema_name
+    if os.path.exists(schema):
+        versions["demand_data"] = [schema, os.path.getmtime(schema)]
+    else:
+        path = _source_path(DEMAND_FALLBACK[0])
+        versions["demand_data"] = [path, os.path.getmtime(path)
+                                   if os.path.exists(path) else None]
+    return versions
+
+
+def _load_source(name, begin_date=None):
+    if name == "demand_data":
+        return _load_demand(begin_date=begin_date)
+    fname, kargs = MASTERSET_SOURCES[name]
+    if kargs.get("niwa_date"):
+        return load_hydrology(_source_path(fname), begin_date=begin_date)
+    return load_csvfile(_source_path(fname), begin_date=begin_date, **kargs)
+
+
+def _load_demand(begin_date=None):
+    """ Island demand from the demand store, or from the island demand file
+    if the store has nothing from begin_date on (e.g. it is not yet built)
+    """
+
+    demand = load_demand(begin_date=begin_date)
+    if len(demand):
+        return demand
+
+    fname, kargs = DEMAND_FALLBACK
+    path = _source_path(fname)
+    if not os.path.exists(path):
+        raise ValueError("The demand store has no data from %s and %s does "
+                         "not exist" % (begin_date, path))
+    return load_csvfile(path, begin_date=begin_date, **kargs)
+
+
+def _source_path(fname):
+    return os.path.abspath(os.path.join(NZEM_DATA_FOLDER, fname))
+
+
+def _cached_versions(store):
+    fname = os.path.join(store.path, '_versions.json')
+    if not os.path.exists(fname):
+        return None
+    with open(fname) as f:
+        return json.load(f)
+
+
+def _save_versions(store, versions):
+    with open(os.path.join(store.path, '_versions.json'), 'w') as f:
+        json.dump(versions, f)
+
+
+def _source_marks(frames, marks=None):
+    """ The last period of each loaded source, sources which loaded nothing
+    keep their previous mark
+    """
+
+    marks = dict(marks or {})
+    for name, df in frames.items():
+        if len(df):
+            last = df.index.max()
+            marks[name] = max(last, marks[name]) if name in marks else last
+    return marks
+
+
+def _cached_marks(store):
+    fname = os.path.join(store.path, '_marks.json')
+    if not os.path.exists(fname):
+        return None
+    with open(fname) as f:
+        return {k: pd.Timestamp(v) for k, v in json.load(f).items()}
+
+
+def _save_marks(store, marks):
+    with open(os.path.join(store.path, '_marks.json'), 'w') as f:
+        json.dump({k: v.isoformat() for k, v in marks.items()}, f)
+
+
 def columnise_res_prices(df, island_price=True, islandid="Island Id",
-    longname=False):
+    longname=False, reserve_type="Reserve Type", price="Price Sum"):
     """ 
-    Columnise the reserve price dataframe
+    Columnise the reserve price dataframe into an "NI FIR Price",
+    "NI SIR Price", "SI FIR Price" and "SI SIR Price" column per period
     """
     
     if longname:
-        ni = "North Island"
-        si = "South Island"
+        islands = {"North Island": "NI", "South Island": "SI"}
     else:
-        ni = "NI"
-        si = "SI"
-    
-    # Split them
-    nif = df.eq_mask("Reserve Type", "F").eq_mask(islandid, ni)
-    nis = df.eq_mask("Reserve Type", "S").eq_mask(islandid, ni)
-    sif = df.eq_mask("Reserve Type", "F").eq_mask(islandid, si)
-    sis = df.eq_mask("Reserve Type", "S").eq_mask(islandid, si)
-    
-    # Rename columns
-    nif = nif.rename(columns={"Price Sum": "NI FIR Price"})
-    nis = nis.rename(columns={"Price Sum": "NI SIR Price"})
-    sif = sif.rename(columns={"Price Sum": "SI FIR Price"})
-    sis = sis.rename(columns={"Price Sum": "SI SIR Price"})
-    
-    # Remerge them back together
-    
-    mdf = nzem.merge_series(nif["NI FIR Price"], nis["NI SIR Price"])
-    mdf = nzem.merge_dfseries(mdf, sif["SI FIR Price"], left_index=True)
-    mdf = nzem.merge_dfseries(mdf, sis["SI SIR Price"], left_index=True)
+        islands = {"NI": "NI", "SI": "SI"}
     
+    names = df[islandid].map(islands) + " " + \
+        df[reserve_type].map({"F": "FIR", "S": "SIR"}) + " Price"
+
+    order = ["NI FIR Price", "NI SIR Price", "SI FIR Price", "SI SIR Price"]
+    mdf = pivot_prices(df, names.values, df[price].values, order=order)
+
     if island_price:
-        mdf["NI Reserve Price"] = mdf["NI FIR Price"] + mdf["NI SIR Price"]
-        mdf["SI Reserve Price"] = mdf["SI FIR Price"] + mdf["SI SIR Price"]
+        mdf = add_spreads(mdf, {"NI Reserve Price": ("NI FIR Price",
+                                                     "NI SIR Price"),
+                                "SI Reserve Price": ("SI FIR Price",
+                                                     "SI SIR Price")},
+                          how="sum")
     
     return mdf
-    
-def columnise_energy_prices(df, island_split=True):
+
+
+def columnise_energy_prices(df, island_split=True, nodes=FIVE_NODES,
+                            node="Bus Id", price="Price Sum", spreads=None):
     """
-    Columnise the energy price dataframe
+    Columnise the energy price dataframe into a "<Node> Price" column per
+    node, indexed by period
+
+    Parameters
+    ----------
+    df : Long price frame with a datetime index
+    island_split : Add the "Island Price Split" (HAY2201 - BEN2201), only
+                   if both nodes are in the frame
+    nodes : The nodes to keep, None keeps every node in the frame
+    node : Column name of the node
+    price : Column name of the price
+    spreads : Further {name: (node, node)} price differences to add
+
+    Returns
+    -------
+    mdf : A period by node DataFrame
     """
-    
-    # Separate the columns
-    hay = df.eq_mask("Bus Id", "HAY2201")
-    ben = df.eq_mask("Bus Id", "BEN2201")
-    sfd = df.eq_mask("Bus Id", "SFD2201")
-    hly = df.eq_mask("Bus Id", "HLY2201")
-    ota = df.eq_mask("Bus Id", "OTA2201")
-    
-    # Rename the columns
-    hay = hay.rename(columns={"Price Sum": "HAY2201 Price"})
-    ben = ben.rename(columns={"Price Sum": "BEN2201 Price"})
-    sfd = sfd.rename(columns={"Price Sum": "SFD2201 Price"})
-    hly = hly.rename(columns={"Price Sum": "HLY2201 Price"})
-    ota = ota.rename(columns={"Price Sum": "OTA2201 Price"})
-    
-    # Remerge them
-    mdf = nzem.merge_series(hay["HAY2201 Price"], ben["BEN2201 Price"])
-    mdf = nzem.merge_dfseries(mdf, sfd["SFD2201 Price"], left_index=True)
-    mdf = nzem.merge_dfseries(mdf, hly["HLY2201 Price"], left_index=True)
-    mdf = nzem.merge_dfseries(mdf, ota["OTA2201 Price"], left_index=True)
-    
-    if island_split:
-        mdf["Island Price Split"] = mdf["HAY2201 Price"] - mdf["BEN2201 Price"]
+
+    order = [n + " Price" for n in nodes] if nodes is not None else None
+    mdf = pivot_prices(df, (df[node] + " Price").values, df[price].values,
+                       order=order)
+
+    spreads = dict((name, (a + " Price", b + " Price")) for name, (a, b)
+                   in (spreads or {}).items())
+    split = ("HAY2201 Price", "BEN2201 Price")
+    if island_split and all(x in mdf.columns for x in split):
+        spreads["Island Price Split"] = split
+
+    if spreads:
+        mdf = add_spreads(mdf, spreads)
         
     return mdf
+
+
+def pivot_prices(df, columns, values, order=None):
+    """ Pivot a long frame to a wide one in a single pass, each row of df
+    sets the value of its index and column. Where an index and column
+    appear more than once the last row is kept.
+
+    Parameters
+    ----------
+    df : Long frame, its index becomes the index of the result
+    columns : Array of the column name of each row
+    values : Array of the value of each row
+    order : The columns of the result, rows for any other column are
+            dropped. Defaults to every column in sorted order
+
+    Returns
+    -------
+    wide : DataFrame of the values, NaN where there was no row
+    """
+
+    index, rows = np.unique(np.asarray(df.index), return_inverse=True)
+
+    if order is None:
+        order, cols = np.unique(columns, return_inverse=True)
+    else:
+        cols = pd.Index(order).get_indexer(columns)
+        known = cols >= 0
+        rows, values, cols = rows[known], values[known], cols[known]
+
+    matrix = np.empty((len(index), len(order)))
+    matrix.fill(np.nan)
+    matrix[rows, cols] = values
+
+    return pd.DataFrame(matrix, index=pd.Index(index, name=df.index.name),
+                        columns=list(order))
+
+
+def add_spreads(mdf, spreads, how="difference"):
+    """ Add {name: (column, column)} differences (or sums) of the columns of
+    a wide frame, computed together on the underlying array
+    """
+
+    names = sorted(spreads)
+    left = mdf.columns.get_indexer([spreads[n][0] for n in names])
+    right = mdf.columns.get_indexer([spreads[n][1] for n in names])
+    if (left < 0).any() or (right < 0).any():
+        raise KeyError("Spread columns must be in the frame")
+
+    values = mdf.values
+    if how == "sum":
+        derived = values[:, left] + values[:, right]
+    else:
+        derived = values[:, left] - values[:, right]
+
+    return mdf.join(pd.DataFrame(derived, index=mdf.index, columns=names))
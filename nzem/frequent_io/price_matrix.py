@@ -0,0 +1,247 @@
+"""
+A memory mapped trading period by node matrix of nodal prices.
+
+Prices are kept as a single float32 array on disk, one row per half hour
+on a regular grid and one column per node, along with a small metadata
+file holding the first period and the node names. The row of a period is
+computed from its time so writing a price file is a vectorized scatter,
+and as the array is memory mapped a period's cross section (a row) or a
+node's history (a column) is a view of the file rather than a copy.
+
+Layout
+------
+matrix/
+    meta.json
+    prices.f32
+"""
+
+# Standard Library
+import os
+
+# Non C Dependency
+import simplejson as json
+
+# C Dependency
+import pandas as pd
+import numpy as np
+
+from nzem.frequent_io.data_import import load_csvfile
+
+
+class PriceMatrix(object):
+    """ A period by node price matrix on disk
+
+    Usage
+    -----
+    >>>> pm = PriceMatrix.create('/home/nigel/data/price_matrix',
+    >>>>                         "2004-01-01", "2013-12-31", nodes)
+    >>>> pm.write(load_csvfile("final_prices_201307.csv", date_period=True))
+    >>>> pm.node("HAY2201")
+    >>>> pm.period("2013-07-01 18:00")
+    """
+
+    def __init__(self, path, mode='r'):
+        """ Open an existing matrix
+
+        Parameters
+        ----------
+        path: string
+            The directory of the matrix
+        mode: string, default 'r'
+            'r' to read, 'r+' to write prices
+
+        """
+
+        super(PriceMatrix, self).__init__()
+
+        self.path = path
+        self.mode = mode
+
+        with open(os.path.join(path, 'meta.json')) as f:
+            self.meta = json.load(f)
+
+        self.begin = pd.Timestamp(self.meta['begin'])
+        self.freq = np.timedelta64(self.meta['minutes'], 'm')
+        self.nodes = pd.Index(self.meta['nodes'], name="Node")
+        self.values = np.memmap(self.fname, dtype=np.float32, mode=mode,
+                                shape=(self.meta['periods'], len(self.nodes)))
+
+    @classmethod
+    def create(cls, path, begin_date, end_date, nodes, minutes=30):
+        """ Create a matrix covering begin_date to end_date filled with NaN
+
+        Parameters
+        ----------
+        path: string
+            The directory of the matrix, created if needed
+        begin_date: string, datetime
+            The first period (e.g. 00:30 of the first trading day)
+        end_date: string, datetime
+            The last period
+        nodes: list
+            The node names, the columns of the matrix
+        minutes: int, default 30
+            The length of a period
+
+        Returns
+        -------
+        matrix: PriceMatrix
+            Opened for writing
+
+        """
+
+        begin = pd.Timestamp(begin_date)
+        periods = _periods_between(begin, pd.Timestamp(end_date), minutes) + 1
+
+        if not os.path.exists(path):
+            os.makedirs(path)
+
+        meta = {'begin': begin.isoformat(), 'minutes': minutes,
+                'periods': periods, 'nodes': list(nodes)}
+        with open(os.path.join(path, 'meta.json'), 'w') as f:
+            json.dump(meta, f)
+
+        values = np.memmap(os.path.join(path, 'prices.f32'), dtype=np.float32,
+                           mode='w+', shape=(periods, len(nodes)))
+        values[:] = np.nan
+        values.flush()
+        del values
+
+        return cls(path, mode='r+')
+
+    @property
+    def fname(self):
+        return os.path.join(self.path, 'prices.f32')
+
+    @property
+    def index(self):
+        return pd.date_range(self.begin, periods=len(self.values),
+                             freq='%dMin' % self.meta['minutes'],
+                             name="Date Time")
+
+    @property
+    def shape(self):
+        return self.values.shape
+
+    def rows(self, index):
+        """ The row of each value of a datetime index, -1 if off the grid """
+
+        delta = np.asarray(index, dtype='datetime64[ns]') - \
+            np.datetime64(self.begin.value, 'ns')
+        step = self.freq.astype('timedelta64[ns]').astype(np.int64)
+        delta = delta.astype(np.int64)
+
+        rows = delta // step
+        rows[(delta % step != 0) | (rows < 0) |
+             (rows >= len(self.values))] = -1
+        return rows
+
+    def write(self, df, node="Node", price="Price"):
+        """ Write a long price frame (datetime index, node and price columns)
+        into the matrix. Where a period and node appear more than once the
+        last row is kept.
+
+        Returns
+        -------
+        skipped: int
+            The number of rows outside the matrix or for unknown nodes
+        """
+
+        rows = self.rows(df.index)
+        cols = self.nodes.get_indexer(df[node].values)
+        keep = (rows >= 0) & (cols >= 0)
+        rows, cols = rows[keep], cols[keep]
+        prices = df[price].values[keep].astype(np.float32)
+
+        # The position of the last row of each period and node
+        cells = rows * len(self.nodes) + cols
+        last = len(cells) - 1 - np.unique(cells[::-1], return_index=True)[1]
+
+        self.values[rows[last], cols[last]] = prices[last]
+        return int((~keep).sum())
+
+    def flush(self):
+        self.values.flush()
+
+    def node(self, name, begin_date=None, end_date=None):
+        """ The price history of a node, a view of the matrix """
+
+        rows = self._row_slice(begin_date, end_date)
+        return pd.Series(self.values[rows, self.nodes.get_loc(name)],
+                         index=self.index[rows], name=name)
+
+    def period(self, date_time):
+        """ The prices of every node in a period, a view of the matrix """
+
+        row = self.rows([pd.Timestamp(date_time)])[0]
+        if row < 0:
+            raise KeyError("%s is not a period of the matrix" % date_time)
+        return pd.Series(self.values[row], index=self.nodes,
+                         name=pd.Timestamp(date_time))
+
+    def frame(self, begin_date=None, end_date=None, nodes=None):
+        """ A wide DataFrame of a date range and (optionally) some nodes,
+        a view unless nodes are selected.
+        """
+
+        rows = self._row_slice(begin_date, end_date)
+        values = self.values[rows]
+        columns = self.nodes
+        if nodes is not None:
+            cols = self.nodes.get_indexer(nodes)
+            if (cols < 0).any():
+                raise KeyError("Nodes not in the matrix")
+            values = values[:, cols]
+            columns = self.nodes[cols]
+
+        return pd.DataFrame(values, index=self.index[rows], columns=columns)
+
+    def _row_slice(self, begin_date, end_date):
+        start, stop = 0, len(self.values)
+        if begin_date is not None:
+            start = max(_periods_between(self.begin, pd.Timestamp(begin_date),
+                                         self.meta['minutes'], ceil=True), 0)
+        if end_date is not None:
+            stop = min(_periods_between(self.begin, pd.Timestamp(end_date),
+                                        self.meta['minutes']) + 1, stop)
+        return slice(start, max(start, stop))
+
+
+def build_price_matrix(path, csv_names, nodes, begin_date, end_date,
+                       node="Node", price="Price", **kargs):
+    """ Create a price matrix and fill it one price file at a time, so only
+    a single file is ever held in memory as a DataFrame.
+
+    Parameters
+    ----------
+    path: string
+        The directory of the matrix
+    csv_names: list
+        The final price files to load
+    nodes: list
+        The nodes to keep
+    begin_date, end_date: string, datetime
+        The first and last periods of the matrix
+    node, price: string
+        The (title cased) column names of the node and price
+    **kargs:
+        Passed to load_csvfile, defaults to date_period=True
+
+    Returns
+    -------
+    matrix: PriceMatrix
+
+    """
+
+    kargs.setdefault("date_period", True)
+    matrix = PriceMatrix.create(path, begin_date, end_date, nodes)
+    for csv_name in csv_names:
+        matrix.write(load_csvfile(csv_name, **kargs), node=node, price=price)
+    matrix.flush()
+    return matrix
+
+
+def _periods_between(begin, end, minutes, ceil=False):
+    step = minutes * 60 * 10 ** 9
+    delta = end.value - begin.value
+    return -(-delta // step) if ceil else delta // step
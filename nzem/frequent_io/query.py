@@ -0,0 +1,79 @@
+"""
+Filtering of DataFrames by a conjunction of predicates
+
+Each predicate is a (column, operator, value) tuple, all of them are
+evaluated into a single boolean mask which is applied to the frame once,
+rather than chaining masks which copy the frame at every step. Equality
+tests against a categorical column compare its integer codes.
+
+Usage
+-----
+>>>> select(offers, [("Trading Date", ">=", begin_date),
+>>>>                 ("Trading Date", "<=", end_date),
+>>>>                 ("Island", "==", "North Island"),
+>>>>                 ("Max", ">", 0)])
+"""
+
+# Standard Library
+import operator
+
+# C Dependency
+import numpy as np
+
+
+OPERATORS = {"==": operator.eq, "!=": operator.ne,
+             ">": operator.gt, ">=": operator.ge,
+             "<": operator.lt, "<=": operator.le}
+
+
+def mask(df, predicates):
+    """ Evaluate a conjunction of predicates into a boolean array
+
+    Parameters
+    ----------
+    df: DataFrame
+        The frame to filter
+    predicates: list, dict
+        (column, operator, value) tuples, the operator one of "==", "!=",
+        ">", ">=", "<", "<=", "in" or "not in". A dict of {column: value}
+        is treated as equality predicates
+
+    Returns
+    -------
+    mask: array
+        True for the rows satisfying every predicate
+
+    """
+
+    if isinstance(predicates, dict):
+        predicates = [(col, "==", value) for col, value in predicates.items()]
+
+    result = np.ones(len(df), dtype=bool)
+    for column, op, value in predicates:
+        result &= _evaluate(df[column], op, value)
+    return result
+
+
+def select(df, predicates):
+    """ The rows of df satisfying every predicate, see mask """
+
+    if not len(predicates):
+        return df
+    return df[mask(df, predicates)]
+
+
+def _evaluate(series, op, value):
+    if op in ("in", "not in"):
+        result = np.asarray(series.isin(list(value)))
+        return ~result if op == "not in" else result
+
+    if op not in OPERATORS:
+        raise ValueError("Unknown operator %s" % op)
+
+    if op in ("==", "!=") and str(series.dtype) == "category":
+        categories = series.cat.categories
+        codes = np.asarray(series.cat.codes)
+        code = categories.get_loc(value) if value in categories else -2
+        return OPERATORS[op](codes, code)
+
+    return np.asarray(OPERATORS[op](series, value), dtype=bool)
@@ -0,0 +1,254 @@
+"""
+Read through cache of database query results
+
+Results are kept on disk in a binary columnar format, a directory per
+result holding one NumPy array per column along with a small metadata
+file. Entries expire after a time to live and the least recently used
+entries are evicted once the cache grows past its size limit.
+
+Two kinds of entry are kept:
+Queries: keyed on the normalised SQL (whitespace collapsed) and parameters
+Ranges: trading date range pulls from a table, keyed on the table, the
+        companies and the columns. A cached range answers any request for
+        a narrower range within it by filtering the cached result, and is
+        widened by merging in pulls of overlapping or adjacent ranges.
+
+Numeric columns are saved as plain arrays, object columns are pickled so
+values such as dates and decimals come back as the same types.
+"""
+
+# Standard Library
+import os
+import re
+import time
+import shutil
+import hashlib
+
+# Non C Dependency
+import simplejson as json
+
+# C Dependency
+import pandas as pd
+import numpy as np
+
+
+QUERY_CACHE_FOLDER = os.path.join(os.path.expanduser('~'), "data",
+                                  "query_cache")
+
+
+def normalise_sql(SQL):
+    """ Collapse whitespace and drop any trailing semicolon so trivially
+    different formattings of a query share an entry.
+    """
+
+    return re.sub(r'\s+', ' ', SQL).strip().rstrip(';').strip()
+
+
+class QueryCache(object):
+    """ An on disk cache of query results
+
+    Usage
+    -----
+    >>>> cache = QueryCache(ttl=3600)
+    >>>> df = cache.get(SQL, params)
+    >>>> if df is None:
+    >>>>     df = execute_query(SQL, params=params)
+    >>>>     cache.put(SQL, params, df)
+    """
+
+    def __init__(self, folder=None, ttl=24 * 3600, max_bytes=2 * 1024 ** 3):
+        """ Open (or create) a cache
+
+        Parameters
+        ----------
+        folder: string, default QUERY_CACHE_FOLDER
+            Where the cached results are kept
+        ttl: float, default one day
+            Seconds before an entry expires, None to never expire
+        max_bytes: int, default 2 GiB
+            The size of the cache above which entries are evicted
+
+        """
+
+        super(QueryCache, self).__init__()
+
+        self.folder = folder or QUERY_CACHE_FOLDER
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+
+    def get(self, SQL, params=None):
+        """ Return a cached result of a query, None if not cached """
+
+        return self._read(self._key('query', normalise_sql(SQL), params))
+
+    def put(self, SQL, params, df):
+        """ Cache the result of a query """
+
+        self._write(self._key('query', normalise_sql(SQL), params), df)
+
+    def get_range(self, table, start_date, end_date, companies=None,
+                  columns=None, date_column="TRADING_DATE", source=None):
+        """ Return the rows of a table between two ISO dates from a cached
+        range which covers them, None if no cached range does.
+        """
+
+        key = self._range_key(table, companies, columns, source)
+        meta = self._meta(key)
+        if meta is None or meta['start'] > start_date or \
+                meta['end'] < end_date:
+            return None
+
+        df = self._read(key)
+        if df is None:
+            return None
+
+        dates = _iso_dates(df[date_column].values)
+        mask = (dates >= start_date) & (dates <= end_date)
+        return df[mask].reset_index(drop=True)
+
+    def put_range(self, table, start_date, end_date, df, companies=None,
+                  columns=None, date_column="TRADING_DATE", source=None):
+        """ Cache the rows of a table between two ISO dates. A range which
+        overlaps or adjoins the cached range is merged into it (the new rows
+        replace the cached rows of their dates), a disjoint range replaces
+        it and a range within it is already cached.
+        """
+
+        key = self._range_key(table, companies, columns, source)
+        meta = self._meta(key)
+        if meta is not None and not self._expired(meta):
+            if meta['start'] <= start_date and meta['end'] >= end_date:
+                return None
+
+            day = np.timedelta64(1, 'D')
+            first = np.datetime64(meta['start'])
+            last = np.datetime64(meta['end'])
+            adjoins = (np.datetime64(start_date) <= last + day and
+                       np.datetime64(end_date) >= first - day)
+            cached = self._read(key) if adjoins else None
+            if cached is not None:
+                dates = _iso_dates(cached[date_column].values)
+                outside = (dates < start_date) | (dates > end_date)
+                df = pd.concat([cached[outside], df], ignore_index=True)
+                order = np.argsort(_iso_dates(df[date_column].values),
+                                   kind='mergesort')
+                df = df.take(order).reset_index(drop=True)
+                start_date = min(start_date, meta['start'])
+                end_date = max(end_date, meta['end'])
+
+        self._write(key, df, start=start_date, end=end_date)
+
+    def clear(self):
+        if os.path.exists(self.folder):
+            shutil.rmtree(self.folder)
+
+    def size(self):
+        """ The total size of the cache in bytes """
+
+        return sum(m['bytes'] for m in self._entries())
+
+    def _key(self, *parts):
+        return hashlib.md5(repr(parts)).hexdigest()
+
+    def _range_key(self, table, companies, columns, source):
+        companies = tuple(sorted(companies)) if companies is not None else None
+        columns = tuple(columns) if columns else None
+        return self._key('range', table, companies, columns, source)
+
+    def _path(self, key):
+        return os.path.join(self.folder, key)
+
+    def _meta(self, key):
+        fname = os.path.join(self._path(key), 'meta.json')
+        if not os.path.exists(fname):
+            return None
+        with open(fname) as f:
+            return json.load(f)
+
+    def _save_meta(self, key, meta):
+        with open(os.path.join(self._path(key), 'meta.json'), 'w') as f:
+            json.dump(meta, f)
+
+    def _expired(self, meta):
+        return self.ttl is not None and \
+            time.time() - meta['created'] > self.ttl
+
+    def _read(self, key):
+        meta = self._meta(key)
+        if meta is None:
+            return None
+
+        if self._expired(meta):
+            shutil.rmtree(self._path(key), ignore_errors=True)
+            return None
+
+        data = {}
+        for i, col in enumerate(meta['columns']):
+            data[col] = np.load(os.path.join(self._path(key), 'c%d.npy' % i),
+                                allow_pickle=meta['dtypes'][i] == 'object')
+
+        meta['accessed'] = time.time()
+        self._save_meta(key, meta)
+
+        return pd.DataFrame(data, columns=meta['columns'])
+
+    def _write(self, key, df, **extra):
+        path = self._path(key)
+        if os.path.exists(path):
+            shutil.rmtree(path)
+        os.makedirs(path)
+
+        size = 0
+        for i, col in enumerate(df.columns):
+            fname = os.path.join(path, 'c%d.npy' % i)
+            np.save(fname, df[col].values, allow_pickle=True)
+            size += os.path.getsize(fname)
+
+        meta = {'columns': list(df.columns),
+                'dtypes': [str(df[c].dtype) for c in df.columns],
+                'created': time.time(), 'accessed': time.time(),
+                'bytes': size}
+        meta.update(extra)
+        self._save_meta(key, meta)
+
+        self._evict()
+
+    def _entries(self):
+        if not os.path.exists(self.folder):
+            return []
+
+        entries = []
+        for key in os.listdir(self.folder):
+            meta = self._meta(key)
+            if meta is not None:
+                meta['key'] = key
+                entries.append(meta)
+        return entries
+
+    def _evict(self):
+        """ Remove expired entries, then the least recently used entries
+        until the cache is within its size limit.
+        """
+
+        entries = []
+        for meta in self._entries():
+            if self._expired(meta):
+                shutil.rmtree(self._path(meta['key']), ignore_errors=True)
+            else:
+                entries.append(meta)
+
+        total = sum(m['bytes'] for m in entries)
+        for meta in sorted(entries, key=lambda m: m['accessed']):
+            if total <= self.max_bytes:
+                break
+            shutil.rmtree(self._path(meta['key']), ignore_errors=True)
+            total -= meta['bytes']
+
+
+def _iso_dates(values):
+    """ ISO date strings of an array of dates, whether strings, date objects
+    or datetime64, so they compare with the ISO dates of a range
+    """
+
+    days = pd.to_datetime(values).values.astype('datetime64[D]')
+    return days.astype(str)
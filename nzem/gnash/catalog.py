@@ -0,0 +1,212 @@
+"""
+Searchable catalog of the series names available within Gnash.
+
+The output of the Gnash NAMES command is parsed once and persisted to disk,
+the catalog then provides prefix, substring and fuzzy lookups against the
+names without having to scan every series for each query.
+
+Prefix lookups use a sorted array of names and a binary search, substring
+and fuzzy lookups use an inverted index of character n-grams.
+"""
+
+# Standard Library
+import os
+import bisect
+from collections import defaultdict
+
+# No C Dependency
+import simplejson as json
+
+
+class SeriesCatalog(object):
+    """ An indexed collection of Gnash series names and their titles
+
+    Usage
+    -----
+    >>>> catalog = SeriesCatalog.from_names_output(gnash_output)
+    >>>> catalog.prefix("TY")
+    >>>> catalog.contains("BEN")
+    >>>> catalog.fuzzy("benmre inflow")
+    >>>> catalog.save('/home/nigel/data/gnash_names.json')
+    """
+
+    def __init__(self, names=None, titles=None, ngram=3):
+        """ Create a catalog from a list of series names
+
+        Parameters
+        ----------
+        names: iterable, default None
+            The series names to index
+        titles: dict, default None
+            Optional mapping of series name to a descriptive title
+        ngram: int, default 3
+            The length of the character n-grams used for the index
+
+        """
+        super(SeriesCatalog, self).__init__()
+
+        self.ngram = ngram
+        self.titles = {}
+        self._index = defaultdict(set)
+
+        # Sorted once, names differing only by case are kept side by side
+        self._members = set(names or [])
+        self._keys = sorted((name.upper(), name) for name in self._members)
+        self._names = [name for key, name in self._keys]
+
+        titles = titles or {}
+        for name in self._names:
+            self._index_name(name, titles.get(name))
+
+    def __len__(self):
+        return len(self._names)
+
+    def __contains__(self, name):
+        return name in self._members
+
+    @property
+    def names(self):
+        return list(self._names)
+
+    def add(self, name, title=None):
+        """ Add a single series name (and optional title) to the catalog,
+        duplicates are ignored. Each add is an insert into the sorted names,
+        pass the names to the constructor to build a catalog in one go.
+        """
+
+        if name in self:
+            return None
+
+        pos = bisect.bisect_left(self._keys, (name.upper(), name))
+        self._keys.insert(pos, (name.upper(), name))
+        self._names.insert(pos, name)
+        self._members.add(name)
+        self._index_name(name, title)
+
+    def prefix(self, prefix):
+        """ Return all names beginning with the prefix (case insensitive) """
+
+        key = prefix.upper()
+        lo = bisect.bisect_left(self._keys, (key,))
+        hi = bisect.bisect_left(self._keys, (key + u'\uffff',))
+        return self._names[lo:hi]
+
+    def contains(self, substring):
+        """ Return all names containing the substring (case insensitive)
+
+        Candidates are found by intersecting the n-gram postings for the
+        substring, only the candidates are then checked directly.
+        """
+
+        key = substring.upper()
+        grams = self._grams(key, pad=False)
+
+        if len(key) < self.ngram:
+            candidates = self._names
+        else:
+            postings = sorted((self._index.get(g, set()) for g in grams),
+                              key=len)
+            candidates = set.intersection(*postings) if postings else set()
+
+        return sorted(x for x in candidates if key in x.upper())
+
+    def fuzzy(self, query, limit=10, cutoff=0.2):
+        """ Return the names most similar to the query, ranked by the
+        Jaccard similarity of their n-grams.
+
+        Parameters
+        ----------
+        query: string
+            An approximate series name, e.g. with typos or missing characters
+        limit: int, default 10
+            The maximum number of matches to return
+        cutoff: float, default 0.2
+            The minimum similarity for a name to be returned
+
+        Returns
+        -------
+        matches: list
+            A list of (name, score) tuples in descending order of score
+
+        """
+
+        grams = self._grams(query.upper())
+        if not grams:
+            return []
+
+        overlap = defaultdict(int)
+        for gram in grams:
+            for name in self._index.get(gram, ()):
+                overlap[name] += 1
+
+        scores = []
+        for name, shared in overlap.iteritems():
+            total = len(grams) + len(self._grams(name.upper())) - shared
+            score = float(shared) / total
+            if score >= cutoff:
+                scores.append((name, score))
+
+        scores.sort(key=lambda x: (-x[1], x[0]))
+        return scores[:limit]
+
+    def save(self, fname):
+        """ Persist the catalog to a JSON file """
+
+        directory = os.path.dirname(fname)
+        if directory and not os.path.exists(directory):
+            os.makedirs(directory)
+
+        with open(fname, 'w') as f:
+            json.dump({'ngram': self.ngram, 'names': self._names,
+                       'titles': self.titles}, f)
+
+    @classmethod
+    def load(cls, fname):
+        """ Load a catalog previously persisted with save """
+
+        with open(fname) as f:
+            data = json.load(f)
+
+        return cls(names=data['names'], titles=data['titles'],
+                   ngram=data['ngram'])
+
+    @classmethod
+    def from_names_output(cls, output, ngram=3):
+        """ Construct a catalog by parsing the raw output of the Gnash
+        NAMES command. Each series is printed on its own line with the
+        name first, followed by an optional title.
+        """
+
+        names = []
+        titles = {}
+        for line in output.splitlines():
+            line = line.strip()
+            if not line or line.startswith("Gnash"):
+                continue
+
+            parts = line.split(None, 1)
+            name = parts[0]
+            names.append(name)
+            if len(parts) > 1:
+                titles[name] = parts[1].strip()
+
+        return cls(names=names, titles=titles, ngram=ngram)
+
+    def _index_name(self, name, title=None):
+        """ Add the title and n-grams of a name already in the catalog """
+
+        if title:
+            self.titles[name] = title
+
+        for gram in self._grams(name.upper()):
+            self._index[gram].add(name)
+
+    def _grams(self, key, pad=True):
+        """ The set of character n-grams for an upper case key, padding
+        marks the start and end of the key so whole names rank higher.
+        Substring searches must not pad as the match may be mid name.
+        """
+
+        padded = " %s " % key if pad else key
+        return set(padded[i:i + self.ngram] for i in
+                   xrange(len(padded) - self.ngram + 1))
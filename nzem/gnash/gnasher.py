@@ -25,6 +25,8 @@ if sys.platform.startswith("linux"):
 import pandas as pd
 import numpy as np
 
+from nzem.gnash.catalog import SeriesCatalog
+
 # Need to get rid of these...
 try:
     import pandas.io.sql as sql
@@ -74,7 +76,7 @@ class Gnasher(object):
         return self.query
 
 
-    def _run_query(self, input_string):
+    def _run_query(self, input_string, raise_errors=False):
         # Trying to make the buffering process working.
         try:
             self.output = StringIO()
@@ -82,8 +84,10 @@ class Gnasher(object):
                 self.output.write(line)
             self.gnash = Command("./Gnash.exe")
             self.gnash(_in=input_string, _out=grab_output).wait()
-        except:
+        except Exception:
             print "Error, cannot run the query on Gnash"
+            if raise_errors:
+                raise
 
 
     def _scrub_output(self):
@@ -155,14 +159,55 @@ class Gnasher(object):
             except:
                 return x
 
-    def _get_names(self):
+    def find_series(self, query, fuzzy=False, limit=10):
+        """
+        Search the Gnash series names for those matching a query.
+        Uses a prefix match first, falling back to a substring match.
+        Setting fuzzy will rank names by similarity instead which is
+        useful when the exact spelling is not known.
+        """
+
+        catalog = self._get_names()
+
+        if fuzzy:
+            return [name for name, score in catalog.fuzzy(query, limit=limit)]
+
+        matches = catalog.prefix(query)
+        if not matches:
+            matches = catalog.contains(query)
+
+        return matches[:limit]
+
+
+    def _get_names(self, refresh=False, fname=None):
         """
-        Place holder function, current plan is to grab all of the names off
-        Gnash and then make these searchable.
+        Grab all of the names off Gnash and make these searchable.
+        The names are only extracted from Gnash once, they are then
+        persisted to disk and loaded from there on subsequent calls.
 
         Can then have the user create "fuzzier" queries with the module
-        constructing the rest.
+        constructing the rest. An error is raised if Gnash cannot be run
+        or returns no names, nothing is saved in that case.
         """
 
-        pass
+        if not refresh and getattr(self, 'names', None) is not None:
+            return self.names
+
+        if not fname:
+            fname = CONFIG['gnash-names']
+
+        if not refresh and os.path.exists(fname):
+            self.names = SeriesCatalog.load(fname)
+            return self.names
+
+        self._run_query("names", raise_errors=True)
+        string = self.output.getvalue()
+        self.output.close()
+
+        names = SeriesCatalog.from_names_output(string)
+        if not len(names):
+            raise ValueError("Gnash returned no series names")
 
+        names.save(fname)
+        self.names = names
+        return self.names
@@ -25,13 +25,7 @@ import simplejson as json
 import pandas as pd
 import numpy as np
 
-
-sys.path.append(os.path.join(os.path.expanduser("~"),
-                'python', 'pdtools'))
-try:
-    import pdtools
-except:
-    print "Failed to import pdtools"
+from nzem.frequent_io.query import select
 
 try:
     CONFIG = json.load(open(os.path.join(
@@ -120,7 +114,13 @@ class Offer(object):
         else:
             offers = self.offer_stack
 
-        offers = offers.ge_mask("Trading Date", begin_date).le_mask("Trading Date", end_date)
+        predicates = []
+        if begin_date is not None:
+            predicates.append(("Trading Date", ">=", begin_date))
+        if end_date is not None:
+            predicates.append(("Trading Date", "<=", end_date))
+
+        offers = select(offers, predicates)
 
         if inplace:
             if horizontal:
@@ -177,34 +177,18 @@ class Offer(object):
         if not isinstance(self.offer_stack, pd.DataFrame):
             self.stack_columns()
 
-        fstack = self.offer_stack.copy()
-
-        if date:
-            fstack = fstack.eq_mask("Trading Date", date)
-
-        if period:
-            fstack = fstack.eq_mask("Trading Period", period)
+        filters = (("Trading Date", date), ("Trading Period", period),
+                   ("Product Type", product_type),
+                   ("Reserve Type", reserve_type), ("Island", island),
+                   ("Company", company), ("Region", region),
+                   ("Station", station))
 
-        if product_type:
-            fstack = fstack.eq_mask("Product Type", product_type)
-
-        if reserve_type:
-            fstack = fstack.eq_mask("Reserve Type", reserve_type)
-
-        if island:
-            fstack = fstack.eq_mask("Island", island)
-
-        if company:
-            fstack = fstack.eq_mask("Company", company)
-
-        if region:
-            fstack = fstack.eq_mask("Region", region)
-
-        if station:
-            fstack = fstack.eq_mask("Station", station)
+        predicates = [(col, "==", value) for col, value in filters if value]
 
         if non_zero:
-            fstack = fstack.gt_mask("Max", 0)
+            predicates.append(("Max", ">", 0))
+
+        fstack = select(self.offer_stack, predicates).copy()
 
         self.fstack = fstack
 
@@ -502,8 +486,8 @@ class ReserveOffer(Offer):
         # si_min = max(si_min - si_cleared, 0)
 
         # Calculate the new stacks
-        ni_stack = nat_remain.eq_mask("Island", "North Island")
-        si_stack = nat_remain.eq_mask("Island", "South Island")
+        ni_stack = select(nat_remain, [("Island", "==", "North Island")])
+        si_stack = select(nat_remain, [("Island", "==", "South Island")])
 
         # Clear each island individually
         (ni_clear, ni_remain) = self.clear_offer(requirement=ni_min,
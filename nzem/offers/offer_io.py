@@ -5,6 +5,7 @@ Offer Input Output
 # Standard Library
 import glob
 import os
+import re
 import datetime
 from dateutil.parser import parse
 
@@ -22,8 +23,17 @@ try:
 except:
     print "CONFIG File does not exist"
 
+OFFER_KEYS = ("Trading Date", "Trading Period", "Company", "Grid Exit Point",
+              "Station", "Unit", "Product Type", "Product Class",
+              "Reserve Type", "Band Number")
+
+# yyyymmdd for daily files, yyyymm or e.g. Jul_2013 for monthly files
+NUMERIC_DATE = re.compile(r'(\d{8}|\d{6})')
+MONTH_DATE = re.compile(r'([A-Za-z]{3})_(\d{4})')
+
+
 def offer_from_file(begin_date=None, end_date=None, offer_type="IL",
-                    file_date_format='%b_%Y'):
+                    file_date_format='%b_%Y', deduplicate=True):
     """ Create an Offer DataFrame by searching the appropriate directory
     and loading from a CSV file. Assumes different behaviour depending
     upon what offer_type is passed to the function.
@@ -40,6 +50,11 @@ def offer_from_file(begin_date=None, end_date=None, offer_type="IL",
         The type of offer to load the data for
     file_date_format: string, default "%b_%Y"
         The file date formats of the offer file name
+    deduplicate: bool, default True
+        Drop offers loaded from more than one file (e.g. a day in both a
+        daily and a monthly file), keeping those from the preferred file,
+        see source_order. Daily files of a month with a monthly file are
+        not read at all, see preferred_sources
 
 
     Returns
@@ -71,8 +86,12 @@ def offer_from_file(begin_date=None, end_date=None, offer_type="IL",
 
     unique_files = [x for x in all_files if multi_match(x, dates)]
 
-    # Load the DataFrame
-    df = pd.concat((pd.read_csv(x) for x in unique_files), ignore_index=True)
+    # Load the DataFrame, preferred files first so duplicates keep theirs
+    df = pd.concat((pd.read_csv(x) for x in preferred_sources(unique_files)),
+                   ignore_index=True)
+
+    if deduplicate:
+        df = drop_duplicate_offers(df)
 
     # Construct an Offer dictionary
 
@@ -117,6 +136,122 @@ def reserve_offer_from_file(begin_date=None, end_date=None,
 
     return il_offer.merge_stacked_offers(plsr_offer)
 
+def drop_duplicate_offers(df, keys=OFFER_KEYS):
+    """ Remove offers which appear more than once, e.g. where daily and
+    monthly offer files overlap. The first occurrence of each offer is kept
+    so the frame should be ordered with the preferred source first.
+
+    Offers are identified by the key columns present in the frame, the
+    column names are compared in the title format used by the Offer classes
+    so either the raw WITS names or retitled names may be used. Trading
+    dates are parsed first so differing date formats between files match.
+
+    Parameters
+    ----------
+    df: DataFrame
+        The concatenated offers
+    keys: iterable, default OFFER_KEYS
+        The identifying columns, in title format
+
+    Returns
+    -------
+    df: DataFrame
+        A copy of the offers without duplicates
+
+    """
+
+    df = df.copy()
+    titled = {x.replace('_', ' ').title(): x for x in df.columns}
+    key_columns = [titled[k] for k in keys if k in titled]
+
+    if not key_columns:
+        return df
+
+    date_col = titled.get("Trading Date")
+    if date_col:
+        df[date_col] = pd.to_datetime(df[date_col])
+
+    return df[~df.duplicated(key_columns).values]
+
+
+def source_order(file_names):
+    """ Order offer files by preference, the monthly historic files first as
+    a published month supersedes its daily current files (the rule used by
+    WitsCatalog), then by the date in the file name, latest first. Files
+    named with a yyyymm or %b_%Y (e.g. Jul_2013) month, or without a date,
+    are treated as monthly.
+
+    Parameters
+    ----------
+    file_names: iterable
+        The offer files
+
+    Returns
+    -------
+    file_names: list
+        The files ordered with the preferred source first
+
+    """
+
+    return sorted(file_names, key=_source_key)
+
+
+def preferred_sources(file_names):
+    """ The offer files worth reading in order of preference, see
+    source_order. Daily files of a month which also has a monthly file are
+    dropped as the monthly file holds all of their offers.
+
+    Parameters
+    ----------
+    file_names: iterable
+        The offer files
+
+    Returns
+    -------
+    file_names: list
+        The files to read, the preferred source first
+
+    """
+
+    dates = dict((x, _file_date(x)) for x in file_names)
+    months = set((day.year, day.month) for day, daily in dates.values()
+                 if day and not daily)
+
+    return source_order(x for x, (day, daily) in dates.items()
+                        if not (daily and (day.year, day.month) in months))
+
+
+def _file_date(file_name):
+    """ The date in an offer file name and whether it is a daily file,
+    (None, False) for files without a recognisable date
+    """
+
+    name = os.path.basename(file_name)
+
+    match = NUMERIC_DATE.search(name)
+    if match:
+        stamp = match.group(1)
+        try:
+            if len(stamp) == 8:
+                return datetime.datetime.strptime(stamp, '%Y%m%d'), True
+            return datetime.datetime.strptime(stamp, '%Y%m'), False
+        except ValueError:
+            pass
+
+    for match in MONTH_DATE.finditer(name):
+        try:
+            return datetime.datetime.strptime(match.group(0), '%b_%Y'), False
+        except ValueError:
+            pass
+
+    return None, False
+
+
+def _source_key(file_name):
+    day, daily = _file_date(file_name)
+    return (daily, -day.toordinal() if day else 0, file_name)
+
+
 def offer_from_wits():
     pass
 
@@ -0,0 +1,167 @@
+"""
+Batch rendering of the vSPUD comparison plots to files
+
+A report is a list of plot specifications, each a dictionary naming the
+plot, the vSPUD object(s) to plot and the file to write, e.g.
+
+>>>> specs = [{"plot": "mixed", "spud": control, "other": override,
+>>>>           "fname": "prices_monthly.png"},
+>>>>          {"plot": "reserve", "spud": control, "island": "SI",
+>>>>           "time_aggregation": "Year", "fname": "si_reserve.png"},
+>>>>          {"plot": "frequency", "spud": control,
+>>>>           "freq_name": "FIR Price ($/MWh)", "fname": "fir_freq.png"}]
+>>>> timings = render_report(specs, processes=4)
+
+The price series each plot needs are computed once in the calling process
+(a pair of objects and an aggregation shared by several plots is only
+aggregated once) and the figures are rendered in a pool of processes on
+the non interactive Agg backend, only the price series are sent to them.
+
+Plots
+-----
+mixed: vSPUD.mixed_price_plot, requires "other"
+energy: vSPUD.energy_price_plot
+reserve: vSPUD.reserve_price_plot, optionally "island"
+frequency: vSPUD.frequency_plot, requires "freq_name"
+
+Optional keys are "time_aggregation" (default "Month_Year"), "agg_func"
+(default np.mean), "colour_dict", "comp", "figsize" and "dpi".
+"""
+
+# Standard Library
+import time
+import multiprocessing
+
+# C Dependency
+import pandas as pd
+import numpy as np
+
+try:
+    import matplotlib.pyplot as plt
+except ImportError:
+    print "Import failed, most likely because you're in Docs mode"
+
+from nzem.vspd.vspd import vSPUD
+
+# The specification keys passed on to each plot method
+PLOT_KEYWORDS = {"mixed": ("colour_dict",),
+                 "energy": ("colour_dict", "comp"),
+                 "reserve": ("colour_dict", "comp", "island"),
+                 "frequency": ("colour_dict", "comp", "freq_name")}
+
+
+def render_report(specs, processes=None, dpi=100):
+    """ Render a list of plot specifications to files
+
+    Parameters
+    ----------
+    specs: list
+        Plot specifications, see the module documentation
+    processes: int, default None
+        The size of the process pool, defaults to the number of CPUs.
+        With 1 the plots are rendered in this process, the matplotlib
+        backend is restored afterwards
+    dpi: int, default 100
+        The resolution of the figures, may be overridden per plot
+
+    Returns
+    -------
+    timings: DataFrame
+        The "File", "Plot" and rendering "Seconds" of each figure
+
+    """
+
+    prices = {}
+    tasks = [_task(spec, prices, dpi) for spec in specs]
+
+    if processes == 1:
+        backend = plt.get_backend()
+        _headless()
+        try:
+            results = [_render(task) for task in tasks]
+        finally:
+            plt.switch_backend(backend)
+    else:
+        pool = multiprocessing.Pool(processes, initializer=_headless)
+        try:
+            results = pool.map(_render, tasks)
+        finally:
+            pool.close()
+            pool.join()
+
+    return pd.DataFrame(results, columns=["File", "Plot", "Seconds"])
+
+
+def _task(spec, prices, dpi):
+    """ Reduce a specification to what the renderer needs, the price series
+    are looked up in (or added to) the prices computed so far
+    """
+
+    plot = spec["plot"]
+    if plot not in PLOT_KEYWORDS:
+        raise ValueError("Unknown plot %s" % plot)
+
+    aggregation = (spec.get("time_aggregation", "Month_Year"),
+                   spec.get("agg_func", np.mean))
+
+    kargs = dict((k, spec[k]) for k in PLOT_KEYWORDS[plot] if k in spec)
+    task = {"plot": plot, "fname": spec["fname"], "kargs": kargs,
+            "time_aggregation": aggregation[0],
+            "figsize": spec.get("figsize"), "dpi": spec.get("dpi", dpi)}
+
+    if plot == "frequency":
+        column = spec["freq_name"]
+        task["island_results"] = spec["spud"].island_results[[column]]
+        return task
+
+    spuds = [spec["spud"]]
+    if plot == "mixed":
+        spuds.append(spec["other"])
+    task["prices"] = [_prices(spud, aggregation, prices) for spud in spuds]
+    return task
+
+
+def _prices(spud, aggregation, prices):
+    # A list of aggregations (or functions) is used as a key as a tuple
+    key = (id(spud),) + tuple(tuple(x) if isinstance(x, (list, tuple)) else x
+                              for x in aggregation)
+    if key not in prices:
+        prices[key] = spud.price_series(time_aggregation=aggregation[0],
+                                        agg_func=aggregation[1])
+    return prices[key]
+
+
+def _headless():
+    plt.switch_backend('Agg')
+
+
+def _render(task):
+    """ Render one figure to its file, returning the time taken """
+
+    start = time.time()
+    plot = task["plot"]
+    kargs = task["kargs"]
+
+    if plot == "mixed":
+        fig, axes = vSPUD().mixed_price_plot(
+            vSPUD(), time_aggregation=task["time_aggregation"],
+            self_prices=task["prices"][0], other_prices=task["prices"][1],
+            **kargs)
+        if task["figsize"]:
+            fig.set_size_inches(*task["figsize"])
+    else:
+        fig, axes = plt.subplots(1, figsize=task["figsize"] or (12, 4))
+        if plot == "frequency":
+            spud = vSPUD(island_results=task["island_results"])
+            spud.frequency_plot(axes, **kargs)
+        elif plot == "energy":
+            vSPUD().energy_price_plot(axes, prices=task["prices"][0],
+                                      **kargs)
+        else:
+            vSPUD().reserve_price_plot(axes, prices=task["prices"][0],
+                                       **kargs)
+
+    fig.savefig(task["fname"], dpi=task["dpi"])
+    plt.close(fig)
+
+    return task["fname"], plot, time.time() - start
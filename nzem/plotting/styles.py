@@ -42,11 +42,11 @@ gs_line_dict = {'haywards_price_orig': {'c': 'black', 'alpha': 0.7,
              'fir_price_alt': {'c': 'black', 'alpha': 0.7,
                                'linestyle': '--', 'marker': '.'},
              'sir_price_alt': {'c': 'black', 'alpha': 0.3,
-                               'linestyle': '.--', 'marker': '.'},
+                               'linestyle': '--', 'marker': '.'},
              'ni_reserve_price_alt': {'c': 'black', 'alpha': 0.7,
-                                  'linestyle': 'o--'},
+                                  'linestyle': '--', 'marker': 'o'},
              'si_reserve_price_alt': {'c': 'black', 'alpha': 0.3,
-                                  'linestyle': 'o--'}
+                                  'linestyle': '--', 'marker': 'o'}
              }
 
 gs_scatter_dict = {
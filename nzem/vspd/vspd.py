@@ -199,6 +199,24 @@ class vSPUD_Factory(object):
                 branch_results=branch_results)
 
 
+    def iter_results(self, **kargs):
+        """ Yield a vSPUD object for each sub folder in turn, so results
+        spanning many folders can be processed without concatenating them.
+
+        Parameters
+        ----------
+        **kargs:
+            Passed to the _load_data method e.g. branch=True
+
+        Returns
+        -------
+        results: generator
+            vSPUD objects with their folder set
+
+        """
+
+        return self._yield_results(**kargs)
+
     def _yield_results(self, **kargs):
 
         for folder in self.sub_folders:
@@ -273,6 +291,16 @@ class vSPUD(object):
             self.folder = folder
             self._load_data(**kargs)
 
+    @property
+    def island_results(self):
+        return self._island_results
+
+    @island_results.setter
+    def island_results(self, island_results):
+        """ Replacing the island results clears the cached price reports """
+        self._island_results = island_results
+        self._price_cache = {}
+
     def map_dispatch(self):
         """ Map the offer dispatch DataFrame to nodal metadata
 
@@ -503,28 +531,41 @@ class vSPUD(object):
         Parameters
         ----------
         self:
-        time_aggregation: string, default "Month_Year"
-            The time aggregation to be applied
-        agg_func: func
-            The aggregation function to apply
+        time_aggregation: string, list, default "Month_Year"
+            The time aggregation to be applied, a list groups by several
+        agg_func: func, list
+            The aggregation function (or functions) to apply
 
         Returns
         -------
         price_report: DataFrame
-            An aggregated price report of time series data
+            An aggregated price report of time series data. The report is
+            cached until island_results is replaced and a copy returned,
+            after changing island_results in place assign it again (e.g.
+            spud.island_results = spud.island_results) to clear the cache
 
         """
+        # Lists (e.g. ["Year", "Month"]) are used as a key as tuples
+        key = tuple(tuple(x) if isinstance(x, (list, tuple)) else x
+                    for x in (time_aggregation, agg_func))
+        if key in self._price_cache:
+            return self._price_cache[key].copy()
+
         # Create a report
-        price_report = self.price_report()
+        price_report = self._price_report()
 
         if time_aggregation:
             karg_dict = self._time_keywords(time_aggregation)
-            price_report = self._apply_time_filters(price_report, **karg_dict)
-            # Aggregate
+            price_report = self._apply_time_filters(price_report.copy(),
+                                                    **karg_dict)
+            # Aggregate, groupby treats a tuple as a single column name
+            if isinstance(time_aggregation, tuple):
+                time_aggregation = list(time_aggregation)
             price_report = price_report.groupby(time_aggregation
-                                               ).aggregate(np.mean)
+                                               ).aggregate(agg_func)
 
-        return price_report
+        self._price_cache[key] = price_report
+        return price_report.copy()
 
 
     def price_report(self):
@@ -540,7 +581,8 @@ class vSPUD(object):
         -------
         price_report: DataFrame
             DataFrame containing basic price information with precompiled
-            aggregations
+            aggregations, a copy of the report cached until island_results
+            is replaced (see price_series)
 
         Usage
         -----
@@ -549,24 +591,44 @@ class vSPUD(object):
 
         """
 
-        ni_prices = self.island_results[self.island_results["Island"] == "NI"]
-        si_prices = self.island_results[self.island_results["Island"] == "SI"]
+        return self._price_report().copy()
+
+    def _price_report(self):
+        """ The cached price report, shared so must not be modified """
+
+        if "report" in self._price_cache:
+            return self._price_cache["report"]
 
         columns = ["ReferencePrice ($/MWh)", "FIR Price ($/MWh)", "SIR Price ($/MWh)"]
+        islands = ["NI", "SI"]
+
+        # Pivot each period's island rows into a single row
+        results = self.island_results
+        results = results[results["Island"].isin(islands).values]
 
-        nip = ni_prices[["DateTime"] + columns].copy()
-        sip = si_prices[["DateTime"] + columns].copy()
+        rows, times = pd.factorize(results["DateTime"].values)
+        cols = pd.Index(islands).get_indexer(results["Island"].values)
 
-        nip.rename(columns={x: " ".join(["NI", x]) for x in columns}, inplace=True)
-        sip.rename(columns={x: " ".join(["SI", x]) for x in columns}, inplace=True)
+        values = np.empty((len(times), len(islands), len(columns)))
+        values.fill(np.nan)
+        values[rows, cols] = results[columns].values
 
-        price_report = nip.merge(sip, left_on="DateTime", right_on="DateTime")
+        # Only keep the periods with results for both islands
+        present = np.zeros((len(times), len(islands)), dtype=bool)
+        present[rows, cols] = True
+        both = present.all(axis=1)
+
+        price_report = pd.DataFrame({"DateTime": np.asarray(times)[both]})
+        for i, island in enumerate(islands):
+            for j, column in enumerate(columns):
+                price_report[" ".join([island, column])] = values[both, i, j]
 
         price_report["Island Price Difference ($/MWh)"] = price_report["NI ReferencePrice ($/MWh)"] - price_report["SI ReferencePrice ($/MWh)"]
 
         price_report["NI Reserve Price ($/MWh)"] = price_report["NI FIR Price ($/MWh)"] + price_report["NI SIR Price ($/MWh)"]
         price_report["SI Reserve Price ($/MWh)"] = price_report["SI FIR Price ($/MWh)"] + price_report["SI SIR Price ($/MWh)"]
 
+        self._price_cache["report"] = price_report
         return price_report
 
     def reserve_procurement(self, overwrite_results=False, apply_time=False,
@@ -682,8 +744,8 @@ class vSPUD(object):
 
         # Use dictionaries to make these calculations general purpose
         indices = indice_dict[calc_type]
-        left = self.__dict__[calc_type].copy()
-        right = other.__dict__[calc_type].copy()
+        left = getattr(self, calc_type).copy()
+        right = getattr(other, calc_type).copy()
 
         col_names = left.columns.tolist()
         compare_columns = [x for x in col_names if self._invmatcher(x,indices)]
@@ -946,15 +1008,17 @@ class vSPUD(object):
         styling = PLOT_STYLES[colour_dict]
 
         st_name = '_'.join([freq_name.lower(), comp])
-        axes.hist(self.island_results[freq_name], bins=50, **styling[st_name])
+        axes.hist(self.island_results[freq_name], bins=50,
+                  **styling.get(st_name, {}))
 
-        axes.set_xlabel(name)
+        axes.set_xlabel(freq_name)
         axes.set_ylabel('Frequency')
 
         return axes
 
     def mixed_price_plot(self, other, colour_dict='greyscale_line',
-                           time_aggregation='Month_Year', agg_func=np.mean):
+                           time_aggregation='Month_Year', agg_func=np.mean,
+                           self_prices=None, other_prices=None):
         """ Create a three part plot of energy and reserve prices
 
         Parameters
@@ -964,6 +1028,8 @@ class vSPUD(object):
         colour_dict: What colour dictionary to use
         time_aggregation: What time aggregation to use
         agg_func: What aggregation function to use on the prices
+        self_prices: Optional, a precomputed price series of self
+        other_prices: Optional, a precomputed price series of other
 
         Returns
         -------
@@ -972,11 +1038,13 @@ class vSPUD(object):
         """
 
         # Create two price series to cut down on duplication of effort
-        self_prices = self.price_series(time_aggregation=time_aggregation,
-                                        agg_func=agg_func)
+        if self_prices is None:
+            self_prices = self.price_series(time_aggregation=time_aggregation,
+                                            agg_func=agg_func)
 
-        other_prices = other.price_series(time_aggregation=time_aggregation,
-                                        agg_func=agg_func)
+        if other_prices is None:
+            other_prices = other.price_series(
+                time_aggregation=time_aggregation, agg_func=agg_func)
 
         fig, axes = plt.subplots(3,1, figsize=(12,9))
 
@@ -1043,7 +1111,7 @@ class vSPUD(object):
         labels = self._label_dict(label_dict)
 
         # Get the Prices
-        if not prices:
+        if prices is None:
             prices = self.price_series(time_aggregation=time_aggregation,
                                    agg_func=agg_func)
         haywards = prices["NI ReferencePrice ($/MWh)"]
@@ -1095,9 +1163,9 @@ class vSPUD(object):
         labels = self._label_dict(label_dict)
 
         # Get the prices
-        if not prices:
+        if prices is None:
             prices = self.price_series(time_aggregation=time_aggregation,
-                                   agg_func=np.mean)
+                                   agg_func=agg_func)
 
         # Name the variables
         fir_name = " ".join([island, "FIR Price ($/MWh)"])
@@ -0,0 +1,275 @@
+"""
+Date indexed catalog of the offer files available on the WITS site.
+
+Every file name is parsed once for its product type and the dates it
+covers, daily current files are named with a yyyymmdd date and monthly
+historic files with a yyyymm date. The parsed files are kept sorted by
+their first date for each product so the files covering a date range are
+found by a binary search rather than by matching every date string
+against every file name.
+
+A month published as a monthly historic file supersedes the daily current
+files of that month, the same rule is used to pick the files covering a
+date range and to find the daily files which can be pruned.
+"""
+
+# Standard Library
+import os
+import re
+import bisect
+import calendar
+import datetime
+from collections import defaultdict
+
+# Non C Dependency
+import simplejson as json
+from dateutil.parser import parse
+
+try:
+    CONFIG = json.load(open(os.path.join(
+        os.path.expanduser('~/python/nzem/nzem/_static'), 'config.json')))
+except:
+    print "CONFIG File does not exist"
+
+
+DATE_PATTERN = re.compile(r'(\d{8}|\d{6})')
+
+# Longest file covers a whole month
+MAX_SPAN = 31
+
+
+class WitsCatalog(object):
+    """ Index of WITS offer files by product and date coverage
+
+    Usage
+    -----
+    >>>> catalog = WitsCatalog(current_files, historic_files)
+    >>>> catalog.files("ilreserves", "2013-06-20", "2013-07-05")
+    >>>> catalog.save()
+    >>>> catalog = WitsCatalog.load()
+    """
+
+    def __init__(self, current=None, historic=None, products=None):
+        """ Build a catalog from lists of file urls
+
+        Parameters
+        ----------
+        current: iterable, default None
+            The current (daily) files
+        historic: iterable, default None
+            The historic (monthly) files
+        products: iterable, default None
+            The product types to recognise, defaults to the wits-offer-types
+            in the config file
+
+        """
+
+        super(WitsCatalog, self).__init__()
+
+        products = products or CONFIG['wits-offer-types']
+        # Check the longest names first so no product shadows another
+        self.products = sorted(products, key=len, reverse=True)
+        self.current = list(current or [])
+        self.historic = list(historic or [])
+
+        self._starts = defaultdict(list)
+        self._entries = defaultdict(list)
+
+        for url in self.current:
+            self.add(url)
+        for url in self.historic:
+            self.add(url)
+
+    def add(self, url):
+        """ Parse a file url and add it to the index, urls which are not
+        recognised as an offer file are ignored.
+        """
+
+        parsed = self.parse_name(url)
+        if not parsed:
+            return None
+
+        product, begin, end = parsed
+        pos = bisect.bisect_right(self._starts[product], begin)
+        self._starts[product].insert(pos, begin)
+        self._entries[product].insert(pos, (begin, end, url))
+
+    def parse_name(self, url):
+        """ Parse the product type and date coverage from a file url
+
+        Returns
+        -------
+        parsed: tuple or None
+            (product, first_day, last_day) with the days as date ordinals
+        """
+
+        name = os.path.split(url)[1]
+
+        product = None
+        for ty in self.products:
+            if name.startswith(ty):
+                product = ty
+                break
+
+        match = DATE_PATTERN.search(name)
+        if not product or not match:
+            return None
+
+        stamp = match.group(1)
+        try:
+            if len(stamp) == 8:
+                day = datetime.date(int(stamp[:4]), int(stamp[4:6]),
+                                    int(stamp[6:]))
+                return (product, day.toordinal(), day.toordinal())
+
+            year, month = int(stamp[:4]), int(stamp[4:])
+            last = calendar.monthrange(year, month)[1]
+            return (product, datetime.date(year, month, 1).toordinal(),
+                    datetime.date(year, month, last).toordinal())
+        except ValueError:
+            return None
+
+    def overlapping(self, product, begin_date, end_date):
+        """ All files of a product with any day between the two dates
+
+        Returns
+        -------
+        entries: list
+            (first_day, last_day, url) tuples sorted by first day
+        """
+
+        begin = self._ordinal(begin_date, default=1)
+        end = self._ordinal(end_date, default=datetime.date.max.toordinal())
+
+        starts = self._starts.get(product, [])
+        lo = bisect.bisect_left(starts, begin - MAX_SPAN)
+        hi = bisect.bisect_right(starts, end)
+
+        return [e for e in self._entries[product][lo:hi] if e[1] >= begin]
+
+    def files(self, product=None, begin_date=None, end_date=None):
+        """ The files needed to cover a date range for a product. Monthly
+        files are used where they exist and daily files fill in the days
+        of the months which have not been published yet.
+
+        Parameters
+        ----------
+        product: string, default None
+            The product type, if None the files for every product
+        begin_date: string, datetime, default None
+            The first date, inclusive, if None from the earliest file
+        end_date: string, datetime, default None
+            The last date, inclusive, if None to the latest file
+
+        Returns
+        -------
+        files: list
+            The file urls ordered by product and date
+
+        """
+
+        if not product:
+            return [f for p in sorted(self._entries) for f in
+                    self.files(p, begin_date, end_date)]
+
+        entries = self.overlapping(product, begin_date, end_date)
+        selected, superseded = self._supersede(entries)
+
+        selected.sort()
+        return [e[2] for e in selected]
+
+    def superseded(self, product=None):
+        """ The daily files whose days are all covered by a monthly file,
+        once the month has been published as a historic file the daily
+        current files for it are no longer needed.
+
+        Returns
+        -------
+        files: list
+            The superseded daily file urls
+        """
+
+        return [daily for daily, monthly in self._superseded_pairs(product)]
+
+    def superseded_by(self, product=None):
+        """ The monthly file superseding each superseded daily file
+
+        Returns
+        -------
+        files: dict
+            {daily file url: monthly file url}
+        """
+
+        return dict(self._superseded_pairs(product))
+
+    def _superseded_pairs(self, product=None):
+        products = [product] if product else sorted(self._entries)
+
+        pairs = []
+        for p in products:
+            old = self._supersede(self._entries[p])[1]
+            pairs.extend((daily[2], monthly[2]) for daily, monthly in old)
+        return pairs
+
+    def _supersede(self, entries):
+        """ Split entries sorted by first day into the monthly files and
+        the daily files outside them, and (daily, monthly) pairs of the
+        daily files superseded by a monthly file.
+        """
+
+        monthly = [e for e in entries if e[0] != e[1]]
+        starts = [e[0] for e in monthly]
+
+        kept, superseded = list(monthly), []
+        for e in entries:
+            if e[0] != e[1]:
+                continue
+            pos = bisect.bisect_right(starts, e[0]) - 1
+            if pos >= 0 and monthly[pos][1] >= e[0]:
+                superseded.append((e, monthly[pos]))
+            else:
+                kept.append(e)
+
+        return kept, superseded
+
+    def product(self, url):
+        """ The product type of a file url, None if it is not recognised """
+
+        parsed = self.parse_name(url)
+        return parsed[0] if parsed else None
+
+    def save(self, fname=None):
+        """ Persist the catalog's files to disk """
+
+        fname = fname or self._default_name()
+        directory = os.path.dirname(fname)
+        if directory and not os.path.exists(directory):
+            os.makedirs(directory)
+
+        with open(fname, 'w') as f:
+            json.dump({'current': self.current, 'historic': self.historic,
+                       'products': self.products}, f)
+
+    @classmethod
+    def load(cls, fname=None):
+        """ Load a catalog saved by a previous run """
+
+        fname = fname or cls._default_name()
+        with open(fname) as f:
+            data = json.load(f)
+
+        return cls(current=data['current'], historic=data['historic'],
+                   products=data['products'])
+
+    @staticmethod
+    def _default_name():
+        return os.path.join(CONFIG['wits-cache-folder'], 'catalog.json')
+
+    def _ordinal(self, dt, default=None):
+        if dt is None:
+            return default
+        if isinstance(dt, (int, long)):
+            return dt
+        if not isinstance(dt, (datetime.date, datetime.datetime)):
+            dt = parse(dt)
+        return dt.toordinal()
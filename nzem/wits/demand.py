@@ -0,0 +1,124 @@
+"""
+Ingestion of the WITS GXP demand files into a columnar demand store.
+
+Demand files are reduced to island demand per trading period as they are
+parsed and written to a month partitioned ColumnarStore, the store holds
+the "Date Time" index and the "Island Name" and "Demand Sum" columns which
+load_masterset aggregates into the National Demand.
+"""
+
+# Standard Library
+import os
+
+# Non C Dependency
+import simplejson as json
+from dateutil.parser import parse
+
+# C Depencency
+import pandas as pd
+import numpy as np
+
+from nzem.frequent_io.columnar import ColumnarStore
+
+try:
+    CONFIG = json.load(open(os.path.join(
+        os.path.expanduser('~/python/nzem/nzem/_static'), 'config.json')))
+except:
+    print "CONFIG File does not exist"
+
+
+def demand_store(path=None):
+    """ Open the demand store, defaults to the demand-store in the config """
+
+    return ColumnarStore(path or CONFIG['demand-store'], partition='M')
+
+
+def transform_demand(df, date="TRADING_DATE", period="TRADING_PERIOD",
+                     node="POC", demand="DEMAND", node_map=None,
+                     date_time="Date Time"):
+    """ Reduce a raw GXP demand DataFrame to island demand per period
+
+    Parameters
+    ----------
+    df: DataFrame
+        The demand file as parsed from WITS
+    date: string, default "TRADING_DATE"
+        Column name of the trading date
+    period: string, default "TRADING_PERIOD"
+        Column name of the trading period
+    node: string, default "POC"
+        Column name of the grid exit point
+    demand: string, default "DEMAND"
+        Column name of the demand
+    node_map: DataFrame, default None
+        Mapping of "Node" to "Island Name", defaults to the nodal metadata
+    date_time: string, default "Date Time"
+        The name of the datetime index
+
+    Returns
+    -------
+    island_demand: DataFrame
+        "Island Name" and "Demand Sum" columns with a datetime index
+
+    """
+
+    if node_map is None:
+        node_map = pd.read_csv(CONFIG['map-location'])
+    islands = node_map.drop_duplicates("Node").set_index("Node")["Island Name"]
+
+    date_map = {x: parse(x) for x in df[date].unique()}
+    dates = df[date].map(date_map).values.astype('datetime64[ns]')
+    minutes = (df[period].values.astype(np.int64) *
+               30).astype('timedelta64[m]')
+
+    reduced = pd.DataFrame({date_time: dates + minutes,
+                            "Island Name": df[node].map(islands).values,
+                            "Demand Sum": df[demand].values.astype(
+                                np.float64)})
+
+    reduced = reduced.groupby([date_time, "Island Name"]).sum().reset_index()
+    return reduced.set_index(date_time)
+
+
+def ingest_demand(df, store=None, **kargs):
+    """ Transform a raw demand DataFrame and write it to the store, any
+    periods already in the store for the same island are replaced.
+    Keyword arguments are passed to transform_demand
+    """
+
+    return write_demand([transform_demand(df, **kargs)], store=store)
+
+
+def write_demand(frames, store=None):
+    """ Write a number of island demand DataFrames (see transform_demand) to
+    the store at once, so each month partition is read and rewritten once
+    however many files cover it. Any periods already in the store for the
+    same island are replaced.
+
+    Returns
+    -------
+    periods: int
+        The number of island periods written
+    """
+
+    frames = list(frames)
+    if not frames:
+        return 0
+
+    store = store or demand_store()
+    island_demand = pd.concat(frames)
+    store.write(island_demand, keys=["Island Name"])
+    return len(island_demand)
+
+
+def load_demand(begin_date=None, end_date=None, store=None):
+    """ Load island demand from the store for a date range
+
+    Returns
+    -------
+    demand: DataFrame
+        "Island Name" and "Demand Sum" indexed by "Date Time"
+    """
+
+    store = store or demand_store()
+    return store.read(begin_date=begin_date, end_date=end_date)
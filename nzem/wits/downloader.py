@@ -0,0 +1,198 @@
+"""
+Concurrent downloader for files hosted on the WITS free to air site.
+
+A single requests Session is shared between a bounded pool of worker
+threads so that connections to the site are kept alive and reused.
+Files are written through a large buffer to a partial file which is
+resumed with an HTTP Range request if a download is interrupted, failed
+downloads are retried with an exponential backoff.
+
+The site defaults to the WITS site in the config file but any base url
+may be passed, e.g. a local HTTP server serving a copy of the files.
+"""
+
+# Standard Library
+import os
+import time
+import urlparse
+from multiprocessing.pool import ThreadPool
+
+# Non C Dependency
+import requests as rq
+from requests.adapters import HTTPAdapter
+import simplejson as json
+
+try:
+    CONFIG = json.load(open(os.path.join(
+        os.path.expanduser('~/python/nzem/nzem/_static'), 'config.json')))
+except:
+    print "CONFIG File does not exist"
+
+
+class WitsDownloader(object):
+    """ Download many files concurrently over a pooled connection
+
+    Usage
+    -----
+    >>>> downloader = WitsDownloader(max_workers=4)
+    >>>> locations = downloader.download_all(urls, '/home/nigel/data/offers')
+    >>>> # Against a local stand in for the site
+    >>>> downloader = WitsDownloader(site='http://localhost:8000/')
+    """
+
+    def __init__(self, site=None, max_workers=4, chunk_size=1024 * 1024,
+                 buffer_size=4 * 1024 * 1024, retries=5, backoff=1.0,
+                 timeout=60, session=None):
+        """ Create a downloader
+
+        Parameters
+        ----------
+        site: string, default None
+            The base url relative links are joined to, defaults to the
+            wits-site in the config file
+        max_workers: int, default 4
+            The number of files to download at once, this is also the size
+            of the connection pool
+        chunk_size: int, default 1 MiB
+            The size of each chunk read from the response
+        buffer_size: int, default 4 MiB
+            The size of the write buffer of each destination file
+        retries: int, default 5
+            How many times to retry a download before raising the error
+        backoff: float, default 1.0
+            The delay before the first retry in seconds, doubled each retry
+        timeout: float, default 60
+            The connection and read timeout of each request in seconds
+        session: requests.Session, default None
+            Optionally pass a preconfigured session to use
+
+        """
+
+        super(WitsDownloader, self).__init__()
+
+        self.site = site or CONFIG['wits-site']
+        self.max_workers = max_workers
+        self.chunk_size = chunk_size
+        self.buffer_size = buffer_size
+        self.retries = retries
+        self.backoff = backoff
+        self.timeout = timeout
+
+        if session is None:
+            session = rq.Session()
+            adapter = HTTPAdapter(pool_connections=1,
+                                  pool_maxsize=max_workers)
+            session.mount('http://', adapter)
+            session.mount('https://', adapter)
+        self.session = session
+
+    def download_all(self, urls, directory):
+        """ Download a number of urls to a directory concurrently
+
+        Parameters
+        ----------
+        urls: iterable
+            The urls to download, relative urls are joined to the site
+        directory: string
+            The directory where the files will be downloaded to
+
+        Returns
+        -------
+        locations: list
+            The absolute paths of the downloaded files in the order of urls
+
+        """
+
+        urls = list(urls)
+        if not urls:
+            return []
+
+        pool = ThreadPool(min(self.max_workers, len(urls)))
+        try:
+            return pool.map(lambda url: self.download(url, directory), urls)
+        finally:
+            pool.close()
+            pool.join()
+
+    def download(self, url, directory):
+        """ Download a single url to a directory, resuming any partial
+        download and retrying on failure.
+
+        Returns
+        -------
+        loc: The absolute path of the file destination
+        """
+
+        url = self.resolve(url)
+        name = os.path.basename(urlparse.urlparse(url).path)
+        loc = os.path.join(directory, name)
+        partial = loc + '.part'
+
+        for attempt in xrange(self.retries + 1):
+            try:
+                self._fetch(url, partial)
+                break
+            except (rq.RequestException, IOError):
+                if attempt == self.retries:
+                    raise
+                time.sleep(self.backoff * 2 ** attempt)
+
+        os.rename(partial, loc)
+        return loc
+
+    def resolve(self, url):
+        """ Join a relative link to the site, absolute urls are untouched """
+
+        if urlparse.urlparse(url).netloc:
+            return url
+        return urlparse.urljoin(self.site, url)
+
+    def _fetch(self, url, partial):
+        """ Fetch a url into the partial file, resuming from its current
+        size if the server honours the Range header.
+        """
+
+        offset = os.path.getsize(partial) if os.path.exists(partial) else 0
+        headers = {'Range': 'bytes=%d-' % offset} if offset else {}
+
+        r = self.session.get(url, stream=True, headers=headers,
+                             timeout=self.timeout)
+
+        # The range starts at or past the end of the file, the partial file
+        # is complete only if it is exactly the size of the file
+        if r.status_code == 416:
+            r.close()
+            if _range_total(r.headers.get('content-range')) == offset:
+                return None
+
+            # A stale or oversized partial file, start from scratch
+            os.remove(partial)
+            return self._fetch(url, partial)
+
+        r.raise_for_status()
+
+        # The server ignored the Range request, start from scratch
+        mode = 'ab' if r.status_code == 206 else 'wb'
+        expected = r.headers.get('content-length')
+
+        written = 0
+        with open(partial, mode, self.buffer_size) as f:
+            for chunk in r.iter_content(chunk_size=self.chunk_size):
+                if chunk:
+                    f.write(chunk)
+                    written += len(chunk)
+
+        if expected is not None and written < int(expected):
+            raise IOError("Incomplete download of %s, received %d of %s bytes"
+                          % (url, written, expected))
+
+
+def _range_total(content_range):
+    """ The complete length of a file from a Content-Range header, e.g.
+    "bytes */1234", None if it is missing or the length is unknown
+    """
+
+    try:
+        return int(content_range.rsplit('/', 1)[1])
+    except (AttributeError, IndexError, ValueError):
+        return None
@@ -0,0 +1,163 @@
+"""
+In process decompression of the archives downloaded from the WITS site.
+
+The archive type is determined from the leading bytes of the file, gzip,
+bzip2 and zip archives are opened with the standard library and can be
+streamed straight into the CSV parser without writing the uncompressed
+file to disk. 7z archives have no standard library reader and fall back
+to the 7z executable.
+"""
+
+# Standard Library
+import os
+import gzip
+import bz2
+import zipfile
+import shutil
+import subprocess
+import tempfile
+import functools
+from contextlib import contextmanager
+from multiprocessing import Pool
+
+# C Depencency
+import pandas as pd
+
+
+MAGIC_NUMBERS = (('\x1f\x8b', 'gzip'),
+                 ('BZh', 'bz2'),
+                 ('PK\x03\x04', 'zip'),
+                 ('7z\xbc\xaf\x27\x1c', '7z'))
+
+
+def archive_type(file_name):
+    """ Return the archive type of a file from its magic number, one of
+    ("gzip", "bz2", "zip", "7z") or None if it is not compressed.
+    """
+
+    with open(file_name, 'rb') as f:
+        head = f.read(6)
+
+    for magic, kind in MAGIC_NUMBERS:
+        if head.startswith(magic):
+            return kind
+    return None
+
+
+@contextmanager
+def open_archive(file_name):
+    """ Open the (single) file contained within an archive as a file like
+    object, uncompressed files are opened as is.
+
+    Usage
+    -----
+    >>>> with open_archive('offers20130701.csv.gz') as f:
+    >>>>     df = pd.read_csv(f)
+    """
+
+    kind = archive_type(file_name)
+
+    if kind == 'gzip':
+        f = gzip.open(file_name, 'rb')
+    elif kind == 'bz2':
+        f = bz2.BZ2File(file_name, 'rb')
+    elif kind == 'zip':
+        archive = zipfile.ZipFile(file_name)
+        f = archive.open(archive.namelist()[0])
+    elif kind == '7z':
+        # stderr goes to a file as an unread pipe can fill and block 7z
+        errors = tempfile.TemporaryFile()
+        process = subprocess.Popen(['7z', 'e', '-so', file_name],
+                                   stdout=subprocess.PIPE, stderr=errors)
+        f = process.stdout
+    else:
+        f = open(file_name, 'rb')
+
+    try:
+        yield f
+    finally:
+        f.close()
+        if kind == 'zip':
+            archive.close()
+        elif kind == '7z':
+            process.wait()
+            errors.seek(0)
+            message = errors.read().strip()
+            errors.close()
+
+    if kind == '7z' and process.returncode:
+        raise IOError("7z failed to extract %s (exit code %d): %s"
+                      % (file_name, process.returncode, message))
+
+
+def extract_file(file_name, delete_original=True):
+    """ Decompress an archive into the same directory as the archive,
+    the output has the name of the archive with the extension removed.
+    Files which are not compressed are returned untouched.
+
+    Parameters
+    ----------
+    file_name: The file name to be extracted
+    delete_original: Whether to remove the archive afterwards
+
+    Returns
+    -------
+    output_name: The name of the extracted file
+    """
+
+    if archive_type(file_name) is None:
+        return file_name
+
+    output_name = os.path.splitext(file_name)[0]
+
+    with open_archive(file_name) as f:
+        with open(output_name, 'wb') as out:
+            shutil.copyfileobj(f, out, 1024 * 1024)
+
+    if delete_original:
+        os.remove(file_name)
+
+    return output_name
+
+
+def read_archive(file_name, **kargs):
+    """ Parse the CSV file within an archive into a DataFrame without
+    writing the uncompressed file to disk, kargs are passed to read_csv
+    """
+
+    with open_archive(file_name) as f:
+        return pd.read_csv(f, **kargs)
+
+
+def read_archives(file_names, processes=None, **kargs):
+    """ Parse a number of archives into DataFrames, optionally in a pool
+    of worker processes.
+
+    Parameters
+    ----------
+    file_names: iterable
+        The archives to be parsed
+    processes: int, default None
+        The number of worker processes, if None the archives are parsed
+        in this process one after another
+    **kargs:
+        Keyword arguments passed to read_csv
+
+    Returns
+    -------
+    frames: list
+        A DataFrame for each archive in the order given
+
+    """
+
+    reader = functools.partial(read_archive, **kargs)
+
+    if not processes:
+        return map(reader, file_names)
+
+    pool = Pool(processes)
+    try:
+        return pool.map(reader, file_names)
+    finally:
+        pool.close()
+        pool.join()
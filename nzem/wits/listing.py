@@ -0,0 +1,165 @@
+"""
+Scraping of the file listings on the WITS free to air site.
+
+The listing pages are large and were previously parsed in chunks to work
+around a parser problem, which could split an anchor across two chunks.
+Here the page is streamed through a single HTMLParser which buffers any
+tag left incomplete at the end of a chunk, so each page is parsed once.
+
+Listings are cached on disk along with the ETag and Last-Modified headers
+of the response. Later requests are made conditional on these, when the
+page has not changed the site answers 304 Not Modified and the cached
+links are used without downloading or parsing the page again.
+"""
+
+# Standard Library
+import os
+import hashlib
+from HTMLParser import HTMLParser
+
+# Non C Dependency
+import requests as rq
+import simplejson as json
+
+try:
+    CONFIG = json.load(open(os.path.join(
+        os.path.expanduser('~/python/nzem/nzem/_static'), 'config.json')))
+except:
+    print "CONFIG File does not exist"
+
+
+class LinkExtractor(HTMLParser):
+    """ Collect the href of every anchor whose link contains a pattern """
+
+    def __init__(self, pattern='.csv'):
+        HTMLParser.__init__(self)
+        self.pattern = pattern
+        self.links = []
+
+    def handle_starttag(self, tag, attrs):
+        if tag != 'a':
+            return None
+        for name, value in attrs:
+            if name == 'href' and value and self.pattern in value:
+                self.links.append(value)
+
+
+def extract_links(chunks, pattern='.csv'):
+    """ Extract the links from an HTML page in a single pass
+
+    Parameters
+    ----------
+    chunks: string or iterable
+        The page, either whole or as an iterable of chunks of text
+    pattern: string, default '.csv'
+        Only links containing the pattern are returned
+
+    Returns
+    -------
+    links: list
+        The matching links in the order they appear on the page
+
+    """
+
+    if isinstance(chunks, basestring):
+        chunks = [chunks]
+
+    parser = LinkExtractor(pattern=pattern)
+    for chunk in chunks:
+        parser.feed(chunk)
+    parser.close()
+    return parser.links
+
+
+class ListingCache(object):
+    """ An on disk cache of scraped listing pages
+
+    Usage
+    -----
+    >>>> cache = ListingCache()
+    >>>> links = cache.fetch(url)
+    >>>> # A second fetch costs a single conditional request
+    >>>> links = cache.fetch(url)
+    """
+
+    def __init__(self, folder=None, session=None, pattern='.csv',
+                 chunk_size=64 * 1024):
+        """ Create a listing cache
+
+        Parameters
+        ----------
+        folder: string, default None
+            Where cached listings are saved, defaults to the
+            wits-cache-folder in the config file
+        session: requests.Session, default None
+            Optionally pass a session to reuse connections
+        pattern: string, default '.csv'
+            Only links containing the pattern are kept
+        chunk_size: int, default 64 KiB
+            The size of each chunk of the page fed to the parser
+
+        """
+
+        super(ListingCache, self).__init__()
+
+        self.folder = folder or os.path.join(CONFIG['wits-cache-folder'],
+                                             'listings')
+        self.session = session or rq.Session()
+        self.pattern = pattern
+        self.chunk_size = chunk_size
+
+    def fetch(self, url, refresh=False):
+        """ Return the links on a listing page, using the cached copy
+        when the site reports the page has not been modified.
+
+        Parameters
+        ----------
+        url: The url of the listing page
+        refresh: Ignore any cached copy and fetch the whole page
+
+        Returns
+        -------
+        links: A list of the links on the page
+        """
+
+        cached = None if refresh else self._load(url)
+
+        headers = {}
+        if cached:
+            if cached.get('etag'):
+                headers['If-None-Match'] = cached['etag']
+            if cached.get('last_modified'):
+                headers['If-Modified-Since'] = cached['last_modified']
+
+        r = self.session.get(url, headers=headers, stream=True)
+
+        if r.status_code == 304 and cached:
+            r.close()
+            return cached['links']
+
+        r.raise_for_status()
+
+        links = extract_links(r.iter_content(chunk_size=self.chunk_size),
+                              pattern=self.pattern)
+
+        self._save(url, {'url': url, 'links': links,
+                         'etag': r.headers.get('etag'),
+                         'last_modified': r.headers.get('last-modified')})
+        return links
+
+    def _cache_name(self, url):
+        return os.path.join(self.folder,
+                            hashlib.md5(url).hexdigest() + '.json')
+
+    def _load(self, url):
+        fname = self._cache_name(url)
+        if not os.path.exists(fname):
+            return None
+        with open(fname) as f:
+            return json.load(f)
+
+    def _save(self, url, entry):
+        if not os.path.exists(self.folder):
+            os.makedirs(self.folder)
+        with open(self._cache_name(url), 'w') as f:
+            json.dump(entry, f)
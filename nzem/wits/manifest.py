@@ -0,0 +1,154 @@
+"""
+Local manifest of the WITS files mirrored to disk.
+
+For every file downloaded the manifest records the url, the local path,
+the size and MD5 checksum of the local copy as well as the ETag and
+Last-Modified headers the site reported. On the next sync a file is only
+fetched again if it is missing locally or the site reports a change.
+"""
+
+# Standard Library
+import os
+import hashlib
+import datetime
+
+# Non C Dependency
+import simplejson as json
+
+try:
+    CONFIG = json.load(open(os.path.join(
+        os.path.expanduser('~/python/nzem/nzem/_static'), 'config.json')))
+except:
+    print "CONFIG File does not exist"
+
+
+class SyncManifest(object):
+    """ Record of the files mirrored from the WITS site
+
+    Usage
+    -----
+    >>>> manifest = SyncManifest()
+    >>>> if not manifest.is_current(url, session.head(url).headers):
+    >>>>     loc = downloader.download(url, directory)
+    >>>>     manifest.record(url, loc, headers)
+    >>>> manifest.save()
+    """
+
+    def __init__(self, fname=None):
+        """ Load the manifest, an empty manifest is created if the file
+        does not exist yet.
+
+        Parameters
+        ----------
+        fname: string, default None
+            The manifest location, defaults to manifest.json in the
+            wits-cache-folder of the config file
+
+        """
+
+        super(SyncManifest, self).__init__()
+
+        self.fname = fname or os.path.join(CONFIG['wits-cache-folder'],
+                                           'manifest.json')
+        self.entries = {}
+        if os.path.exists(self.fname):
+            with open(self.fname) as f:
+                self.entries = json.load(f)
+
+    def __contains__(self, url):
+        return url in self.entries
+
+    def __len__(self):
+        return len(self.entries)
+
+    def get(self, url):
+        return self.entries.get(url)
+
+    def is_current(self, url, headers=None):
+        """ Whether the local copy of a url is present and up to date
+
+        Parameters
+        ----------
+        url: The url of the remote file
+        headers: The headers of a HEAD request to the url, if None only
+                 the presence and size of the local copy is checked
+
+        Returns
+        -------
+        current: True if the file does not need to be fetched
+        """
+
+        entry = self.entries.get(url)
+        if not entry or not os.path.exists(entry['local_path']):
+            return False
+
+        if os.path.getsize(entry['local_path']) != entry['size']:
+            return False
+
+        if not headers:
+            return True
+
+        etag = headers.get('etag')
+        if etag and entry.get('etag'):
+            return etag == entry['etag']
+
+        modified = headers.get('last-modified')
+        if modified and entry.get('last_modified') and \
+                modified != entry['last_modified']:
+            return False
+
+        length = headers.get('content-length')
+        if length is not None and int(length) != entry['size']:
+            return False
+
+        return True
+
+    def record(self, url, local_path, headers=None):
+        """ Record a freshly downloaded file """
+
+        headers = headers or {}
+        self.entries[url] = {'url': url,
+                             'local_path': os.path.abspath(local_path),
+                             'size': os.path.getsize(local_path),
+                             'checksum': self.checksum(local_path),
+                             'etag': headers.get('etag'),
+                             'last_modified': headers.get('last-modified'),
+                             'synced': datetime.datetime.now().isoformat()}
+        return self.entries[url]
+
+    def remove(self, url, delete_file=False):
+        """ Drop a url from the manifest, optionally deleting its file """
+
+        entry = self.entries.pop(url, None)
+        if entry and delete_file and os.path.exists(entry['local_path']):
+            os.remove(entry['local_path'])
+        return entry
+
+    def verify(self, url):
+        """ Check the local copy of a url against the recorded checksum """
+
+        entry = self.entries.get(url)
+        if not entry or not os.path.exists(entry['local_path']):
+            return False
+        return self.checksum(entry['local_path']) == entry['checksum']
+
+    def save(self):
+        directory = os.path.dirname(self.fname)
+        if directory and not os.path.exists(directory):
+            os.makedirs(directory)
+
+        # Write then rename so an interrupted save leaves the old manifest
+        partial = self.fname + '.tmp'
+        with open(partial, 'w') as f:
+            json.dump(self.entries, f, indent=1)
+        os.rename(partial, self.fname)
+
+    @staticmethod
+    def checksum(fname, block_size=1024 * 1024):
+        """ The MD5 hex digest of a file """
+
+        md5 = hashlib.md5()
+        with open(fname, 'rb') as f:
+            for block in iter(lambda: f.read(block_size), ''):
+                md5.update(block)
+        return md5.hexdigest()
@@ -0,0 +1,205 @@
+"""
+Overlapped processing of WITS files as a chain of concurrent stages.
+
+Each stage has its own pool of worker threads and pulls work from a
+bounded queue filled by the stage before it, so while one file is being
+downloaded another can be parsed and a third ingested. The bounded
+queues stop a fast stage from running too far ahead of a slow one.
+Throughput counters are kept for every stage.
+
+Network transfer, zlib decompression and the C CSV parser all release
+the GIL for the bulk of their work, so threads give a real overlap here.
+"""
+
+# Standard Library
+import sys
+import time
+import threading
+import Queue
+from collections import OrderedDict
+
+
+_DONE = object()
+
+
+class StageCounter(object):
+    """ Throughput counters for a single pipeline stage """
+
+    def __init__(self, name, workers):
+        super(StageCounter, self).__init__()
+        self.name = name
+        self.workers = workers
+        self.items = 0
+        self.errors = 0
+        self.busy = 0.0
+        self.started = None
+        self.finished = None
+        self._lock = threading.Lock()
+
+    def record(self, seconds, error=False):
+        with self._lock:
+            if error:
+                self.errors += 1
+            else:
+                self.items += 1
+            self.busy += seconds
+
+    @property
+    def elapsed(self):
+        if self.started is None:
+            return 0.0
+        return (self.finished or time.time()) - self.started
+
+    @property
+    def throughput(self):
+        """ Items completed per second of wall clock time """
+        return self.items / self.elapsed if self.elapsed else 0.0
+
+    def __repr__(self):
+        return ("<%s: %d items, %d errors, %.2f items/s, %d workers>"
+                % (self.name, self.items, self.errors, self.throughput,
+                   self.workers))
+
+
+class Pipeline(object):
+    """ A chain of stages connected by bounded queues
+
+    Usage
+    -----
+    >>>> pipe = Pipeline(maxsize=8)
+    >>>> pipe.add_stage("download", download, workers=4)
+    >>>> pipe.add_stage("parse", read_archive, workers=2)
+    >>>> frames = pipe.run(urls)
+    >>>> pipe.stats()
+    """
+
+    def __init__(self, maxsize=8):
+        """ Create an empty pipeline
+
+        Parameters
+        ----------
+        maxsize: int, default 8
+            The maximum number of items waiting between two stages
+
+        """
+        super(Pipeline, self).__init__()
+        self.maxsize = maxsize
+        self.stages = []
+        self.counters = OrderedDict()
+        self.failures = []
+
+    def add_stage(self, name, func, workers=1):
+        """ Append a stage which applies func to every item passed to it,
+        the name of every stage must be unique.
+        """
+
+        if name in self.counters:
+            raise ValueError("The pipeline already has a %s stage" % name)
+
+        self.stages.append((name, func, workers))
+        self.counters[name] = StageCounter(name, workers)
+        return self
+
+    def run(self, items):
+        """ Feed items through every stage and return the output of the
+        final stage. Items which raise an error in a stage are dropped and
+        recorded, along with the error, in self.failures. An error raised
+        by the items iterator itself is re-raised once the stages have
+        finished the items already passed to them.
+
+        Returns
+        -------
+        results: list
+            The output of the final stage, in order of completion
+        """
+
+        if not self.stages:
+            return list(items)
+
+        queues = [Queue.Queue(self.maxsize) for _ in self.stages]
+        queues.append(Queue.Queue())
+
+        threads = []
+        for i, (name, func, workers) in enumerate(self.stages):
+            remaining = [workers]
+            lock = threading.Lock()
+            self.counters[name].started = time.time()
+            for _ in xrange(workers):
+                t = threading.Thread(target=self._worker,
+                                     args=(name, func, queues[i],
+                                           queues[i + 1], remaining, lock,
+                                           self._workers(i + 1)))
+                t.daemon = True
+                t.start()
+                threads.append(t)
+
+        feed_error = None
+        try:
+            for item in items:
+                queues[0].put(item)
+        except Exception:
+            feed_error = sys.exc_info()
+        finally:
+            for _ in xrange(self._workers(0)):
+                queues[0].put(_DONE)
+
+        results = []
+        while True:
+            item = queues[-1].get()
+            if item is _DONE:
+                break
+            results.append(item)
+
+        for t in threads:
+            t.join()
+
+        if feed_error is not None:
+            raise feed_error[0], feed_error[1], feed_error[2]
+
+        return results
+
+    def stats(self):
+        """ Return the counters of every stage as a list of dictionaries """
+
+        return [{'stage': c.name, 'workers': c.workers, 'items': c.items,
+                 'errors': c.errors, 'elapsed': c.elapsed, 'busy': c.busy,
+                 'throughput': c.throughput}
+                for c in self.counters.values()]
+
+    def _workers(self, i):
+        """ The number of consumers of the i'th queue """
+
+        if i < len(self.stages):
+            return self.stages[i][2]
+        return 1
+
+    def _worker(self, name, func, inbox, outbox, remaining, lock, consumers):
+        """ Process items from the inbox until the stage is finished, the
+        last worker of a stage to finish signals the next stage.
+        """
+
+        counter = self.counters[name]
+        while True:
+            item = inbox.get()
+            if item is _DONE:
+                break
+
+            begin = time.time()
+            try:
+                result = func(item)
+            except Exception as e:
+                counter.record(time.time() - begin, error=True)
+                self.failures.append((name, item, e))
+                continue
+
+            counter.record(time.time() - begin)
+            outbox.put(result)
+
+        with lock:
+            remaining[0] -= 1
+            last = remaining[0] == 0
+
+        if last:
+            counter.finished = time.time()
+            for _ in xrange(consumers):
+                outbox.put(_DONE)
@@ -16,21 +16,25 @@ intended to make interfacing with the WITS free to air site much nicer.
 
 # Standard Library
 import os
-import urlparse
-import subprocess
-import sys
 import datetime
 from collections import defaultdict
+from multiprocessing.pool import ThreadPool
 from dateutil.parser import parse
 
 # Non C Dependency
-import requests as rq
 import simplejson as json
-from bs4 import BeautifulSoup
 
 # C Depencency
 import pandas as pd
 
+from nzem.wits.downloader import WitsDownloader
+from nzem.wits.extract import extract_file, read_archive, read_archives
+from nzem.wits.pipeline import Pipeline
+from nzem.wits.listing import ListingCache
+from nzem.wits.catalog import WitsCatalog
+from nzem.wits.manifest import SyncManifest
+from nzem.wits.demand import transform_demand, write_demand, demand_store
+
 # Load the master CONFIG json file
 try:
     CONFIG = json.load(open(os.path.join(
@@ -47,9 +51,14 @@ class WitsScraper:
         if scrape_offers:
             print "Scraping Offer Files"
             self.current_files, self.historic_files = self._scrape_offers()
+            self.catalog = WitsCatalog(
+                            current=self._yield_product(self.current_files),
+                            historic=self._yield_product(self.historic_files))
+            self.catalog.save()
             print "Offer Files Successfully Scraped"
         if scrape_demand:
             print "Scraping Demand Files"
+            self.demand_files = self._scrape_demand()
             print "Demand Files Sucessfully Scraped"
 
 
@@ -86,35 +95,66 @@ class WitsScraper:
         return (current_files, historic_files)
 
 
-    def _scrape_offer(self, path):
+    def _scrape_demand(self, current=True, historic=True):
+        """ Scrape the demand files from the current and historic demand
+        pages and index them by date.
+
+        Parameters
+        ----------
+        current: Scrape the current daily files off the website
+        historic: Scrape the historic files off the website
+
+        Returns
+        -------
+        demand_files: A WitsCatalog of the demand files
+        """
+
+        current_files = []
+        historic_files = []
+
+        if current:
+            current_files = self._scrape_offer(CONFIG['wits-demand-current'])
+
+        if historic:
+            historic_files = self._scrape_offer(CONFIG['wits-demand-historic'])
+
+        return WitsCatalog(current=current_files, historic=historic_files,
+                           products=CONFIG['wits-demand-types'])
+
+
+    def _scrape_offer(self, path, refresh=False):
         """
         Non-exposed method to scrape a particular path, it assumes that the site
         is the WITS free to air site and will preprend this to the requests query.
 
         Notes:
         ------
-        This function was exhibiting strange behaviour and not returning all of
-        the links when implemented in a simple fashion. To overcome this I've
-        split the requests message (r.text) to be parsed into chunks which are
-        then fed to the link finder. This isn't perfect and could likely be
-        implemented in a far nicer fashion, however it suffices for now.
+        The page is parsed once as it is streamed, see nzem.wits.listing.
+        Listings are cached on disk and requested conditionally, if the
+        page has not changed since the last scrape the cached links are used.
 
         Parameters
         ----------
         path: The path to be scraped, either current or historic offers typically
+        refresh: Ignore the cached listing and scrape the whole page
 
         Returns
         -------
         offer_files: A list of all of the offer files which could be scraped from the
                      particular path.
         """
-        r = rq.get(os.path.join(CONFIG['wits-site'], path))
-        chunky_soup = self._chunk_soup(r.text)
-        soups = (BeautifulSoup(chunk) for chunk in chunky_soup)
-        chunky_links = (soup_chunk.find_all('a') for soup_chunk in soups)
-        links = self._flatten(chunky_links)
-        offer_files = self._link_yield(links)
-        return offer_files
+        url = os.path.join(CONFIG['wits-site'], path)
+        return self._listing().fetch(url, refresh=refresh)
+
+
+    def _listing(self):
+        """ Non-exposed method returning the shared ListingCache, it uses the
+        same session as the downloader so connections are reused
+        """
+
+        if getattr(self, 'listing', None) is None:
+            self.listing = ListingCache(session=self._downloader().session)
+        return self.listing
 
 
     def _sort_files(self, files):
@@ -156,22 +196,34 @@ class WitsScraper:
         loc: The absolute path of the file destination
         """
 
-        local_name = os.path.split(url)[1]
-        loc = os.path.join(directory, local_name)
-        r = rq.get(url, stream=True)
-        with open(loc, 'wb') as f:
-            for chunk in r.iter_content(chunk_size=1024):
-                if chunk:
-                    f.write(chunk)
-                    f.flush()
-        return loc
+        return self._downloader().download(url, directory)
+
+
+    def _downloader(self, max_workers=None):
+        """ Non-exposed method returning the shared WitsDownloader, created
+        on first use so the connection pool is reused between searches.
+        It is rebuilt if a different max_workers is asked for, as the size
+        of its connection pool is fixed when it is created.
+        """
+
+        downloader = getattr(self, 'downloader', None)
+        if downloader is None:
+            self.downloader = WitsDownloader(max_workers=max_workers or 4)
+        elif max_workers is not None and downloader.max_workers != max_workers:
+            downloader.session.close()
+            self.downloader = WitsDownloader(max_workers=max_workers)
+            if getattr(self, 'listing', None) is not None:
+                self.listing.session = self.downloader.session
+        return self.downloader
 
 
     def _extract_file(self, file_name, delete_original=True, output=False):
         """
         Non-exposed method to extract a compressed file in the same location
         as the file itself, not the present path. Optional flags to delete
-        the compressed file and return output if desired
+        the compressed file and return output if desired.
+
+        The archive is decompressed in process, see nzem.wits.extract
 
         Parameters
         ----------
@@ -179,18 +231,10 @@ class WitsScraper:
 
         Returns
         -------
-        output_name: The name of the extracted file created by 7z
+        output_name: The name of the extracted file
         """
 
-        directory = os.path.split(file_name)[0]
-        output_filename = os.path.splitext(os.path.split(file_name)[1])[0]
-        outdir = '-o%s' % directory
-        output_name = os.path.join(directory, output_filename)
-        s = subprocess.call(['7z', 'e', '-y', outdir, file_name], stderr=subprocess.STDOUT,
-                        stdout=subprocess.PIPE)
-
-        if delete_original:
-            os.remove(file_name)
+        output_name = extract_file(file_name, delete_original=delete_original)
 
         if output:
             print "Successfully extracted %s to %s" % (file_name,
@@ -201,76 +245,151 @@ class WitsScraper:
         return output_name
 
 
-    def _filter_offer_dates(self, product=False, begin_date=None, end_date=None):
-        """ Find the file(s) which contain the beginning and end date within them
-        Return the file for a specific product as required, else return
-        a dictionary with lists containing the output.
+    def _load_search(self, directory, search_results=None, processes=None,
+                     max_workers=4, **kargs):
+        """ Download the results of a search and parse them straight into
+        a single DataFrame, the archives are decompressed as they are read
+        so no uncompressed files are written to disk.
 
         Parameters
         ----------
-        product: The product to be filtered (if any)
-        begin_date: The beginning date to find files for
-        end_date: The end date to find files for
+        directory: The directory where the archives will be downloaded to
+        search_results: The urls to download, defaults to the last search
+        processes: The number of worker processes used to parse archives
+        max_workers: The number of files to download at once
+        **kargs: Keyword arguments passed to read_csv
 
         Returns
         -------
-        search_results: The results of the search through the offer files
+        df: A DataFrame of the concatenated files
         """
 
-        begin_date = self._parse_to_datetime(begin_date)
-        end_date = self._parse_to_datetime(end_date)
+        locations = self._download_search(directory,
+                                          search_results=search_results,
+                                          extract=False,
+                                          max_workers=max_workers)
+
+        frames = read_archives(locations, processes=processes, **kargs)
+        return pd.concat(frames, ignore_index=True)
+
+
+    def _pipeline_search(self, directory, search_results=None,
+                         download_workers=4, parse_workers=2, ingest=None,
+                         ingest_workers=1, maxsize=8, **kargs):
+        """ Download and parse the results of a search with the stages
+        overlapped, a file can be parsing while others download. Archives
+        are parsed straight from the download without being decompressed
+        to disk, see nzem.wits.extract.read_archive.
+
+        Parameters
+        ----------
+        directory: The directory where the archives will be downloaded to
+        search_results: The urls to process, defaults to the last search
+        download_workers: The number of concurrent downloads
+        parse_workers: The number of files parsed at once
+        ingest: Optional function applied to each parsed DataFrame, e.g.
+                to write it to a store, its return value is collected
+        ingest_workers: The number of concurrent ingest calls
+        maxsize: The maximum number of items waiting between two stages
+        **kargs: Keyword arguments passed to read_csv
 
-        begin_str = begin_date.strftime('%Y%m%d')
-        end_str = end_date.strftime('%Y%m%d')
+        Returns
+        -------
+        results: A DataFrame of the parsed files if ingest is None, else
+                 a list of the ingest results. The stage counters are kept
+                 in self.pipeline, see self.pipeline.stats(). An empty
+                 search gives an empty DataFrame, a ValueError is raised if
+                 every file failed
+        """
+
+        if search_results == None:
+            try:
+                search_results = self.search_results
+            except:
+                raise ValueError('You must have either completed a recent search\
+                                  or pass search results to this function')
 
-        # Filter by product if needed
-        current = list(self._yield_product(self.current_files, product=product))
-        historic = list(self._yield_product(self.historic_files, product=product))
+        self._ensure_directory(directory)
+        downloader = self._downloader(download_workers)
 
+        self.pipeline = Pipeline(maxsize=maxsize)
+        self.pipeline.add_stage("download",
+                                lambda url: downloader.download(url,
+                                                                directory),
+                                workers=download_workers)
+        self.pipeline.add_stage("parse",
+                                lambda loc: read_archive(loc, **kargs),
+                                workers=parse_workers)
+        if ingest:
+            self.pipeline.add_stage("ingest", ingest, workers=ingest_workers)
 
+        results = self.pipeline.run(search_results)
 
-        # Try the current files first
-        if self._match_true(begin_str, current) and self._match_true(end_str, current):
-            dates = [d.strftime("%Y%m%d") for d in pd.date_range(begin_date,
-                                                                 end_date)]
+        for stage, item, error in self.pipeline.failures:
+            print "Failed to %s %s: %s" % (stage, item, error)
 
-            search_results = [self._match_iterables(item, current)
-                              for item in dates]
+        if not results and self.pipeline.failures:
+            raise ValueError("Every file failed to process: %s"
+                             % self.pipeline.failures)
 
-        # See if it partially matches historic, partially matches current
-        elif self._match_true(end_str, current) and not self._match_true(begin_str, current):
+        if ingest:
+            return results
+        if not results:
+            return pd.DataFrame()
+        return pd.concat(results, ignore_index=True)
+
+
+    def _filter_offer_dates(self, product=False, begin_date=None, end_date=None):
+        """ Find the file(s) which contain the beginning and end date within them
+        Return the file for a specific product as required, else return
+        the files for every product.
 
-            daily_dates = [d.strftime("%Y%m%d") for d in pd.date_range(begin_date,
-                                                                 end_date)]
-            monthly_dates = [d.strftime("%Y%m") for d in pd.date_range(
-                                                    begin_date,
-                                                    end_date + datetime.timedelta(days=31),
-                                                    freq="M", normalize=True)]
+        Monthly historic files are used where available, with daily current
+        files covering the days of months not yet published. The search is a
+        range lookup on the date indexed catalog, if no offers have been
+        scraped the catalog saved by the last scrape is used.
 
-            daily_results = [self._match_iterables(item, current)
-                              for item in daily_dates]
-            monthly_results = [self._match_iterables(item, historic) for item in
-                                monthly_dates]
+        Parameters
+        ----------
+        product: The product to be filtered (if any)
+        begin_date: The beginning date to find files for
+        end_date: The end date to find files for
 
-            search_results = daily_results + monthly_results
+        Returns
+        -------
+        search_results: The results of the search through the offer files
+        """
 
-        # Scrape the historic files
-        elif begin_str not in current and end_str not in current:
-            month_dates = [d.strftime("%Y%m") for d in pd.date_range(
-                                                    begin_date,
-                                                    end_date + datetime.timedelta(days=31),
-                                                    freq="M", normalize=True)]
+        if getattr(self, 'catalog', None) is None:
+            self.catalog = WitsCatalog.load()
 
-            search_results = [self._match_iterables(item, historic) for item in
-                                month_dates]
+        begin_date = self._parse_to_datetime(begin_date)
+        end_date = self._parse_to_datetime(end_date)
 
         # Return the search results, save the last search to an internal
         # attribute for safe keeping
-        search_results = filter(lambda x: x != None, search_results)
+        search_results = self.catalog.files(product=product or None,
+                                            begin_date=begin_date,
+                                            end_date=end_date)
         self.search_results = search_results
         return search_results
 
-    def _download_search(self, directory, search_results=None, extract=True):
+    def _download_search(self, directory, search_results=None, extract=True,
+                         max_workers=4):
+        """ Download the results of a search to a directory, the files are
+        downloaded concurrently over a shared connection pool.
+
+        Parameters
+        ----------
+        directory: The directory where the files will be downloaded to
+        search_results: The urls to download, defaults to the last search
+        extract: Whether to extract the downloaded files
+        max_workers: The number of files to download at once
+
+        Returns
+        -------
+        locations: The locations of the downloaded (or extracted) files
+        """
 
         if search_results == None:
             try:
@@ -281,34 +400,143 @@ class WitsScraper:
 
         self._ensure_directory(directory)
         print "Attempting to downloads files to %s" % directory
-        for result in search_results:
-            try:
-                location = self._download_file(result, directory)
-                if extract:
-                    output_name = self._extract_file(location)
-            except:
-                url = urlparse.urljoin(CONFIG['wits-site'], result)
-                location = self._download_file(url, directory)
-                if extract:
-                    output_name = self._extract_file(location)
+        locations = self._downloader(max_workers).download_all(search_results,
+                                                               directory)
+        if extract:
+            locations = [self._extract_file(loc) for loc in locations]
         print "Downloads completed"
+        return locations
 
 
-    #### Assistance and helper functions
+    def _ingest_demand(self, directory, begin_date=None, end_date=None,
+                       store=None, download_workers=4, parse_workers=2,
+                       **kargs):
+        """ Download the demand files for a date range and write them to
+        the columnar demand store, see nzem.wits.demand. Downloads, parsing
+        and the reduction to island demand are overlapped, the reduced files
+        are then written together so each month of the store is rewritten
+        once.
+
+        Parameters
+        ----------
+        directory: The directory where the archives will be downloaded to
+        begin_date: The first date to ingest demand for
+        end_date: The last date to ingest demand for
+        store: A ColumnarStore, defaults to the demand-store in the config
+        download_workers: The number of concurrent downloads
+        parse_workers: The number of files parsed at once
+        **kargs: Keyword arguments passed to transform_demand
+
+        Returns
+        -------
+        periods: The number of island periods written for each file
+        """
+
+        if getattr(self, 'demand_files', None) is None:
+            self.demand_files = self._scrape_demand()
+
+        store = store or demand_store()
+        files = self.demand_files.files(begin_date=begin_date,
+                                        end_date=end_date)
+
+        frames = self._pipeline_search(directory, search_results=files,
+                                       download_workers=download_workers,
+                                       parse_workers=parse_workers,
+                                       ingest=lambda df: transform_demand(
+                                           df, **kargs))
+        write_demand(frames, store=store)
+        return [len(x) for x in frames]
+
+
+    def _sync_offers(self, directory, product=None, begin_date=None,
+                     end_date=None, prune=True, max_workers=4, manifest=None):
+        """ Incrementally mirror the offer files to a directory, only files
+        which are new or have changed on the site since the last sync are
+        downloaded. Each product is saved to its own sub directory as per
+        the wits-offer-directories in the config file.
+
+        Once a month is published as a monthly historic file the daily
+        current files for it are superseded, these are not fetched and
+        with prune set are deleted from the mirror, but only once the
+        monthly file is mirrored and current in the manifest.
+
+        Parameters
+        ----------
+        directory: The directory of the local mirror
+        product: The product to sync, if None every product
+        begin_date: Only sync files covering days from this date
+        end_date: Only sync files covering days up to this date
+        prune: Delete superseded daily files from the mirror
+        max_workers: The number of files to check and download at once
+        manifest: A SyncManifest, defaults to the manifest in the cache folder
+
+        Returns
+        -------
+        fetched: The locations of the files downloaded in this sync
+        """
+
+        if getattr(self, 'catalog', None) is None:
+            self.catalog = WitsCatalog.load()
+
+        if manifest is None:
+            manifest = SyncManifest()
+
+        downloader = self._downloader(max_workers)
+        superseded = self.catalog.superseded_by(product or None)
+        products = [product] if product else CONFIG['wits-offer-types']
+
+        wanted = [downloader.resolve(e[2]) for p in products for e in
+                  self.catalog.overlapping(p, begin_date, end_date)
+                  if e[2] not in superseded]
+
+        targets = {}
+        self._ensure_directory(directory)
+        for p in products:
+            targets[p] = os.path.join(directory,
+                                      CONFIG['wits-offer-directories'][p])
+            self._ensure_directory(targets[p])
 
-    def _match_iterables(self, item, iterable):
-        """ Return the string in the iterable which matches the item """
-        for it in iterable:
-            if item in it:
-                return it
+        def fetch(url):
+            try:
+                headers = downloader.session.head(url,
+                                timeout=downloader.timeout).headers
+                if manifest.is_current(url, headers):
+                    return (url, None, headers)
+                target = targets[self.catalog.product(url)]
+                return (url, downloader.download(url, target), headers)
+            except Exception as e:
+                print "Failed to sync %s: %s" % (url, e)
+                return (url, None, None)
+
+        pool = ThreadPool(max_workers)
+        try:
+            results = pool.map(fetch, wanted)
+        finally:
+            pool.close()
+            pool.join()
+
+        fetched, failed = [], set()
+        for url, loc, headers in results:
+            if loc:
+                manifest.record(url, loc, headers)
+                fetched.append(loc)
+            elif headers is None:
+                failed.add(url)
+
+        if prune:
+            for daily, monthly in superseded.items():
+                monthly = downloader.resolve(monthly)
+                if monthly not in failed and manifest.is_current(monthly):
+                    manifest.remove(downloader.resolve(daily),
+                                    delete_file=True)
+
+        manifest.save()
+        print "Synced %d of %d files to %s" % (len(fetched), len(wanted),
+                                               directory)
+        return fetched
 
-    def _match_true(self, item, iterable):
-        """ Return true if item matches any part of the items in the iterable """
-        for it in iterable:
-            if item in it:
-                return True
-        return False
 
+    #### Assistance and helper functions
 
     def _parse_to_datetime(self, dt):
         """ Simple function to parse the datetime if it is not already a
@@ -320,6 +548,8 @@ class WitsScraper:
 
     def _yield_product(self, d, product=False):
         """ Yield a flattened list of items from a nested dictionary """
+        if not d:
+            return
         if product:
             for item in d[product]:
                 yield item
@@ -328,39 +558,6 @@ class WitsScraper:
                 for item in d[key]:
                     yield item
 
-    def _chunk_soup(self, rtext, chunk_size=1000):
-        """ Return a number of requests text chunks, this is to ensure
-        that the scraper does not error before reaching the end.
-        Quite a strange bug really...
-
-        Parameters
-        ----------
-        rtext: The requests text to be chunked (not this is typically a string)
-        chunk_size: The size of each chunk
-        """
-        while rtext:
-            if len(rtext) >= chunk_size:
-                chunk, rtext = rtext[:chunk_size], rtext[chunk_size:]
-                yield chunk
-            else:
-                chunk = rtext
-                yield chunk
-                rtext = None
-
-
-    def _flatten(self, lol):
-        """ Flattens a list of lists (lol) and returns a generator """
-        return (item for sublist in lol for item in sublist)
-
-
-    def _link_yield(self, links):
-        """ Yield all csv links from a list of BeautifulSoup links """
-        for link in links:
-            href = link.get('href')
-            if type(href) == str:
-                if '.csv' in href:
-                    yield href
-
     def _ensure_directory(self, directory):
         """ Check to see if a directory exists, if not create it """
         if not os.path.exists(directory):
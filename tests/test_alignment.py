@@ -0,0 +1,69 @@
+import numpy as np
+import pandas as pd
+from nose.tools import *
+
+from nzem.frequent_io.alignment import asof_indexer, asof_align
+
+
+def daily(start, days, columns=("Stored", "Inflow")):
+    index = pd.date_range(start, periods=days, freq="D")
+    return pd.DataFrame(dict((c, np.arange(days, dtype=np.float64) + i)
+                             for i, c in enumerate(columns)),
+                        index=index, columns=list(columns))
+
+
+def periods(start, n):
+    return pd.date_range(start, periods=n, freq="30min")
+
+
+class TestAsofAlign(object):
+
+    def test_matches_forward_fill(self):
+        data = daily("2013-07-01", 3)
+        target = periods("2013-07-01 00:30", 144)
+
+        aligned = asof_align(data, target)
+        expected = data.reindex(target, method="ffill")
+
+        assert_true(aligned.equals(expected))
+
+    def test_before_first_value(self):
+        target = periods("2013-06-30 23:00", 4)
+        aligned = asof_align(daily("2013-07-01", 2)["Stored"], target)
+
+        assert_true(aligned.iloc[:2].isnull().all())
+        assert_equal(list(aligned.iloc[2:]), [0.0, 0.0])
+
+    def test_tolerance(self):
+        data = daily("2013-07-01", 1)
+        target = pd.DatetimeIndex(["2013-07-01 12:00", "2013-07-02 00:00"])
+
+        positions = asof_indexer(data.index, target,
+                                 tolerance=np.timedelta64(1, 'D'))
+        assert_equal(list(positions), [0, -1])
+
+    def test_integers_made_float(self):
+        data = pd.Series([1, 2], index=pd.date_range("2013-07-02", periods=2))
+        aligned = asof_align(data, pd.date_range("2013-07-01", periods=3))
+
+        assert_equal(aligned.dtype, np.float64)
+        assert_true(np.isnan(aligned.iloc[0]))
+        assert_equal(list(aligned.iloc[1:]), [1.0, 2.0])
+
+    def test_empty_data(self):
+        target = periods("2013-07-01 00:30", 4)
+
+        frame = asof_align(daily("2013-07-01", 0), target,
+                           tolerance=np.timedelta64(1, 'D'))
+        assert_true(frame.index.equals(target))
+        assert_equal(list(frame.columns), ["Stored", "Inflow"])
+        assert_true(frame.isnull().all().all())
+
+        series = asof_align(daily("2013-07-01", 0)["Stored"], target)
+        assert_equal(series.name, "Stored")
+        assert_equal(len(series), 4)
+        assert_true(series.isnull().all())
+
+    def test_empty_target(self):
+        aligned = asof_align(daily("2013-07-01", 0), pd.DatetimeIndex([]))
+        assert_equal(aligned.shape, (0, 2))
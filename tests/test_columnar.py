@@ -0,0 +1,81 @@
+import os
+import shutil
+import tempfile
+
+import numpy as np
+import pandas as pd
+from nose.tools import *
+
+from nzem.frequent_io.columnar import ColumnarStore
+
+
+def demand(start, periods, island="NI", value=100.0):
+    index = pd.date_range(start, periods=periods, freq="30min",
+                          name="Date Time")
+    return pd.DataFrame({"Island Name": [island] * periods,
+                         "Demand Sum": value + np.arange(periods,
+                                                         dtype=np.float64)},
+                        index=index, columns=["Island Name", "Demand Sum"])
+
+
+class TestColumnarStore(object):
+
+    def setup(self):
+        self.path = os.path.join(tempfile.mkdtemp(), "store")
+        self.store = ColumnarStore(self.path, partition='M')
+
+    def teardown(self):
+        shutil.rmtree(os.path.dirname(self.path))
+
+    def test_round_trip(self):
+        df = pd.concat([demand("2013-06-30 22:00", 8),
+                        demand("2013-06-30 22:00", 8, island="SI")])
+        self.store.write(df, keys=["Island Name"])
+
+        read = ColumnarStore(self.path).read()
+        expected = df.sort_index()
+
+        assert_equal(self.store.partitions(), ["201306", "201307"])
+        assert_equal(list(read.columns), ["Island Name", "Demand Sum"])
+        assert_equal(read.index.name, "Date Time")
+        assert_equal(len(read), 16)
+        assert_true((read.index == expected.index).all())
+        assert_equal(sorted(zip(read["Island Name"], read["Demand Sum"])),
+                     sorted(zip(expected["Island Name"],
+                                expected["Demand Sum"])))
+
+    def test_read_range_and_columns(self):
+        self.store.write(demand("2013-06-30 22:00", 8))
+
+        read = self.store.read(begin_date="2013-06-30 23:00",
+                               end_date="2013-07-01 00:30",
+                               columns=["Demand Sum"])
+        assert_equal(list(read.columns), ["Demand Sum"])
+        assert_equal(list(read["Demand Sum"]), [102.0, 103.0, 104.0, 105.0])
+
+        mapped = self.store.read(mmap=True)
+        assert_equal(list(mapped["Demand Sum"]), list(100.0 + np.arange(8)))
+
+    def test_upsert(self):
+        self.store.write(demand("2013-07-01 00:30", 4), keys=["Island Name"])
+        self.store.write(demand("2013-07-01 01:30", 4, value=200.0),
+                         keys=["Island Name"])
+
+        read = self.store.read()
+        assert_equal(len(read), 6)
+        assert_equal(list(read["Demand Sum"]),
+                     [100.0, 101.0, 200.0, 201.0, 202.0, 203.0])
+        assert_equal(self.store.last_index(),
+                     pd.Timestamp("2013-07-01 03:00"))
+
+    def test_append_and_drop(self):
+        assert_is_none(self.store.last_index())
+        assert_equal(len(self.store.read()), 0)
+
+        self.store.append(demand("2013-07-01 00:30", 2))
+        self.store.append(demand("2013-07-01 01:30", 2))
+        assert_equal(len(self.store.read()), 4)
+
+        self.store.drop()
+        assert_false(os.path.exists(self.path))
+        assert_equal(self.store.partitions(), [])
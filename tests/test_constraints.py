@@ -0,0 +1,198 @@
+import os
+import shutil
+import tempfile
+
+import numpy as np
+import pandas as pd
+from nose.tools import *
+
+from nzem.analysis.constraints import (HVDC_Constraint, HVDC_Constraint_Frame,
+                                       constraint_sweep, benchmark_constraints,
+                                       branch_binding, branch_binding_runs)
+from nzem.vspd.vspd import vSPUD_Factory
+
+NI_TO_SI = dict(energy_price_send="HAY2201 Price",
+                energy_price_receive="BEN2201 Price",
+                res_price="SI Reserve Price")
+
+SI_TO_NI = dict(energy_price_send="BEN2201 Price",
+                energy_price_receive="HAY2201 Price",
+                res_price="NI Reserve Price")
+
+
+def master_set(periods=2000, seed=0):
+    """ Random prices with constrained periods in both directions, splits
+    on the minimum and NaN prices """
+
+    rng = np.random.RandomState(seed)
+    index = pd.date_range("2013-01-01 00:30", periods=periods, freq="30min")
+    hay = rng.uniform(20, 120, periods)
+    ni_res = rng.uniform(0, 40, periods)
+    si_res = rng.uniform(0, 40, periods)
+    ben = hay + rng.uniform(-60, 60, periods)
+
+    # Splits matching the reserve price, in each direction
+    ben[::7] = hay[::7] + si_res[::7] + rng.uniform(-2, 2, len(hay[::7]))
+    ben[3::11] = hay[3::11] - ni_res[3::11]
+    # Splits exactly at the minimum are not binding
+    ben[5::13] = hay[5::13] + 10
+    si_res[5::13] = 10
+
+    df = pd.DataFrame({"HAY2201 Price": hay, "BEN2201 Price": ben,
+                       "NI Reserve Price": ni_res,
+                       "SI Reserve Price": si_res}, index=index)
+    df.loc[index[::17], "HAY2201 Price"] = np.nan
+    df.loc[index[::23], "BEN2201 Price"] = np.nan
+    df.loc[index[::19], "SI Reserve Price"] = np.nan
+    return df
+
+
+def row_wise(df, **kargs):
+    return df.apply(HVDC_Constraint, axis=1, **kargs).astype(bool).values
+
+
+class TestHVDCConstraintFrame(object):
+
+    def setup(self):
+        self.df = master_set()
+
+    def check(self, **kargs):
+        frame = HVDC_Constraint_Frame(self.df, **kargs)
+
+        assert_true(frame.index.equals(self.df.index))
+        assert_true(frame.values.any())
+        assert_true((frame.values == row_wise(self.df, **kargs)).all())
+
+    def test_abs_tol(self):
+        self.check(abs_tol=1.5, **NI_TO_SI)
+        self.check(abs_tol=1.5, **SI_TO_NI)
+
+    def test_rel_tol(self):
+        self.check(rel_tol=0.05, **NI_TO_SI)
+        self.check(rel_tol=0.05, **SI_TO_NI)
+
+    def test_min_split(self):
+        self.check(abs_tol=1.5, min_split=0, **NI_TO_SI)
+        self.check(abs_tol=1.5, min_split=25, **SI_TO_NI)
+
+    def test_nan_not_binding(self):
+        frame = HVDC_Constraint_Frame(self.df, abs_tol=1000, min_split=-1000,
+                                      **NI_TO_SI)
+        missing = self.df[["HAY2201 Price", "BEN2201 Price",
+                           "SI Reserve Price"]].isnull()
+        assert_false(frame[missing.any(axis=1).values].any())
+        assert_true(frame[~missing.any(axis=1).values].all())
+
+    def test_no_tolerance(self):
+        assert_raises(ValueError, HVDC_Constraint_Frame, self.df, **NI_TO_SI)
+
+    def test_benchmark(self):
+        results = benchmark_constraints(self.df.iloc[:200], repeat=1,
+                                        abs_tol=1.5, **NI_TO_SI)
+        assert_true(results["agree"])
+        assert_true(results["apply"] > 0)
+
+
+class TestConstraintSweep(object):
+
+    def setup(self):
+        self.df = master_set()
+
+    def test_sweep_matches_frame(self):
+        abs_tols, rel_tols, min_splits = [0.5, 2.0], [0.01, 0.1], [0, 10, 25]
+
+        for direction in (NI_TO_SI, SI_TO_NI):
+            table, flags = constraint_sweep(self.df, abs_tols=abs_tols,
+                                            rel_tols=rel_tols,
+                                            min_splits=min_splits,
+                                            flags=True, **direction)
+            assert_equal(len(table), 12)
+
+            for i, row in table.iterrows():
+                absolute = row["Tolerance Type"] == "abs"
+                kind = "abs_tol" if absolute else "rel_tol"
+                kargs = {kind: row["Tolerance"],
+                         "min_split": row["Min Split"]}
+                kargs.update(direction)
+                frame = HVDC_Constraint_Frame(self.df, **kargs)
+
+                assert_equal(row["Binding Periods"], frame.sum())
+                assert_almost_equal(row["Binding Fraction"],
+                                    frame.sum() / float(len(self.df)))
+                assert_true((flags.iloc[:, i].values == frame.values).all())
+
+    def test_sweep_needs_tolerance(self):
+        assert_raises(ValueError, constraint_sweep, self.df, **NI_TO_SI)
+
+
+def branch_results(flows=(100.0, -99.5, 50.0, 149.0, np.nan)):
+    return pd.DataFrame({
+        "DateTime": ["01-Jan-2013 00:30"] * 3 + ["01-Jan-2013 01:00"] * 2,
+        "Branch": ["HAY_BEN", "BEN_HAY", "ISL_KIK", "HAY_BEN", "ISL_KIK"],
+        "FromBus": ["HAY", "BEN", "ISL", "HAY", "ISL"],
+        "ToBus": ["BEN", "HAY", "KIK", "BEN", "KIK"],
+        "Flow (MW)": list(flows),
+        "Capacity (MW)": [100.0, 100.0, 100.0, 150.0, 100.0]},
+        columns=["DateTime", "Branch", "FromBus", "ToBus", "Flow (MW)",
+                 "Capacity (MW)"])
+
+
+class TestBranchBinding(object):
+
+    def test_abs_tol(self):
+        events = branch_binding(branch_results(), abs_tol=1.0)
+
+        assert_equal(list(events["Branch"]), ["HAY_BEN", "BEN_HAY",
+                                              "HAY_BEN"])
+        assert_equal(list(events["Direction"]), [1, -1, 1])
+        assert_equal(list(events["Loading"]), [1.0, 0.995, 149.0 / 150])
+        assert_equal(list(events.columns),
+                     ["DateTime", "Branch", "FromBus", "ToBus", "Flow (MW)",
+                      "Capacity (MW)", "Loading", "Direction"])
+
+    def test_rel_tol_and_branches(self):
+        events = branch_binding(branch_results(), rel_tol=0.001)
+        assert_equal(list(events["Branch"]), ["HAY_BEN"])
+
+        events = branch_binding(branch_results(), abs_tol=1.0,
+                                branches=["HAY_BEN"], run="FP_20130101")
+        assert_equal(list(events["Run"]), ["FP_20130101"] * 2)
+        assert_equal(list(events.columns[:2]), ["Run", "DateTime"])
+
+    def test_no_tolerance(self):
+        assert_raises(ValueError, branch_binding, branch_results(),
+                      abs_tol=None)
+
+
+class TestBranchBindingRuns(object):
+
+    def setup(self):
+        self.folder = tempfile.mkdtemp()
+        self.runs = {"FP_20130101_base": (100.0, -99.5, 50.0, 149.0, np.nan),
+                     "FP_20130101_test": (10.0, 10.0, 99.5, 10.0, 10.0)}
+        for run, flows in self.runs.items():
+            os.makedirs(os.path.join(self.folder, run))
+            fname = os.path.join(self.folder, run,
+                                 "20130101_BranchResults_TP.csv")
+            branch_results(flows).to_csv(fname, index=False)
+
+    def teardown(self):
+        shutil.rmtree(self.folder)
+
+    def test_runs(self):
+        factory = vSPUD_Factory(self.folder)
+        events = branch_binding_runs(factory, abs_tol=1.0)
+
+        assert_equal(sorted(events["Run"].value_counts().items()),
+                     [("FP_20130101_base", 3), ("FP_20130101_test", 1)])
+        test = events[events["Run"] == "FP_20130101_test"]
+        assert_equal(list(test["Branch"]), ["ISL_KIK"])
+
+    def test_pattern(self):
+        factory = vSPUD_Factory(self.folder, patterns=["test"])
+        events = branch_binding_runs(factory, abs_tol=1.0)
+        assert_equal(list(events["Run"]), ["FP_20130101_test"])
+
+    def test_no_runs(self):
+        factory = vSPUD_Factory(self.folder, patterns=["missing"])
+        assert_true(branch_binding_runs(factory).empty)
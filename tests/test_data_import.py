@@ -0,0 +1,42 @@
+import os
+import shutil
+import tempfile
+import warnings
+
+import pandas as pd
+from nose.tools import *
+
+from nzem.frequent_io.data_import import load_csvfile
+
+
+class TestLoadCsvfile(object):
+
+    def setup(self):
+        self.folder = tempfile.mkdtemp()
+        self.fname = os.path.join(self.folder, "island_demand.csv")
+        with open(self.fname, "w") as f:
+            f.write("Trading Date,Trading Period,Island,Demand\n"
+                    "2013-07-01,1,NI,100\n2013-07-01,49,NI,0\n"
+                    "2013-07-02,1,NI,110\n2013-07-02,48,NI,120\n")
+
+    def teardown(self):
+        shutil.rmtree(self.folder)
+
+    def load(self, **kargs):
+        with warnings.catch_warnings(record=True) as caught:
+            warnings.simplefilter("always")
+            df = load_csvfile(self.fname, date_period=True, **kargs)
+        assert_equal([str(w.message) for w in caught], [])
+        return df
+
+    def test_date_period(self):
+        df = self.load()
+
+        assert_equal(list(df.index), [pd.Timestamp("2013-07-01 00:30"),
+                                      pd.Timestamp("2013-07-02 00:30"),
+                                      pd.Timestamp("2013-07-03 00:00")])
+        assert_equal(list(df["Demand"]), [100, 110, 120])
+
+    def test_begin_date(self):
+        df = self.load(begin_date="2013-07-02 12:00")
+        assert_equal(list(df["Demand"]), [120])
@@ -0,0 +1,175 @@
+import os
+import shutil
+import sqlite3
+import tempfile
+
+import numpy as np
+from nose.tools import *
+
+from nzem.frequent_io.database import (ConnectionPool, query_chunks,
+                                       query_frame, query_arrays)
+from nzem.frequent_io.data_import import (create_database, database_pool,
+                                          table_exists)
+
+
+class RecordingCursor(object):
+    """ A sqlite cursor recording the arguments of each execute """
+
+    def __init__(self, cursor, calls):
+        self.cursor = cursor
+        self.calls = calls
+
+    def execute(self, *args):
+        self.calls.append(args)
+        return self.cursor.execute(*args)
+
+    def __getattr__(self, name):
+        return getattr(self.cursor, name)
+
+
+class RecordingConnection(object):
+
+    def __init__(self, conn, calls):
+        self.conn = conn
+        self.calls = calls
+
+    def cursor(self):
+        return RecordingCursor(self.conn.cursor(), self.calls)
+
+    def __getattr__(self, name):
+        return getattr(self.conn, name)
+
+
+class RecordingPool(ConnectionPool):
+
+    def __init__(self, *args, **kargs):
+        super(RecordingPool, self).__init__(*args, **kargs)
+        self.calls = []
+
+    def connect(self):
+        conn = super(RecordingPool, self).connect()
+        return RecordingConnection(conn, self.calls)
+
+
+class TestQueries(object):
+
+    def setup(self):
+        self.folder = tempfile.mkdtemp()
+        self.dbname = os.path.join(self.folder, "nzem.db")
+        conn = sqlite3.connect(self.dbname)
+        conn.execute('CREATE TABLE prices (NODE TEXT, PRICE REAL)')
+        conn.executemany('INSERT INTO prices VALUES (?, ?)',
+                         [("HAY2201", 50.0), ("BEN2201", 40.0),
+                          ("HAY2201", 55.0)])
+        conn.commit()
+        conn.close()
+        self.pool = RecordingPool("sqlite", database=self.dbname)
+
+    def teardown(self):
+        self.pool.close()
+        shutil.rmtree(self.folder)
+
+    def test_no_params_passed(self):
+        SQL = "SELECT * FROM prices WHERE NODE LIKE 'HAY%'"
+        df = query_frame(SQL, pool=self.pool)
+
+        assert_equal(list(df["PRICE"]), [50.0, 55.0])
+        assert_equal(self.pool.calls, [(SQL,)])
+
+        query_arrays(SQL, {"PRICE": "f8"}, pool=self.pool)
+        assert_equal(self.pool.calls[-1], (SQL,))
+
+    def test_params(self):
+        SQL = "SELECT * FROM prices WHERE NODE = ?"
+        df = query_frame(SQL, params=("BEN2201",), pool=self.pool)
+
+        assert_equal(list(df["PRICE"]), [40.0])
+        assert_equal(self.pool.calls, [(SQL, ("BEN2201",))])
+
+    def test_chunks(self):
+        chunks = list(query_chunks("SELECT * FROM prices", chunksize=2,
+                                   pool=self.pool))
+        assert_equal([len(x) for x in chunks], [2, 1])
+
+        empty = list(query_chunks("SELECT * FROM prices WHERE 1 = 0",
+                                  pool=self.pool))
+        assert_equal(len(empty), 1)
+        assert_equal(list(empty[0].columns), ["NODE", "PRICE"])
+
+    def test_arrays(self):
+        arrays = query_arrays("SELECT * FROM prices", {"PRICE": "f8"},
+                              chunksize=2, pool=self.pool)
+
+        assert_equal(arrays["PRICE"].dtype, np.float64)
+        assert_equal(list(arrays["PRICE"]), [50.0, 40.0, 55.0])
+        assert_equal(list(arrays["NODE"]), ["HAY2201", "BEN2201", "HAY2201"])
+
+    def test_rollback_on_error(self):
+        def insert_and_fail():
+            with self.pool.connection() as conn:
+                conn.execute("INSERT INTO prices VALUES ('OTA2201', 1.0)")
+                raise ValueError("failed")
+
+        assert_raises(ValueError, insert_and_fail)
+        df = query_frame("SELECT * FROM prices", pool=self.pool)
+        assert_equal(len(df), 3)
+
+
+class TestCreateDatabase(object):
+
+    def setup(self):
+        self.folder = tempfile.mkdtemp()
+        self.dbname = os.path.join(self.folder, "nzem.db")
+        with open(os.path.join(self.folder, "reserve_prices_1.csv"), "w") as f:
+            f.write("Trading Period Id,Island Id,Price\n"
+                    "2013070101,NI,5\n2013070101,SI,6\n")
+        with open(os.path.join(self.folder, "reserve_prices_2.csv"), "w") as f:
+            f.write("Trading Period Id,Island Id,Price\n"
+                    "2013070102,NI,5.5\n2013070102,SI,6.25\n")
+        self.sources = {"reserve_prices": "reserve_prices*.csv",
+                        "nodal_prices": "Nodal_Pricing*.csv"}
+
+    def teardown(self):
+        database_pool(dbname=self.dbname, backend="sqlite").close()
+        shutil.rmtree(self.folder)
+
+    def build(self, replace=False):
+        return create_database(sources=self.sources, folder=self.folder,
+                               dbname=self.dbname, backend="sqlite",
+                               batch_size=1, replace=replace)
+
+    def prices(self):
+        return query_frame('SELECT * FROM reserve_prices',
+                           pool=database_pool(dbname=self.dbname,
+                                              backend="sqlite"))
+
+    def test_build(self):
+        assert_equal(self.build(), {"reserve_prices": 4})
+
+        df = self.prices()
+        assert_equal(list(df["TRADING_DATE"].unique()), ["2013-07-01"])
+        assert_equal(list(df["TRADING_PERIOD"]), [1, 1, 2, 2])
+        assert_equal(list(df["PRICE"]), [5.0, 6.0, 5.5, 6.25])
+
+        pool = database_pool(dbname=self.dbname, backend="sqlite")
+        assert_true(table_exists("reserve_prices", pool=pool))
+        assert_false(table_exists("nodal_prices", pool=pool))
+
+    def test_rebuild_idempotent(self):
+        self.build()
+        assert_equal(self.build(), {})
+        assert_equal(len(self.prices()), 4)
+
+        assert_equal(self.build(replace=True), {"reserve_prices": 4})
+        assert_equal(len(self.prices()), 4)
+
+    def test_column_types(self):
+        self.build()
+        conn = sqlite3.connect(self.dbname)
+        types = dict((row[1], row[2]) for row in
+                     conn.execute('PRAGMA table_info(reserve_prices)'))
+        conn.close()
+
+        assert_equal(types["PRICE"], "REAL")
+        assert_equal(types["TRADING_PERIOD"], "INTEGER")
+        assert_equal(types["ISLAND_ID"], "TEXT")
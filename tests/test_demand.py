@@ -0,0 +1,80 @@
+import os
+import shutil
+import tempfile
+
+import numpy as np
+import pandas as pd
+from nose.tools import *
+
+from nzem.frequent_io.columnar import ColumnarStore
+from nzem.wits.demand import (transform_demand, ingest_demand, write_demand,
+                              load_demand)
+
+NODE_MAP = pd.DataFrame({"Node": ["HAY2201", "OTA2201", "BEN2201",
+                                  "BEN2201"],
+                         "Island Name": ["North Island", "North Island",
+                                         "South Island", "South Island"]})
+
+
+def raw_demand(day, periods=2, demand=10.0):
+    rows = [(day, p, node, demand * (i + 1))
+            for p in range(1, periods + 1)
+            for i, node in enumerate(["HAY2201", "OTA2201", "BEN2201"])]
+    return pd.DataFrame(rows, columns=["TRADING_DATE", "TRADING_PERIOD",
+                                       "POC", "DEMAND"])
+
+
+class CountingStore(ColumnarStore):
+    """ Counts the writes to each partition """
+
+    def __init__(self, *args, **kargs):
+        super(CountingStore, self).__init__(*args, **kargs)
+        self.writes = []
+
+    def _write_partition(self, name, df):
+        self.writes.append(name)
+        return super(CountingStore, self)._write_partition(name, df)
+
+
+class TestDemand(object):
+
+    def setup(self):
+        self.folder = tempfile.mkdtemp()
+        self.store = CountingStore(os.path.join(self.folder, "demand"),
+                                   partition='M')
+
+    def teardown(self):
+        shutil.rmtree(self.folder)
+
+    def test_transform(self):
+        df = transform_demand(raw_demand("2013-07-01"), node_map=NODE_MAP)
+
+        assert_equal(df.index.name, "Date Time")
+        assert_equal(list(df["Island Name"]), ["North Island",
+                                               "South Island"] * 2)
+        assert_equal(list(df["Demand Sum"]), [30.0, 30.0] * 2)
+        assert_equal(df.index[0], pd.Timestamp("2013-07-01 00:30"))
+        assert_equal(df.index[-1], pd.Timestamp("2013-07-01 01:00"))
+
+    def test_one_write_per_partition(self):
+        frames = [transform_demand(raw_demand(day), node_map=NODE_MAP)
+                  for day in ("2013-07-01", "2013-07-02", "2013-08-01",
+                              "2013-07-03")]
+
+        assert_equal(write_demand(frames, store=self.store), 16)
+        assert_equal(sorted(self.store.writes), ["201307", "201308"])
+        assert_equal(len(load_demand(store=self.store)), 16)
+
+    def test_replaces_periods(self):
+        ingest_demand(raw_demand("2013-07-01"), store=self.store,
+                      node_map=NODE_MAP)
+        ingest_demand(raw_demand("2013-07-01", demand=20.0),
+                      store=self.store, node_map=NODE_MAP)
+
+        df = load_demand(store=self.store)
+        assert_equal(len(df), 4)
+        assert_true(np.allclose(df["Demand Sum"], 60.0))
+
+    def test_nothing_to_write(self):
+        assert_equal(write_demand([], store=self.store), 0)
+        assert_equal(self.store.writes, [])
@@ -0,0 +1,148 @@
+import os
+import shutil
+import tempfile
+import threading
+import BaseHTTPServer
+
+from nose.tools import *
+
+from nzem.wits.downloader import WitsDownloader
+
+DATA = "".join(chr(i % 256) for i in xrange(100000))
+
+
+class Handler(BaseHTTPServer.BaseHTTPRequestHandler):
+    """ Serves DATA, honouring Range requests unless told not to and
+    failing the first few requests if asked to """
+
+    honour_range = True
+    failures = 0
+    requests = []
+
+    def do_GET(self):
+        Handler.requests.append(self.headers.get('Range'))
+
+        if Handler.failures:
+            Handler.failures -= 1
+            self.send_response(500)
+            self.send_header('Content-Length', '0')
+            self.end_headers()
+            return
+
+        start = 0
+        rng = self.headers.get('Range')
+        if rng and Handler.honour_range:
+            start = int(rng.split('=')[1].rstrip('-'))
+            if start >= len(DATA):
+                self.send_response(416)
+                self.send_header('Content-Range', 'bytes */%d' % len(DATA))
+                self.send_header('Content-Length', '0')
+                self.end_headers()
+                return
+            self.send_response(206)
+            self.send_header('Content-Range', 'bytes %d-%d/%d'
+                             % (start, len(DATA) - 1, len(DATA)))
+        else:
+            self.send_response(200)
+
+        self.send_header('Content-Length', str(len(DATA) - start))
+        self.end_headers()
+        self.wfile.write(DATA[start:])
+
+    def log_message(self, *args):
+        pass
+
+
+class TestWitsDownloader(object):
+
+    def setup(self):
+        Handler.honour_range = True
+        Handler.failures = 0
+        Handler.requests = []
+
+        self.server = BaseHTTPServer.HTTPServer(('127.0.0.1', 0), Handler)
+        self.thread = threading.Thread(target=self.server.serve_forever)
+        self.thread.daemon = True
+        self.thread.start()
+
+        self.site = 'http://127.0.0.1:%d/' % self.server.server_port
+        self.directory = tempfile.mkdtemp()
+        self.downloader = WitsDownloader(site=self.site, chunk_size=4096,
+                                         retries=3, backoff=0)
+
+    def teardown(self):
+        self.server.shutdown()
+        self.server.server_close()
+        shutil.rmtree(self.directory)
+
+    def _partial(self, contents):
+        with open(os.path.join(self.directory, 'offers.csv.part'), 'wb') as f:
+            f.write(contents)
+
+    def _downloaded(self, loc):
+        with open(loc, 'rb') as f:
+            return f.read()
+
+    def test_download(self):
+        loc = self.downloader.download('offers.csv', self.directory)
+
+        assert_equal(loc, os.path.join(self.directory, 'offers.csv'))
+        assert_equal(self._downloaded(loc), DATA)
+        assert_false(os.path.exists(loc + '.part'))
+        assert_equal(Handler.requests, [None])
+
+    def test_resume_partial(self):
+        self._partial(DATA[:30000])
+
+        loc = self.downloader.download('offers.csv', self.directory)
+
+        assert_equal(Handler.requests, ['bytes=30000-'])
+        assert_equal(self._downloaded(loc), DATA)
+
+    def test_range_ignored(self):
+        Handler.honour_range = False
+        self._partial('x' * 30000)
+
+        loc = self.downloader.download('offers.csv', self.directory)
+
+        assert_equal(Handler.requests, ['bytes=30000-'])
+        assert_equal(self._downloaded(loc), DATA)
+
+    def test_complete_partial(self):
+        self._partial(DATA)
+
+        loc = self.downloader.download('offers.csv', self.directory)
+
+        assert_equal(Handler.requests, ['bytes=%d-' % len(DATA)])
+        assert_equal(self._downloaded(loc), DATA)
+
+    def test_oversized_partial(self):
+        self._partial(DATA + 'stale')
+
+        loc = self.downloader.download('offers.csv', self.directory)
+
+        assert_equal(Handler.requests, ['bytes=%d-' % (len(DATA) + 5), None])
+        assert_equal(self._downloaded(loc), DATA)
+
+    def test_retry(self):
+        Handler.failures = 2
+
+        loc = self.downloader.download('offers.csv', self.directory)
+
+        assert_equal(len(Handler.requests), 3)
+        assert_equal(self._downloaded(loc), DATA)
+
+    def test_retries_exhausted(self):
+        Handler.failures = 10
+
+        assert_raises(Exception, self.downloader.download, 'offers.csv',
+                      self.directory)
+        assert_equal(len(Handler.requests), 4)
+
+    def test_download_all(self):
+        urls = ['offers_%d.csv' % i for i in xrange(5)]
+        locations = self.downloader.download_all(urls, self.directory)
+
+        assert_equal([os.path.basename(x) for x in locations], urls)
+        for loc in locations:
+            assert_equal(self._downloaded(loc), DATA)
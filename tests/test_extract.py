@@ -0,0 +1,51 @@
+import os
+import gzip
+import shutil
+import tempfile
+
+from nose.tools import *
+
+from nzem.wits.extract import archive_type, extract_file, read_archive
+
+CSV = "Trading_date,Trading_period,Price\n20130701,1,45.5\n20130701,2,47.25\n"
+
+
+class TestExtract(object):
+
+    def setup(self):
+        self.directory = tempfile.mkdtemp()
+
+    def teardown(self):
+        shutil.rmtree(self.directory)
+
+    def _write(self, name, opener=open):
+        fname = os.path.join(self.directory, name)
+        f = opener(fname, 'wb')
+        f.write(CSV)
+        f.close()
+        return fname
+
+    def test_gzip(self):
+        fname = self._write('prices.csv.gz', gzip.open)
+
+        assert_equal(archive_type(fname), 'gzip')
+        output_name = extract_file(fname)
+
+        assert_equal(output_name, os.path.join(self.directory, 'prices.csv'))
+        assert_false(os.path.exists(fname))
+        with open(output_name) as f:
+            assert_equal(f.read(), CSV)
+
+    def test_uncompressed_untouched(self):
+        fname = self._write('prices.csv')
+
+        assert_is_none(archive_type(fname))
+        assert_equal(extract_file(fname), fname)
+        assert_equal(os.listdir(self.directory), ['prices.csv'])
+        with open(fname) as f:
+            assert_equal(f.read(), CSV)
+
+    def test_read_archive(self):
+        df = read_archive(self._write('prices.csv.gz', gzip.open))
+
+        assert_equal(list(df["Price"]), [45.5, 47.25])
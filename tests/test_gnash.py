@@ -0,0 +1,133 @@
+import os
+import shutil
+import tempfile
+
+from nose.tools import *
+
+import nzem.gnash.gnasher
+from nzem.gnash.catalog import SeriesCatalog
+from nzem.gnash.gnasher import Gnasher
+
+NAMES_OUTPUT = """Gnash v1.0
+TYPE_INFLOW   Tekapo inflow
+BEN_STORED    Benmore storage
+ben_stored
+MAN_INFLOW    Manapouri inflow
+TYPE_INFLOW   Tekapo inflow
+Gnash:Bye
+"""
+
+
+class TestSeriesCatalog(object):
+
+    def setup(self):
+        self.catalog = SeriesCatalog.from_names_output(NAMES_OUTPUT)
+
+    def test_parse(self):
+        assert_equal(self.catalog.names, ["BEN_STORED", "ben_stored",
+                                          "MAN_INFLOW", "TYPE_INFLOW"])
+        assert_equal(self.catalog.titles["BEN_STORED"], "Benmore storage")
+        assert_false("ben_stored" in self.catalog.titles)
+
+    def test_case_distinct_names(self):
+        assert_true("BEN_STORED" in self.catalog)
+        assert_true("ben_stored" in self.catalog)
+        assert_false("Ben_Stored" in self.catalog)
+
+        self.catalog.add("Ben_Stored")
+        assert_equal(len(self.catalog), 5)
+        assert_equal(self.catalog.prefix("ben"),
+                     ["BEN_STORED", "Ben_Stored", "ben_stored"])
+
+    def test_add_matches_constructor(self):
+        catalog = SeriesCatalog()
+        for name in ["TYPE_INFLOW", "ben_stored", "MAN_INFLOW",
+                     "BEN_STORED", "MAN_INFLOW"]:
+            catalog.add(name)
+
+        assert_equal(catalog.names, self.catalog.names)
+        assert_equal(catalog.contains("inflow"), ["MAN_INFLOW",
+                                                  "TYPE_INFLOW"])
+
+    def test_lookups(self):
+        assert_equal(self.catalog.prefix("MA"), ["MAN_INFLOW"])
+        assert_equal(self.catalog.prefix("X"), [])
+        assert_equal(self.catalog.contains("_IN"), ["MAN_INFLOW",
+                                                    "TYPE_INFLOW"])
+        assert_equal(self.catalog.fuzzy("typ inflw")[0][0],
+                     "TYPE_INFLOW")
+        assert_equal(self.catalog.fuzzy("man inflow")[0][0], "MAN_INFLOW")
+
+    def test_save_and_load(self):
+        folder = tempfile.mkdtemp()
+        try:
+            fname = os.path.join(folder, "names", "gnash_names.json")
+            self.catalog.save(fname)
+            loaded = SeriesCatalog.load(fname)
+        finally:
+            shutil.rmtree(folder)
+
+        assert_equal(loaded.names, self.catalog.names)
+        assert_equal(loaded.titles, self.catalog.titles)
+        assert_equal(loaded.prefix("BEN"), ["BEN_STORED", "ben_stored"])
+
+
+class FakeCommand(object):
+    """ Stands in for the Gnash executable, printing output line by line """
+
+    output = ""
+
+    def __init__(self, path):
+        self.path = path
+
+    def __call__(self, _in=None, _out=None):
+        if self.output is None:
+            raise OSError("Gnash.exe not found")
+        for line in self.output.splitlines(True):
+            _out(line)
+        return self
+
+    def wait(self):
+        return self
+
+
+class TestGetNames(object):
+
+    def setup(self):
+        self.folder = tempfile.mkdtemp()
+        self.fname = os.path.join(self.folder, "gnash_names.json")
+        self.saved = dict((k, getattr(nzem.gnash.gnasher, k, None))
+                          for k in ("CONFIG", "gnash_path", "Command"))
+        nzem.gnash.gnasher.CONFIG = {"gnash-names": self.fname}
+        nzem.gnash.gnasher.gnash_path = os.getcwd()
+        nzem.gnash.gnasher.Command = FakeCommand
+        self.gnasher = Gnasher()
+
+    def teardown(self):
+        for k, v in self.saved.items():
+            setattr(nzem.gnash.gnasher, k, v)
+        FakeCommand.output = ""
+        shutil.rmtree(self.folder)
+
+    def test_names_saved(self):
+        FakeCommand.output = NAMES_OUTPUT
+        assert_equal(self.gnasher.find_series("ben"), ["BEN_STORED",
+                                                       "ben_stored"])
+        assert_equal(SeriesCatalog.load(self.fname).names,
+                     self.gnasher.names.names)
+
+        # Later lookups use the saved names rather than Gnash
+        FakeCommand.output = None
+        assert_equal(Gnasher().find_series("type_inflw", fuzzy=True)[0],
+                     "TYPE_INFLOW")
+
+    def test_failed_query(self):
+        FakeCommand.output = None
+        assert_raises(OSError, self.gnasher.find_series, "ben")
+        assert_false(os.path.exists(self.fname))
+
+    def test_no_names(self):
+        FakeCommand.output = "Gnash v1.0\nGnash:Bye\n"
+        assert_raises(ValueError, self.gnasher.find_series, "ben")
+        assert_false(os.path.exists(self.fname))
+        assert_is_none(getattr(self.gnasher, "names", None))
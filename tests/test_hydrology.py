@@ -0,0 +1,96 @@
+import os
+import shutil
+import tempfile
+
+import numpy as np
+import pandas as pd
+from nose.tools import *
+
+from nzem.frequent_io.data_import import parse_niwa_dates, niwa_parse
+from nzem.frequent_io.hydrology import load_hydrology
+
+LAKES = """Trading Date,Lake,Daily_Stored
+1/07/13,Tekapo,"1,200.5"
+01-07-2013,Pukaki,1500
+2013-07-02,Tekapo,1210
+20130702,Pukaki,1490
+31/06/13,Tekapo,0
+,Tekapo,0
+"""
+
+
+class TestParseNiwaDates(object):
+
+    def test_formats(self):
+        dates = parse_niwa_dates(np.array(["1/07/13", "01-07-2013",
+                                           "20130701", "2013-07-01",
+                                           "2013/7/1", "1.7.99"]))
+        expected = ["2013-07-01"] * 5 + ["1999-07-01"]
+        assert_true((dates == pd.DatetimeIndex(expected).values).all())
+
+    def test_invalid(self):
+        dates = parse_niwa_dates(np.array(["31/06/13", "13/13/13", "",
+                                           "2013-02-30", "1/07/13"]))
+        assert_true(pd.isnull(dates[:4]).all())
+        assert_equal(pd.Timestamp(dates[4]), pd.Timestamp("2013-07-01"))
+
+    def test_niwa_parse(self):
+        assert_equal(niwa_parse("2013-07-01"), pd.Timestamp("2013-07-01"))
+        assert_equal(niwa_parse("1/7/13"), pd.Timestamp("2013-07-01"))
+
+
+class TestLoadHydrology(object):
+
+    def setup(self):
+        self.folder = tempfile.mkdtemp()
+        self.fname = os.path.join(self.folder, "Hydro_Lake_Data.csv")
+        self.store = os.path.join(self.folder, "hydro_store")
+        with open(self.fname, "w") as f:
+            f.write(LAKES)
+
+    def teardown(self):
+        shutil.rmtree(self.folder)
+
+    def load(self, **kargs):
+        return load_hydrology(self.fname, store=self.store, **kargs)
+
+    def test_load(self):
+        df = self.load()
+
+        assert_equal(list(df.columns), ["Lake", "Daily Stored"])
+        assert_equal(df.index.name, "Date Time")
+        assert_equal(list(df.index), [pd.Timestamp("2013-07-01")] * 2 +
+                     [pd.Timestamp("2013-07-02")] * 2)
+        assert_equal(df["Daily Stored"].dtype, np.float64)
+        assert_equal(sorted(df["Daily Stored"]), [1200.5, 1210.0, 1490.0,
+                                                  1500.0])
+
+    def test_filters(self):
+        df = self.load(lakes=["Tekapo"], begin_date="2013-07-02")
+        assert_equal(list(df["Daily Stored"]), [1210.0])
+
+        df = self.load(end_date="2013-07-01")
+        assert_equal(sorted(df["Lake"]), ["Pukaki", "Tekapo"])
+
+    def test_cached(self):
+        first = self.load()
+        assert_true(os.path.exists(os.path.join(self.store,
+                                                "Hydro_Lake_Data")))
+
+        second = self.load()
+        assert_equal(list(second.index), list(first.index))
+        assert_equal(sorted(second["Daily Stored"]),
+                     sorted(first["Daily Stored"]))
+
+        uncached = self.load(cache=False)
+        assert_equal(len(uncached), 4)
+
+    def test_multiple_files(self):
+        other = os.path.join(self.folder, "Hydro_Lake_Data_2014.csv")
+        with open(other, "w") as f:
+            f.write("Trading Date,Lake,Daily_Stored\n2014-07-01,Hawea,300\n")
+
+        df = load_hydrology([self.fname, other], store=self.store)
+        assert_equal(len(df), 5)
+        assert_equal(df["Lake"].iloc[-1], "Hawea")
+        assert_equal(df.index[-1], pd.Timestamp("2014-07-01"))
@@ -0,0 +1,188 @@
+import os
+import shutil
+import tempfile
+
+import numpy as np
+import pandas as pd
+from nose.tools import *
+
+from nzem.frequent_io import master_set
+from nzem.frequent_io.columnar import ColumnarStore
+from nzem.frequent_io.master_set import (pivot_prices, add_spreads,
+                                         columnise_energy_prices,
+                                         columnise_res_prices)
+
+
+def energy_prices():
+    index = pd.DatetimeIndex(["2013-07-01 00:30"] * 3 +
+                             ["2013-07-01 01:00"] * 2, name="Date Time")
+    return pd.DataFrame({"Bus Id": ["HAY2201", "BEN2201", "OTA2201",
+                                    "HAY2201", "BEN2201"],
+                         "Price Sum": [50.0, 40.0, 38.0, 55.0, 41.0]},
+                        index=index)
+
+
+class TestPivotPrices(object):
+
+    def test_pivot(self):
+        df = energy_prices()
+        wide = pivot_prices(df, df["Bus Id"].values, df["Price Sum"].values)
+
+        assert_equal(list(wide.columns), ["BEN2201", "HAY2201", "OTA2201"])
+        assert_equal(wide.index.name, "Date Time")
+        assert_equal(list(wide["HAY2201"]), [50.0, 55.0])
+        assert_true(np.isnan(wide["OTA2201"].iloc[1]))
+
+    def test_order(self):
+        df = energy_prices()
+        wide = pivot_prices(df, df["Bus Id"].values, df["Price Sum"].values,
+                            order=["OTA2201", "HAY2201", "SFD2201"])
+
+        assert_equal(list(wide.columns), ["OTA2201", "HAY2201", "SFD2201"])
+        assert_true(wide["SFD2201"].isnull().all())
+        assert_equal(list(wide["HAY2201"]), [50.0, 55.0])
+
+    def test_last_row_kept(self):
+        df = energy_prices()
+        df = pd.concat([df, df.iloc[[3]].assign(**{"Price Sum": 70.0})])
+        wide = pivot_prices(df, df["Bus Id"].values, df["Price Sum"].values)
+
+        assert_equal(wide["HAY2201"].iloc[1], 70.0)
+
+    def test_add_spreads(self):
+        wide = pd.DataFrame({"A": [3.0, 5.0], "B": [1.0, 2.0]})
+
+        diff = add_spreads(wide, {"A - B": ("A", "B")})
+        assert_equal(list(diff["A - B"]), [2.0, 3.0])
+
+        total = add_spreads(wide, {"A + B": ("A", "B")}, how="sum")
+        assert_equal(list(total["A + B"]), [4.0, 7.0])
+
+        assert_raises(KeyError, add_spreads, wide, {"A - C": ("A", "C")})
+
+
+class TestColumnise(object):
+
+    def test_energy_prices(self):
+        mdf = columnise_energy_prices(energy_prices())
+
+        assert_equal(list(mdf.columns), ["HAY2201 Price", "BEN2201 Price",
+                                         "SFD2201 Price", "HLY2201 Price",
+                                         "OTA2201 Price",
+                                         "Island Price Split"])
+        assert_equal(list(mdf["Island Price Split"]), [10.0, 14.0])
+
+    def test_energy_prices_without_split_nodes(self):
+        mdf = columnise_energy_prices(energy_prices(), nodes=["OTA2201"])
+
+        assert_equal(list(mdf.columns), ["OTA2201 Price"])
+
+    def test_energy_prices_spreads(self):
+        mdf = columnise_energy_prices(energy_prices(), nodes=None,
+                                      spreads={"HAY-OTA": ("HAY2201",
+                                                           "OTA2201")})
+
+        assert_equal(mdf["HAY-OTA"].iloc[0], 12.0)
+        assert_equal(mdf["Island Price Split"].iloc[0], 10.0)
+
+    def test_reserve_prices(self):
+        index = pd.DatetimeIndex(["2013-07-01 00:30"] * 4, name="Date Time")
+        df = pd.DataFrame({"Island Id": ["NI", "NI", "SI", "SI"],
+                           "Reserve Type": ["F", "S", "F", "S"],
+                           "Price Sum": [1.0, 2.0, 3.0, 4.0]}, index=index)
+        mdf = columnise_res_prices(df)
+
+        assert_equal(mdf.iloc[0].to_dict(),
+                     {"NI FIR Price": 1.0, "NI SIR Price": 2.0,
+                      "SI FIR Price": 3.0, "SI SIR Price": 4.0,
+                      "NI Reserve Price": 3.0, "SI Reserve Price": 7.0})
+
+
+def half_hourly(start, periods, **columns):
+    index = pd.date_range(start, periods=periods, freq="30min",
+                          name="Date Time")
+    rows = dict((k, np.repeat(v, periods)) for k, v in columns.items())
+    return pd.DataFrame(rows, index=index)
+
+
+def sources(days):
+    """ Every source for a number of days, the hydro data only covers the
+    first day
+    """
+
+    periods = 48 * days
+    energy = pd.concat([half_hourly("2013-07-01 00:30", periods, **{
+        "Bus Id": node, "Price Sum": price}) for node, price in
+        (("HAY2201", 50.0), ("BEN2201", 40.0))])
+    reserve = pd.concat([half_hourly("2013-07-01 00:30", periods, **{
+        "Island Id": island, "Reserve Type": kind, "Price Sum": 1.0})
+        for island in ("NI", "SI") for kind in ("F", "S")])
+    demand = half_hourly("2013-07-01 00:30", periods, **{
+        "Island Name": "NI", "Demand Sum": 100.0})
+
+    day = pd.DatetimeIndex(["2013-07-01"], name="Date Time")
+    return {"energy_prices": energy.sort_index(),
+            "reserve_prices": reserve.sort_index(),
+            "demand_data": demand,
+            "hydro_data": pd.DataFrame({"Daily Stored": [2000.0]}, index=day),
+            "inflow_data": pd.DataFrame({"Daily Inflow": [300.0]}, index=day)}
+
+
+class TestAppendMasterset(object):
+
+    def setup(self):
+        self.folder = tempfile.mkdtemp()
+        self.store = os.path.join(self.folder, "master_set")
+        self.sources = sources(1)
+        self.load_source = master_set._load_source
+        self.versions = master_set.masterset_versions
+        master_set._load_source = self.fake_source
+        master_set.masterset_versions = lambda: {}
+
+    def teardown(self):
+        master_set._load_source = self.load_source
+        master_set.masterset_versions = self.versions
+        shutil.rmtree(self.folder)
+
+    def fake_source(self, name, begin_date=None):
+        df = self.sources[name]
+        if begin_date is not None:
+            df = df[df.index >= pd.Timestamp(begin_date)]
+        return df
+
+    def test_append_without_marks(self):
+        md = master_set.load_masterset(store=self.store)
+        assert_equal(len(md), 48)
+        assert_true((md["Daily Stored"].iloc[:47] == 2000.0).all())
+
+        # A set cached without marks, extended past the last hydro day
+        os.remove(os.path.join(self.store, "_marks.json"))
+        self.sources = sources(2)
+        new = master_set.append_masterset(store=self.store)
+
+        assert_equal(len(new), 48)
+        assert_equal(new.index[0], pd.Timestamp("2013-07-02 00:30"))
+        assert_true(new["Daily Stored"].isnull().all())
+        assert_true(new["Daily Inflow"].isnull().all())
+        assert_equal(list(new["Island Price Split"].unique()), [10.0])
+
+        read = ColumnarStore(self.store).read()
+        assert_equal(len(read), 96)
+
+    def test_uncached_skips_versions(self):
+        def versions():
+            raise AssertionError("The source versions were read")
+
+        master_set.masterset_versions = versions
+        md = master_set.load_masterset(cache=False, store=self.store)
+
+        assert_equal(len(md), 48)
+        assert_false(os.path.exists(self.store))
+
+    def test_append_nothing_new(self):
+        master_set.load_masterset(store=self.store)
+        os.remove(os.path.join(self.store, "_marks.json"))
+
+        new = master_set.append_masterset(store=self.store)
+        assert_equal(len(new), 0)
+        assert_equal(len(ColumnarStore(self.store).read()), 48)
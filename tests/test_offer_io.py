@@ -0,0 +1,68 @@
+import datetime
+
+import pandas as pd
+from nose.tools import *
+
+from nzem.offers.offer_io import (source_order, preferred_sources,
+                                  drop_duplicate_offers)
+
+FILES = ["offers/IL_Offers_20130702.csv", "offers/IL_Offers_Jun_2013.csv",
+         "offers/IL_Offers_20130630.csv", "offers/IL_Offers_201307.csv",
+         "offers/IL_Offers_20130801.csv", "offers/IL_Offers_Aug_2013.csv",
+         "offers/IL_Offers.csv"]
+
+
+def offers():
+    return pd.DataFrame({
+        "Trading_Date": ["2013-07-01", "2013/07/01", "2013-07-01"],
+        "Trading_Period": [1, 1, 2],
+        "Company": ["MRPL", "MRPL", "MRPL"],
+        "Band_Number": [1, 1, 1],
+        "Price": [10.0, 12.0, 11.0]})
+
+
+class TestSourceOrder(object):
+
+    def test_monthly_first(self):
+        assert_equal(source_order(FILES),
+                     ["offers/IL_Offers_Aug_2013.csv",
+                      "offers/IL_Offers_201307.csv",
+                      "offers/IL_Offers_Jun_2013.csv",
+                      "offers/IL_Offers.csv",
+                      "offers/IL_Offers_20130801.csv",
+                      "offers/IL_Offers_20130702.csv",
+                      "offers/IL_Offers_20130630.csv"])
+
+    def test_preferred_sources(self):
+        assert_equal(preferred_sources(FILES),
+                     ["offers/IL_Offers_Aug_2013.csv",
+                      "offers/IL_Offers_201307.csv",
+                      "offers/IL_Offers_Jun_2013.csv",
+                      "offers/IL_Offers.csv"])
+
+    def test_daily_kept_without_monthly(self):
+        files = ["IL_Offers_20130903.csv", "IL_Offers_Aug_2013.csv",
+                 "IL_Offers_20130902.csv"]
+        assert_equal(preferred_sources(files),
+                     ["IL_Offers_Aug_2013.csv", "IL_Offers_20130903.csv",
+                      "IL_Offers_20130902.csv"])
+
+
+class TestDropDuplicateOffers(object):
+
+    def test_first_kept(self):
+        df = drop_duplicate_offers(offers())
+
+        assert_equal(list(df["Price"]), [10.0, 11.0])
+        assert_equal(list(df["Trading_Date"]),
+                     [datetime.datetime(2013, 7, 1)] * 2)
+
+    def test_input_unchanged(self):
+        df = offers()
+        drop_duplicate_offers(df)
+
+        assert_equal(list(df["Trading_Date"]), list(offers()["Trading_Date"]))
+
+    def test_no_keys(self):
+        df = pd.DataFrame({"Price": [1.0, 1.0]})
+        assert_equal(len(drop_duplicate_offers(df)), 2)
@@ -0,0 +1,60 @@
+import threading
+
+from nose.tools import *
+
+from nzem.wits.pipeline import Pipeline
+
+
+def broken_items(n):
+    for i in xrange(n):
+        yield i
+    raise IOError("listing failed")
+
+
+class TestPipeline(object):
+
+    def setup(self):
+        self.threads = threading.active_count()
+
+    def test_stages_applied_in_order(self):
+        pipe = Pipeline(maxsize=2)
+        pipe.add_stage("double", lambda x: 2 * x, workers=3)
+        pipe.add_stage("increment", lambda x: x + 1, workers=2)
+
+        results = pipe.run(xrange(20))
+        assert_equal(sorted(results), [2 * x + 1 for x in xrange(20)])
+
+        stats = pipe.stats()
+        assert_equal([s['stage'] for s in stats], ["double", "increment"])
+        assert_equal([s['items'] for s in stats], [20, 20])
+        assert_equal([s['workers'] for s in stats], [3, 2])
+
+    def test_failures_dropped_and_recorded(self):
+        def invert(x):
+            return 1.0 / x
+
+        pipe = Pipeline().add_stage("invert", invert, workers=2)
+        results = pipe.run([1, 0, 2, 0, 4])
+
+        assert_equal(sorted(results), [0.25, 0.5, 1.0])
+        assert_equal(sorted(item for _, item, _ in pipe.failures), [0, 0])
+        assert_true(all(isinstance(e, ZeroDivisionError)
+                        for _, _, e in pipe.failures))
+        assert_equal(pipe.stats()[0]['errors'], 2)
+
+    def test_no_stages(self):
+        assert_equal(Pipeline().run(iter([1, 2, 3])), [1, 2, 3])
+
+    def test_duplicate_stage_rejected(self):
+        pipe = Pipeline().add_stage("parse", len)
+        assert_raises(ValueError, pipe.add_stage, "parse", len)
+        assert_equal(len(pipe.stages), 1)
+
+    def test_items_error_raised(self):
+        results = []
+        pipe = Pipeline(maxsize=1)
+        pipe.add_stage("collect", results.append, workers=2)
+
+        assert_raises(IOError, pipe.run, broken_items(5))
+        assert_equal(sorted(results), range(5))
+        assert_equal(threading.active_count(), self.threads)
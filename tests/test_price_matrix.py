@@ -0,0 +1,114 @@
+import os
+import shutil
+import tempfile
+
+import numpy as np
+import pandas as pd
+from nose.tools import *
+
+from nzem.frequent_io.price_matrix import PriceMatrix, build_price_matrix
+
+NODES = ["BEN2201", "HAY2201", "OTA2201"]
+
+
+def prices(times, nodes, values):
+    return pd.DataFrame({"Node": nodes, "Price": values},
+                        index=pd.DatetimeIndex(times, name="Date Time"))
+
+
+class TestPriceMatrix(object):
+
+    def setup(self):
+        self.folder = tempfile.mkdtemp()
+        self.path = os.path.join(self.folder, "matrix")
+        self.matrix = PriceMatrix.create(self.path, "2013-07-01 00:30",
+                                         "2013-07-02 00:00", NODES)
+
+    def teardown(self):
+        del self.matrix
+        shutil.rmtree(self.folder)
+
+    def test_grid(self):
+        assert_equal(self.matrix.shape, (48, 3))
+        assert_equal(self.matrix.index[0], pd.Timestamp("2013-07-01 00:30"))
+        assert_equal(self.matrix.index[-1], pd.Timestamp("2013-07-02 00:00"))
+        assert_true(np.isnan(self.matrix.values).all())
+
+        rows = self.matrix.rows(pd.DatetimeIndex([
+            "2013-07-01 00:30", "2013-07-01 12:00", "2013-07-02 00:00",
+            "2013-07-01 00:00", "2013-07-02 00:30", "2013-07-01 00:45"]))
+        assert_equal(list(rows), [0, 23, 47, -1, -1, -1])
+
+    def test_write_with_gaps(self):
+        df = prices(["2013-07-01 00:30", "2013-07-01 01:30",
+                     "2013-07-01 01:30", "2013-07-01 00:45",
+                     "2013-07-03 00:30", "2013-07-01 02:00"],
+                    ["HAY2201", "HAY2201", "BEN2201", "HAY2201",
+                     "HAY2201", "SFD2201"],
+                    [50.0, 52.0, 45.0, 99.0, 99.0, 99.0])
+
+        assert_equal(self.matrix.write(df), 3)
+        self.matrix.flush()
+
+        hay = PriceMatrix(self.path).node("HAY2201",
+                                          end_date="2013-07-01 01:30")
+        assert_equal(len(hay), 3)
+        assert_equal(hay.iloc[0], 50.0)
+        assert_true(np.isnan(hay.iloc[1]))
+        assert_equal(hay.iloc[2], 52.0)
+
+        period = self.matrix.period("2013-07-01 01:30")
+        assert_equal(list(period.index), NODES)
+        assert_equal(list(period[:2]), [45.0, 52.0])
+        assert_true(np.isnan(period["OTA2201"]))
+        assert_raises(KeyError, self.matrix.period, "2013-07-01 00:45")
+
+    def test_duplicate_periods(self):
+        df = prices(["2013-07-01 00:30"] * 3 + ["2013-07-01 01:00"],
+                    ["HAY2201", "BEN2201", "HAY2201", "HAY2201"],
+                    [50.0, 45.0, 51.0, 60.0])
+
+        assert_equal(self.matrix.write(df), 0)
+        frame = self.matrix.frame(end_date="2013-07-01 01:00",
+                                  nodes=["HAY2201", "BEN2201"])
+
+        assert_equal(list(frame["HAY2201"]), [51.0, 60.0])
+        assert_equal(frame["BEN2201"].iloc[0], 45.0)
+        assert_raises(KeyError, self.matrix.frame, nodes=["SFD2201"])
+
+    def test_row_slice(self):
+        frame = self.matrix.frame(begin_date="2013-07-01 23:45")
+        assert_equal(list(frame.index), [pd.Timestamp("2013-07-02 00:00")])
+
+        assert_equal(len(self.matrix.frame(begin_date="2013-07-03")), 0)
+        assert_equal(len(self.matrix.node("OTA2201",
+                                          begin_date="2013-06-30")), 48)
+
+
+class TestBuildPriceMatrix(object):
+
+    def setup(self):
+        self.folder = tempfile.mkdtemp()
+        self.files = []
+        for day in (1, 2):
+            fname = os.path.join(self.folder, "final_prices_%d.csv" % day)
+            with open(fname, "w") as f:
+                f.write("Trading Date,Trading Period,Node,Price\n")
+                for period in (1, 2, 48, 49):
+                    f.write("2013-07-0%d,%d,HAY2201,%d.5\n"
+                            % (day, period, period))
+            self.files.append(fname)
+
+    def teardown(self):
+        shutil.rmtree(self.folder)
+
+    def test_build(self):
+        matrix = build_price_matrix(os.path.join(self.folder, "matrix"),
+                                    self.files, NODES, "2013-07-01 00:30",
+                                    "2013-07-02 01:00")
+        hay = PriceMatrix(matrix.path).node("HAY2201")
+
+        assert_equal(len(hay), 50)
+        assert_equal(list(hay.iloc[[0, 1, 47, 48, 49]]),
+                     [1.5, 2.5, 48.5, 1.5, 2.5])
+        assert_equal(hay.notnull().sum(), 5)
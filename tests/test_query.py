@@ -0,0 +1,67 @@
+import numpy as np
+import pandas as pd
+from nose.tools import *
+
+from nzem.frequent_io.query import select, mask
+
+
+def offers():
+    return pd.DataFrame({
+        "Trading Date": pd.to_datetime(["2013-07-01", "2013-07-02",
+                                        "2013-07-02", "2013-07-03",
+                                        "2013-07-04"]),
+        "Island": pd.Categorical(["North Island", "South Island",
+                                  "North Island", None, "South Island"]),
+        "Company": ["MRPL", "CTCT", "GENE", "MRPL", "TPNZ"],
+        "Max": [0.0, 5.0, 10.0, np.nan, 2.5]})
+
+
+class TestSelect(object):
+
+    def setup(self):
+        self.df = offers()
+
+    def check(self, predicates, expected):
+        assert_true((mask(self.df, predicates) == expected.values).all())
+        assert_true(select(self.df, predicates).equals(self.df[expected]))
+
+    def test_comparisons(self):
+        df = self.df
+        self.check([("Max", ">", 0)], df["Max"] > 0)
+        self.check([("Max", "<=", 5)], df["Max"] <= 5)
+        self.check([("Company", "!=", "MRPL")], df["Company"] != "MRPL")
+        self.check([("Trading Date", ">=", "2013-07-02"),
+                    ("Trading Date", "<", pd.Timestamp("2013-07-04"))],
+                   (df["Trading Date"] >= "2013-07-02") &
+                   (df["Trading Date"] < pd.Timestamp("2013-07-04")))
+
+    def test_membership(self):
+        df = self.df
+        self.check([("Company", "in", ["MRPL", "GENE"])],
+                   df["Company"].isin(["MRPL", "GENE"]))
+        self.check([("Company", "not in", ("MRPL",)), ("Max", ">", 1)],
+                   ~df["Company"].isin(["MRPL"]) & (df["Max"] > 1))
+
+    def test_categorical(self):
+        df = self.df
+        self.check([("Island", "==", "North Island")],
+                   df["Island"] == "North Island")
+        self.check([("Island", "!=", "North Island")],
+                   df["Island"] != "North Island")
+        self.check([("Island", "==", "Stewart Island")],
+                   df["Island"].astype(object) == "Stewart Island")
+        self.check([("Island", "!=", "Stewart Island")],
+                   df["Island"].astype(object) != "Stewart Island")
+
+    def test_dict_predicates(self):
+        df = self.df
+        self.check({"Company": "MRPL", "Island": "North Island"},
+                   (df["Company"] == "MRPL") &
+                   (df["Island"] == "North Island"))
+
+    def test_no_predicates(self):
+        assert_true(select(self.df, []) is self.df)
+        assert_true(mask(self.df, []).all())
+
+    def test_unknown_operator(self):
+        assert_raises(ValueError, mask, self.df, [("Max", "=>", 0)])
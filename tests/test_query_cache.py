@@ -0,0 +1,132 @@
+import os
+import shutil
+import sqlite3
+import datetime
+import tempfile
+from decimal import Decimal
+
+import pandas as pd
+import numpy as np
+from nose.tools import *
+
+from nzem.frequent_io.query_cache import QueryCache
+from nzem.frequent_io.data_import import query_database
+
+
+def prices(start, days):
+    dates = pd.date_range(start, periods=days).strftime('%Y-%m-%d')
+    return pd.DataFrame({"TRADING_DATE": np.repeat(dates, 2),
+                         "TRADING_PERIOD": np.tile([1, 2], days),
+                         "PRICE": np.arange(2 * days, dtype=np.float64)},
+                        columns=["TRADING_DATE", "TRADING_PERIOD", "PRICE"])
+
+
+class TestQueryCache(object):
+
+    def setup(self):
+        self.folder = tempfile.mkdtemp()
+        self.cache = QueryCache(self.folder, ttl=None)
+
+    def teardown(self):
+        shutil.rmtree(self.folder)
+
+    def test_query_round_trip(self):
+        df = prices("2013-07-01", 3)
+        self.cache.put("SELECT *  FROM prices;", None, df)
+
+        cached = self.cache.get("SELECT * FROM prices", None)
+        assert_true(cached.equals(df))
+        assert_is_none(self.cache.get("SELECT * FROM prices", (1,)))
+
+    def test_object_types_kept(self):
+        df = pd.DataFrame({"DATE": [datetime.date(2013, 7, 1), None],
+                           "PRICE": [Decimal("45.10"), Decimal("47.25")],
+                           "NODE": [u"HAY2201", u"BEN2201"]},
+                          columns=["DATE", "PRICE", "NODE"])
+        self.cache.put("SELECT 1", None, df)
+
+        cached = self.cache.get("SELECT 1", None)
+        assert_equal(list(cached["DATE"]), [datetime.date(2013, 7, 1), None])
+        assert_equal(list(cached["PRICE"]), [Decimal("45.10"),
+                                             Decimal("47.25")])
+        assert_equal(list(cached["NODE"]), [u"HAY2201", u"BEN2201"])
+
+    def test_range_filtering(self):
+        self.cache.put_range("prices", "2013-07-01", "2013-07-10",
+                             prices("2013-07-01", 10))
+
+        df = self.cache.get_range("prices", "2013-07-03", "2013-07-04")
+        assert_equal(list(df["TRADING_DATE"]), ["2013-07-03"] * 2 +
+                     ["2013-07-04"] * 2)
+        assert_equal(list(df["PRICE"]), [4.0, 5.0, 6.0, 7.0])
+
+        assert_is_none(self.cache.get_range("prices", "2013-06-30",
+                                            "2013-07-04"))
+        assert_is_none(self.cache.get_range("prices", "2013-07-03",
+                                            "2013-07-04", companies=["CTCT"]))
+
+    def test_range_filtering_dates(self):
+        df = prices("2013-07-01", 5)
+        df["TRADING_DATE"] = pd.to_datetime(df["TRADING_DATE"])
+        self.cache.put_range("prices", "2013-07-01", "2013-07-05", df)
+
+        cached = self.cache.get_range("prices", "2013-07-02", "2013-07-05")
+        assert_equal(len(cached), 8)
+
+    def test_range_merged(self):
+        self.cache.put_range("prices", "2013-07-01", "2013-07-05",
+                             prices("2013-07-01", 5))
+        self.cache.put_range("prices", "2013-07-06", "2013-07-08",
+                             prices("2013-07-06", 3))
+
+        df = self.cache.get_range("prices", "2013-07-01", "2013-07-08")
+        assert_equal(len(df), 16)
+        assert_equal(df["TRADING_DATE"].iloc[0], "2013-07-01")
+        assert_equal(df["TRADING_DATE"].iloc[-1], "2013-07-08")
+
+    def test_range_disjoint_replaces(self):
+        self.cache.put_range("prices", "2013-07-01", "2013-07-05",
+                             prices("2013-07-01", 5))
+        self.cache.put_range("prices", "2013-08-01", "2013-08-02",
+                             prices("2013-08-01", 2))
+
+        assert_equal(len(self.cache.get_range("prices", "2013-08-01",
+                                              "2013-08-02")), 4)
+        assert_is_none(self.cache.get_range("prices", "2013-07-01",
+                                            "2013-08-02"))
+
+
+class TestQueryDatabase(object):
+
+    def setup(self):
+        self.folder = tempfile.mkdtemp()
+        self.dbname = os.path.join(self.folder, "nzem.db")
+        connection = sqlite3.connect(self.dbname)
+        connection.execute('CREATE TABLE "prices" ("TRADING_DATE" TEXT, '
+                           '"TRADING_PERIOD" INTEGER, "PRICE" REAL)')
+        connection.executemany('INSERT INTO "prices" VALUES (?, ?, ?)',
+                               prices("2013-07-01", 5).values.tolist())
+        connection.commit()
+        connection.close()
+        self.cache = QueryCache(os.path.join(self.folder, "cache"), ttl=None)
+
+    def teardown(self):
+        shutil.rmtree(self.folder)
+
+    def query(self, cache):
+        return query_database("prices", "2013-07-02", "2013-07-03",
+                              columns=["PRICE"], dbname=self.dbname,
+                              backend="sqlite", cache=cache)
+
+    def test_columns_without_cache(self):
+        df = self.query(None)
+        assert_equal(list(df.columns), ["PRICE"])
+        assert_equal(list(df["PRICE"]), [2.0, 3.0, 4.0, 5.0])
+
+    def test_columns_with_cache(self):
+        first = self.query(self.cache)
+        second = self.query(self.cache)
+
+        assert_equal(list(first.columns), ["PRICE"])
+        assert_true(first.equals(second))
+        assert_true(os.listdir(self.cache.folder))
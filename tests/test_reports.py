@@ -0,0 +1,97 @@
+import os
+import shutil
+import tempfile
+
+import numpy as np
+import matplotlib.pyplot as plt
+from nose.tools import *
+
+from nzem.plotting.reports import render_report, _task, _prices, _render
+from nzem.vspd.vspd import vSPUD
+
+from test_vspd import island_results
+
+
+class TestReports(object):
+
+    def setup(self):
+        self.folder = tempfile.mkdtemp()
+        self.backend = plt.get_backend()
+        self.control = vSPUD(island_results=island_results())
+        self.override = vSPUD(island_results=island_results(days=30))
+
+    def teardown(self):
+        plt.switch_backend(self.backend)
+        shutil.rmtree(self.folder)
+
+    def fname(self, name):
+        return os.path.join(self.folder, name)
+
+    def specs(self):
+        return [{"plot": "mixed", "spud": self.control,
+                 "other": self.override, "fname": self.fname("mixed.png")},
+                {"plot": "energy", "spud": self.control, "comp": "alt",
+                 "fname": self.fname("energy.png"), "figsize": (6, 3)},
+                {"plot": "reserve", "spud": self.control, "island": "SI",
+                 "time_aggregation": ["Year", "Month"],
+                 "fname": self.fname("reserve.png"), "dpi": 50},
+                {"plot": "frequency", "spud": self.control,
+                 "freq_name": "FIR Price ($/MWh)",
+                 "fname": self.fname("frequency.png")}]
+
+    def test_task(self):
+        prices = {}
+        tasks = [_task(spec, prices, 100) for spec in self.specs()]
+
+        # The control prices by month are shared by the mixed and energy plots
+        assert_equal(len(prices), 3)
+        assert_is(tasks[0]["prices"][0], tasks[1]["prices"][0])
+        assert_equal(len(tasks[0]["prices"]), 2)
+
+        assert_equal(tasks[1]["kargs"], {"comp": "alt"})
+        assert_equal(tasks[1]["figsize"], (6, 3))
+        assert_equal(tasks[2]["kargs"], {"island": "SI"})
+        assert_equal(tasks[2]["dpi"], 50)
+        assert_equal(list(tasks[3]["island_results"].columns),
+                     ["FIR Price ($/MWh)"])
+        assert_false("prices" in tasks[3])
+
+    def test_unknown_plot(self):
+        spec = {"plot": "scatter", "spud": self.control, "fname": "x.png"}
+        assert_raises(ValueError, _task, spec, {}, 100)
+
+    def test_prices_keyed_on_aggregation(self):
+        prices = {}
+        first = _prices(self.control, (["Year", "Month"], np.mean), prices)
+        again = _prices(self.control, (("Year", "Month"), np.mean), prices)
+        median = _prices(self.control, ("Month_Year", np.median), prices)
+
+        assert_is(first, again)
+        assert_equal(len(prices), 2)
+        assert_equal(len(median), 2)
+
+    def test_render(self):
+        plt.switch_backend('Agg')
+        task = _task(self.specs()[1], {}, 50)
+        fname, plot, seconds = _render(task)
+
+        assert_equal((fname, plot), (self.fname("energy.png"), "energy"))
+        assert_true(os.path.getsize(fname) > 0)
+        assert_true(seconds >= 0)
+
+    def test_render_report(self):
+        timings = render_report(self.specs(), processes=1, dpi=50)
+
+        assert_equal(list(timings.columns), ["File", "Plot", "Seconds"])
+        assert_equal(list(timings["Plot"]), ["mixed", "energy", "reserve",
+                                             "frequency"])
+        for fname in timings["File"]:
+            assert_true(os.path.getsize(fname) > 0)
+        assert_equal(plt.get_backend(), self.backend)
+
+    def test_render_report_pool(self):
+        timings = render_report(self.specs()[1:3], processes=2, dpi=50)
+
+        assert_equal(sorted(os.listdir(self.folder)),
+                     ["energy.png", "reserve.png"])
+        assert_equal(len(timings), 2)
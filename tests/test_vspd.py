@@ -0,0 +1,163 @@
+import os
+import shutil
+import tempfile
+
+import numpy as np
+import pandas as pd
+import matplotlib.pyplot as plt
+from nose.tools import *
+
+from nzem.vspd.vspd import vSPUD, vSPUD_Factory
+
+
+def island_results(days=59):
+    times = pd.date_range("2013-01-01 00:00", periods=days * 48,
+                          freq="30min")
+    frames = []
+    for island, price in (("NI", 60.0), ("SI", 50.0)):
+        frames.append(pd.DataFrame({
+            "DateTime": times.strftime("%d-%b-%Y %H:%M"),
+            "Island": island,
+            "ReferencePrice ($/MWh)": price + np.arange(len(times)) % 48,
+            "FIR Price ($/MWh)": 5.0, "SIR Price ($/MWh)": 1.0}))
+    return pd.concat(frames, ignore_index=True)
+
+
+class TestPriceSeries(object):
+
+    def setup(self):
+        self.spud = vSPUD(island_results=island_results())
+
+    def test_price_report(self):
+        report = self.spud.price_report()
+
+        assert_equal(len(report), 59 * 48)
+        assert_true((report["Island Price Difference ($/MWh)"] == 10).all())
+        assert_true((report["NI Reserve Price ($/MWh)"] == 6).all())
+
+    def test_price_series_cached(self):
+        first = self.spud.price_series("Month_Year")
+        cached = dict(self.spud._price_cache)
+        second = self.spud.price_series("Month_Year")
+
+        assert_equal(len(first), 2)
+        assert_true(second.equals(first))
+        assert_equal(self.spud._price_cache, cached)
+
+    def test_price_series_copied(self):
+        first = self.spud.price_series("Month_Year")
+        first["NI ReferencePrice ($/MWh)"] = 0.0
+        self.spud.price_report()["NI ReferencePrice ($/MWh)"] = 0.0
+
+        second = self.spud.price_series("Month_Year")
+        assert_true((second["NI ReferencePrice ($/MWh)"] == 83.5).all())
+        assert_true((self.spud.price_report()["NI ReferencePrice ($/MWh)"]
+                     >= 60).all())
+
+    def test_price_series_list(self):
+        series = self.spud.price_series(["Year", "Month"])
+
+        assert_equal(len(series), 2)
+        assert_true(self.spud.price_series(["Year", "Month"]).equals(series))
+        assert_true(self.spud.price_series(("Year", "Month")).equals(series))
+
+    def test_agg_func(self):
+        mean = self.spud.price_series("Month_Year")
+        peak = self.spud.price_series("Month_Year", agg_func=np.max)
+
+        assert_true((mean["NI ReferencePrice ($/MWh)"] == 83.5).all())
+        assert_true((peak["NI ReferencePrice ($/MWh)"] == 107.0).all())
+
+    def test_cache_reset(self):
+        self.spud.price_series("Month_Year")
+        self.spud.island_results = island_results(days=30)
+        assert_equal(len(self.spud.price_series("Month_Year")), 1)
+
+        # Changes in place are only seen once the results are assigned again
+        self.spud.island_results["ReferencePrice ($/MWh)"] = 1.0
+        self.spud.island_results = self.spud.island_results
+        series = self.spud.price_series("Month_Year")
+        assert_true((series["NI ReferencePrice ($/MWh)"] == 1.0).all())
+
+
+class TestIterResults(object):
+
+    def setup(self):
+        self.folder = tempfile.mkdtemp()
+        for i, run in enumerate(["FP_20130101", "FP_20130201"]):
+            os.makedirs(os.path.join(self.folder, "results", run))
+            island_results(days=i + 1).to_csv(
+                os.path.join(self.folder, "results", run,
+                             "%s_IslandResults_TP.csv" % run[3:]),
+                index=False)
+        self.factory = vSPUD_Factory(self.folder)
+
+    def teardown(self):
+        shutil.rmtree(self.folder)
+
+    def test_iter_results(self):
+        results = self.factory.iter_results(island=True)
+        assert_false(isinstance(results, list))
+
+        spuds = sorted(results, key=lambda x: x.folder)
+        assert_equal([os.path.basename(x.folder) for x in spuds],
+                     ["FP_20130101", "FP_20130201"])
+        assert_equal([len(x.island_results) for x in spuds], [96, 192])
+        assert_true(all(x.branch_results is None for x in spuds))
+
+    def test_matches_load_results(self):
+        total = sum(len(x.island_results) for x in
+                    self.factory.iter_results(island=True))
+        loaded = self.factory.load_results(island_results=True)
+        assert_equal(total, len(loaded.island_results))
+
+
+class TestPlots(object):
+
+    def setup(self):
+        self.backend = plt.get_backend()
+        plt.switch_backend('Agg')
+        self.spud = vSPUD(island_results=island_results())
+        self.fig, self.axes = plt.subplots(1)
+
+    def teardown(self):
+        plt.close('all')
+        plt.switch_backend(self.backend)
+
+    def test_frequency_plot(self):
+        self.spud.frequency_plot(self.axes, freq_name="FIR Price ($/MWh)")
+
+        counts = [p.get_height() for p in self.axes.patches]
+        assert_equal(len(counts), 50)
+        assert_equal(sum(counts), 2 * 59 * 48)
+        assert_equal(self.axes.get_xlabel(), "FIR Price ($/MWh)")
+
+    def test_energy_price_plot(self):
+        prices = self.spud.price_series("Month_Year")
+        self.spud.energy_price_plot(self.axes, prices=prices, comp="alt")
+
+        lines = self.axes.get_lines()
+        assert_equal([x.get_label() for x in lines],
+                     ["Haywards Price w/ Pole Three",
+                      "Benmore Price w/ Pole Three"])
+        assert_true(np.allclose(lines[0].get_ydata(),
+                                prices["NI ReferencePrice ($/MWh)"]))
+        assert_equal(self.axes.get_ylabel(), "Energy Price ($/MWh)")
+
+    def test_reserve_price_plot(self):
+        self.spud.reserve_price_plot(self.axes, island="SI",
+                                     time_aggregation="Month_Year")
+
+        lines = self.axes.get_lines()
+        assert_equal([x.get_label() for x in lines],
+                     ["FIR Price no Pole Three", "SIR Price no Pole Three"])
+        assert_true(np.allclose(lines[0].get_ydata(), 5.0))
+        assert_true(np.allclose(lines[1].get_ydata(), 1.0))
+        assert_equal(self.axes.get_ylabel(), "SI Reserve Prices ($/MWh)")
+
+    def test_mixed_price_plot(self):
+        other = vSPUD(island_results=island_results(days=30))
+        fig, axes = self.spud.mixed_price_plot(other)
+
+        assert_equal(len(axes), 3)
+        assert_equal([len(x.get_lines()) for x in axes], [4, 4, 4])
@@ -0,0 +1,214 @@
+import os
+import shutil
+import tempfile
+import threading
+import BaseHTTPServer
+import SimpleHTTPServer
+
+from nose.tools import *
+
+import nzem.wits.wits
+from nzem.wits.wits import WitsScraper
+from nzem.wits.catalog import WitsCatalog
+from nzem.wits.manifest import SyncManifest
+from nzem.wits.downloader import WitsDownloader
+
+PRODUCTS = ["offers", "ilreserves"]
+
+HISTORIC = ["/offers/historic/offers201306.csv.gz",
+            "/offers/historic/ilreserves201306.csv.gz"]
+
+CURRENT = ["/offers/current/offers20130629.csv.gz",
+           "/offers/current/offers20130630.csv.gz",
+           "/offers/current/offers20130701.csv.gz",
+           "/offers/current/offers20130702.csv.gz",
+           "/offers/current/ilreserves20130701.csv.gz"]
+
+
+class TestWitsCatalog(object):
+
+    def setup(self):
+        self.catalog = WitsCatalog(current=CURRENT, historic=HISTORIC,
+                                   products=PRODUCTS)
+
+    def test_parse_name(self):
+        parsed = self.catalog.parse_name(CURRENT[0])
+        assert_equal(parsed[0], "offers")
+        assert_equal(parsed[1], parsed[2])
+
+        product, begin, end = self.catalog.parse_name(HISTORIC[1])
+        assert_equal(product, "ilreserves")
+        assert_equal(end - begin, 29)
+
+        assert_is_none(self.catalog.parse_name("/offers/readme.txt"))
+
+    def test_files_monthly_supersedes_daily(self):
+        files = self.catalog.files("offers", "2013-06-28", "2013-07-01")
+        assert_equal(files, ["/offers/historic/offers201306.csv.gz",
+                             "/offers/current/offers20130701.csv.gz"])
+
+    def test_files_daily_only(self):
+        files = self.catalog.files("offers", "2013-07-02", "2013-07-10")
+        assert_equal(files, ["/offers/current/offers20130702.csv.gz"])
+
+    def test_files_every_product(self):
+        files = self.catalog.files(begin_date="2013-07-01",
+                                   end_date="2013-07-01")
+        assert_equal(files, ["/offers/current/ilreserves20130701.csv.gz",
+                             "/offers/current/offers20130701.csv.gz"])
+
+    def test_files_outside_range(self):
+        assert_equal(self.catalog.files("offers", "2012-01-01",
+                                        "2012-12-31"), [])
+
+    def test_superseded_matches_files(self):
+        superseded = self.catalog.superseded("offers")
+        assert_equal(superseded, ["/offers/current/offers20130629.csv.gz",
+                                  "/offers/current/offers20130630.csv.gz"])
+
+        files = self.catalog.files("offers")
+        assert_false(set(files) & set(superseded))
+        assert_equal(set(files) | set(superseded),
+                     set(f for f in CURRENT + HISTORIC
+                         if self.catalog.product(f) == "offers"))
+
+
+class TestSyncManifest(object):
+
+    def setup(self):
+        self.directory = tempfile.mkdtemp()
+        self.fname = os.path.join(self.directory, 'offers.csv')
+        with open(self.fname, 'w') as f:
+            f.write("a,b\n1,2\n")
+        self.manifest = SyncManifest(os.path.join(self.directory, 'm.json'))
+
+    def teardown(self):
+        shutil.rmtree(self.directory)
+
+    def test_record_and_reload(self):
+        self.manifest.record('http://wits/offers.csv', self.fname,
+                             {'etag': '"abc"', 'content-length': '8'})
+        self.manifest.save()
+
+        manifest = SyncManifest(self.manifest.fname)
+        assert_true('http://wits/offers.csv' in manifest)
+        assert_equal(manifest.get('http://wits/offers.csv')['size'], 8)
+        assert_true(manifest.verify('http://wits/offers.csv'))
+
+    def test_is_current(self):
+        url = 'http://wits/offers.csv'
+        assert_false(self.manifest.is_current(url))
+
+        self.manifest.record(url, self.fname, {'etag': '"abc"'})
+        assert_true(self.manifest.is_current(url))
+        assert_true(self.manifest.is_current(url, {'etag': '"abc"'}))
+        assert_false(self.manifest.is_current(url, {'etag': '"def"'}))
+        assert_false(self.manifest.is_current(url, {'content-length': '3'}))
+
+        with open(self.fname, 'a') as f:
+            f.write("3,4\n")
+        assert_false(self.manifest.is_current(url))
+        assert_false(self.manifest.verify(url))
+
+    def test_remove(self):
+        url = 'http://wits/offers.csv'
+        self.manifest.record(url, self.fname)
+
+        self.manifest.remove(url, delete_file=True)
+        assert_false(url in self.manifest)
+        assert_false(os.path.exists(self.fname))
+
+
+class MirrorHandler(SimpleHTTPServer.SimpleHTTPRequestHandler):
+    """ Serves the files of TestSyncOffers.root """
+
+    root = None
+
+    def translate_path(self, path):
+        return os.path.join(MirrorHandler.root, path.lstrip('/'))
+
+    def log_message(self, *args):
+        pass
+
+
+class TestSyncOffers(object):
+
+    daily = ["/offers/current/offers20130629.csv",
+             "/offers/current/offers20130630.csv"]
+    monthly = "/offers/historic/offers201306.csv"
+
+    def setup(self):
+        self.site_root = tempfile.mkdtemp()
+        self.mirror = tempfile.mkdtemp()
+        MirrorHandler.root = self.site_root
+        for url in self.daily:
+            self.publish(url)
+
+        self.server = BaseHTTPServer.HTTPServer(('127.0.0.1', 0),
+                                                MirrorHandler)
+        self.thread = threading.Thread(target=self.server.serve_forever)
+        self.thread.daemon = True
+        self.thread.start()
+
+        self.config = getattr(nzem.wits.wits, 'CONFIG', None)
+        nzem.wits.wits.CONFIG = {'wits-offer-types': ["offers"],
+                                 'wits-offer-directories': {"offers":
+                                                            "offers"}}
+
+        self.scraper = WitsScraper(scrape_offers=False, scrape_demand=False)
+        self.scraper.downloader = WitsDownloader(
+            site='http://127.0.0.1:%d/' % self.server.server_port,
+            retries=0, backoff=0)
+        self.manifest = SyncManifest(os.path.join(self.mirror, 'm.json'))
+
+        # Mirror the daily files before the month is published
+        self.sync(historic=[])
+        self.locations = [self.manifest.get(self.resolve(url))['local_path']
+                          for url in self.daily]
+
+    def teardown(self):
+        self.server.shutdown()
+        self.server.server_close()
+        nzem.wits.wits.CONFIG = self.config
+        shutil.rmtree(self.site_root)
+        shutil.rmtree(self.mirror)
+
+    def publish(self, url):
+        fname = os.path.join(self.site_root, url.lstrip('/'))
+        if not os.path.exists(os.path.dirname(fname)):
+            os.makedirs(os.path.dirname(fname))
+        with open(fname, 'w') as f:
+            f.write("Trading_date,Price\n%s,45.5\n" % url[-12:-4])
+
+    def resolve(self, url):
+        return self.scraper.downloader.resolve(url)
+
+    def sync(self, historic):
+        self.scraper.catalog = WitsCatalog(current=self.daily,
+                                           historic=historic,
+                                           products=["offers"])
+        return self.scraper._sync_offers(self.mirror, manifest=self.manifest)
+
+    def test_daily_files_mirrored(self):
+        assert_true(all(os.path.exists(x) for x in self.locations))
+        assert_equal(self.sync(historic=[]), [])
+
+    def test_prune_after_monthly_mirrored(self):
+        self.publish(self.monthly)
+        fetched = self.sync(historic=[self.monthly])
+
+        assert_equal([os.path.basename(x) for x in fetched],
+                     ["offers201306.csv"])
+        assert_true(self.manifest.is_current(self.resolve(self.monthly)))
+        assert_false(any(os.path.exists(x) for x in self.locations))
+        assert_false(any(self.resolve(url) in self.manifest
+                         for url in self.daily))
+
+    def test_no_prune_when_monthly_fails(self):
+        # The month is in the catalog but fails to download
+        fetched = self.sync(historic=[self.monthly])
+
+        assert_equal(fetched, [])
+        assert_true(all(os.path.exists(x) for x in self.locations))
+        assert_true(all(self.resolve(url) in self.manifest
+                        for url in self.daily))